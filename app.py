@@ -1,3 +1,20 @@
+"""
+Application factory.
+
+Importing this module only defines the extensions; nothing connects to the
+database. create_app() builds a configured app, registering blueprints,
+models and hooks as it goes. Schema creation and admin users are explicit
+CLI commands (see commands.py); schema changes are Flask-Migrate revisions
+in migrations/ (flask db ...):
+
+    flask --app main init-db
+    flask --app main create-admin
+
+The factory opens no database connections, so gunicorn --preload can build the
+app once in the master. The engine's pool is reset in each forked worker
+(see database.init_database).
+"""
+
 import os
 import logging
 import re
@@ -5,36 +22,18 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_mail import Mail
+from flask_migrate import Migrate
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
-
-logging.basicConfig(level=logging.INFO)
+from database import RoutingSession
 
 class Base(DeclarativeBase):
     pass
 
-db = SQLAlchemy(model_class=Base)
+db = SQLAlchemy(model_class=Base, session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 mail = Mail()
-
-app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key")
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
-
-# ✅ PostgreSQL (Railway)
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL")
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-
-# Mail
-app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER')
-app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
-app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
-
-db.init_app(app)
-login_manager.init_app(app)
-mail.init_app(app)
+migrate = Migrate(directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'), render_as_batch=True)
 
 login_manager.login_view = "admin.login"
 
@@ -43,43 +42,158 @@ def load_user(user_id):
     from models import AdminUser
     return AdminUser.query.get(int(user_id))
 
-from utils import get_setting
-
-@app.context_processor
-def inject_settings():
-    from models import ContactMessage, Project, BlogPost, Skill
-    return dict(
-        get_setting=get_setting,
-        ContactMessage=ContactMessage,
-        Project=Project,
-        BlogPost=BlogPost,
-        Skill=Skill
-    )
-
-from routes import main, admin
-app.register_blueprint(main.bp)
-app.register_blueprint(admin.bp, url_prefix="/admin")
-
-# ✅ IMPORTANT: DO NOT auto-create tables in production
-if os.environ.get("FLASK_ENV") != "production":
-    with app.app_context():
-        import models
-        db.create_all()
-
-        from models import AdminUser
-        from werkzeug.security import generate_password_hash
-
-        if not AdminUser.query.first():
-            admin = AdminUser(
-                username="abdullah",
-                email="shawaiz@portfolio.com",
-                password_hash=generate_password_hash("231980077")
-            )
-            db.session.add(admin)
-            db.session.commit()
-
-@app.template_filter("nl2br")
+def load_config(app):
+    """Read settings from the environment into app.config"""
+    from database import normalize_database_url
+
+    app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key")
+
+    # ✅ PostgreSQL (Railway)
+    app.config["SQLALCHEMY_DATABASE_URI"] = normalize_database_url(os.environ.get("DATABASE_URL"))
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+    # Engine and pool, per worker process (see database.py). Timeouts: pool and connect in
+    # seconds, statement and SQLite busy timeout in milliseconds
+    app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 5))
+    app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 5))
+    app.config['DB_POOL_TIMEOUT'] = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+    app.config['DB_POOL_RECYCLE'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    app.config['DB_POOL_PRE_PING'] = os.environ.get('DB_POOL_PRE_PING', '1') != '0'
+    app.config['DB_CONNECT_TIMEOUT'] = int(os.environ.get('DB_CONNECT_TIMEOUT', 10))
+    app.config['DB_STATEMENT_TIMEOUT'] = int(os.environ.get('DB_STATEMENT_TIMEOUT', 30000))
+    app.config['DB_PGBOUNCER'] = os.environ.get('DB_PGBOUNCER', '0') == '1'
+    app.config['SQLITE_WAL'] = os.environ.get('SQLITE_WAL', '1') != '0'
+    app.config['SQLITE_BUSY_TIMEOUT'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))
+
+    # Read replica for public GETs (see database.py). Max lag: seconds a client that just wrote keeps
+    # reading from the primary; retry: seconds the replica is skipped after an error
+    app.config['DATABASE_REPLICA_URL'] = normalize_database_url(os.environ.get('DATABASE_REPLICA_URL'))
+    app.config['DB_REPLICA_MAX_LAG'] = float(os.environ.get('DB_REPLICA_MAX_LAG', 10))
+    app.config['DB_REPLICA_RETRY'] = float(os.environ.get('DB_REPLICA_RETRY', 30))
+
+    # Mail
+    app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER')
+    app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
+    app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', '1') != '0'
+    app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
+    app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
+    app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER', os.environ.get('MAIL_USERNAME'))
+
+    # Email outbox: 'thread' delivers from each app process, 'off' when outbox_worker.py runs separately
+    app.config['OUTBOX_WORKER'] = os.environ.get('OUTBOX_WORKER', 'thread')
+    app.config['OUTBOX_POLL_INTERVAL'] = float(os.environ.get('OUTBOX_POLL_INTERVAL', 5))
+
+    # Keyset (cursor) pagination for listings instead of COUNT + OFFSET; ?cursor= opts in per request
+    app.config['CURSOR_PAGINATION'] = os.environ.get('CURSOR_PAGINATION', '0') == '1'
+
+    # Seconds between recounts of the dashboard counters (0 disables the job)
+    app.config['STATS_RECONCILE_INTERVAL'] = int(os.environ.get('STATS_RECONCILE_INTERVAL', 3600))
+
+    # Public page cache
+    app.config['PAGE_CACHE_ENABLED'] = os.environ.get('PAGE_CACHE_ENABLED', '1') != '0'
+    app.config['PAGE_CACHE_SIZE'] = int(os.environ.get('PAGE_CACHE_SIZE', 512))
+    app.config['PAGE_CACHE_TTL'] = int(os.environ.get('PAGE_CACHE_TTL', 300))
+    # Seconds between checks for pages and fragments purged by other worker processes (0 disables
+    # the cache_purge table, for single-process setups); also bounds how stale another worker can be
+    app.config['CACHE_SYNC_INTERVAL'] = float(os.environ.get('CACHE_SYNC_INTERVAL', 2))
+
+    # sitemap.xml splits into a sitemap index past this many URLs (the protocol's limit); posts per feed
+    app.config['SITEMAP_MAX_URLS'] = int(os.environ.get('SITEMAP_MAX_URLS', 50000))
+    app.config['FEED_ENTRIES'] = int(os.environ.get('FEED_ENTRIES', 20))
+
+    # {% cache %} template fragments (layout, skill lists), purged with the page cache
+    app.config['FRAGMENT_CACHE_ENABLED'] = os.environ.get('FRAGMENT_CACHE_ENABLED', '1') != '0'
+    app.config['FRAGMENT_CACHE_SIZE'] = int(os.environ.get('FRAGMENT_CACHE_SIZE', 256))
+    app.config['FRAGMENT_CACHE_TTL'] = int(os.environ.get('FRAGMENT_CACHE_TTL', 3600))
+
+    # Upload processing: 'pool' resizes in background worker processes, 'inline' in the request
+    app.config['IMAGE_PROCESSING'] = os.environ.get('IMAGE_PROCESSING', 'pool')
+    app.config['IMAGE_WORKERS'] = int(os.environ.get('IMAGE_WORKERS', 2))
+
+    # Static export directory; when set, admin changes re-export the affected pages in the background
+    app.config['FREEZE_DIR'] = os.environ.get('FREEZE_DIR')
+
+    # Per-request SQL instrumentation (Server-Timing header, N+1 warnings, admin slow-endpoints page).
+    # QUERY_BUDGET_MODE: 'warn' logs requests over their query budget, 'raise' fails them (use in tests)
+    app.config['SQL_INSTRUMENTATION'] = os.environ.get('SQL_INSTRUMENTATION', '1') != '0'
+    app.config['SERVER_TIMING'] = os.environ.get('SERVER_TIMING', '1') != '0'
+    app.config['QUERY_BUDGET_MODE'] = os.environ.get('QUERY_BUDGET_MODE', 'warn')
+    app.config['QUERY_BUDGET_DEFAULT'] = int(os.environ['QUERY_BUDGET_DEFAULT']) if os.environ.get('QUERY_BUDGET_DEFAULT') else None
+    app.config['QUERY_BUDGETS'] = {}
+    app.config['N_PLUS_ONE_THRESHOLD'] = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 3))
+
+    # Who sends static/files and static/uploads bodies: 'app', or the proxy via 'x-accel' (nginx,
+    # internal location at STATIC_ACCEL_PREFIX) or 'x-sendfile' (Apache, lighttpd); see delivery.py
+    app.config['STATIC_DELIVERY'] = os.environ.get('STATIC_DELIVERY', 'app')
+    app.config['STATIC_ACCEL_PREFIX'] = os.environ.get('STATIC_ACCEL_PREFIX', '/_static/')
+
+    # Content-hashed static URLs (manifest built by build_assets.py, lazy hashing otherwise)
+    app.config['ASSET_FINGERPRINTING'] = os.environ.get('ASSET_FINGERPRINTING', '1') != '0'
+
 def nl2br(text):
     if not text:
         return ""
     return re.sub(r"\r\n|\r|\n", "<br>", str(text))
+
+def create_app(config=None):
+    """Build the application; config overrides settings read from the environment"""
+    from assets import init_assets
+    from cache import FragmentCacheExtension
+    from commands import register_commands
+    from database import REPLICA_BIND, engine_options, init_database, replica_bind
+    from images import load_variants
+    from instrumentation import init_instrumentation
+    from utils import get_setting
+    import stats  # registers the counter session hooks
+
+    logging.basicConfig(level=logging.INFO)
+
+    app = Flask(__name__)
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+    load_config(app)
+    if config:
+        app.config.update(config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+    replica = replica_bind(app.config)
+    if replica:
+        app.config.setdefault('SQLALCHEMY_BINDS', {})[REPLICA_BIND] = replica
+
+    db.init_app(app)
+    init_database(app)
+    login_manager.init_app(app)
+    mail.init_app(app)
+    migrate.init_app(app, db)
+    init_assets(app)
+    init_instrumentation(app)
+
+    @app.before_request
+    def start_background_workers():
+        if app.config['OUTBOX_WORKER'] == 'thread':
+            from outbox import start_worker_thread
+            start_worker_thread(app)
+        stats.start_reconcile_thread(app)
+
+    def image_variants(image_path):
+        return load_variants(app.static_folder, image_path)
+
+    @app.context_processor
+    def inject_settings():
+        from models import ContactMessage, Project, BlogPost, Skill
+        return dict(
+            get_setting=get_setting,
+            image_variants=image_variants,
+            site_counters=stats.get_counters,
+            ContactMessage=ContactMessage,
+            Project=Project,
+            BlogPost=BlogPost,
+            Skill=Skill
+        )
+
+    app.add_template_filter(nl2br, "nl2br")
+    app.jinja_env.add_extension(FragmentCacheExtension)
+
+    from routes import main, admin
+    app.register_blueprint(main.bp)
+    app.register_blueprint(admin.bp, url_prefix="/admin")
+    register_commands(app)
+    return app
@@ -0,0 +1,190 @@
+"""
+Content-hashed static URLs with precompressed variants.
+
+url_for('static', filename='css/style.css') resolves to
+/static/css/style.<hash>.css. The hash comes from the manifest written by
+build_assets.py, or is computed lazily (and cached by mtime) for files the
+build has not seen yet, such as fresh uploads. The static view maps hashed
+names back to the real file. It marks responses immutable for a year when
+the hash is current, and serves the .br/.gz sibling produced at build time
+when the client accepts it. File bodies are sent by delivery.py, which can
+hand large ones to the proxy.
+
+Fronting nginx can serve the same URLs without Python using:
+
+    location ~ ^/static/(.+)\.[0-9a-f]{12}(\.\w+)$ {
+        alias /path/to/static/$1$2;
+        gzip_static on; brotli_static on;
+        add_header Cache-Control "public, max-age=31536000, immutable";
+    }
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import threading
+from flask import request
+from delivery import OFFLOAD_DIRS, send_static_file
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip siblings are built without it
+    brotli = None
+
+MANIFEST_NAME = 'assets-manifest.json'
+DIGEST_LENGTH = 12
+IMMUTABLE_MAX_AGE = 31536000
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.xml', '.txt', '.html', '.map', '.ico'}
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_HASHED_RE = re.compile(r'^(?P<stem>.+)\.(?P<digest>[0-9a-f]{%d})(?P<ext>\.[^./]+)$' % DIGEST_LENGTH)
+
+def file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(65536), b''):
+            sha.update(chunk)
+    return sha.hexdigest()[:DIGEST_LENGTH]
+
+def hashed_name(filename, digest):
+    stem, ext = os.path.splitext(filename)
+    return f'{stem}.{digest}{ext}'
+
+def split_hashed(filename):
+    """Return (logical filename, digest) for a fingerprinted name, or (filename, None)"""
+    match = _HASHED_RE.match(filename)
+    if not match:
+        return filename, None
+    return match.group('stem') + match.group('ext'), match.group('digest')
+
+def _skip(relative):
+    return (relative == MANIFEST_NAME
+            or relative.endswith(('.gz', '.br', '.tmp'))
+            or split_hashed(relative)[1] is not None
+            or relative.startswith('.'))
+
+def build_assets(static_folder, compress=True):
+    """Hash every static file, precompress text assets and write the manifest; returns it"""
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for name in files:
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            if _skip(relative):
+                continue
+            manifest[relative] = file_digest(path)
+            if compress and os.path.splitext(name)[1].lower() in COMPRESSIBLE:
+                _precompress(path)
+
+    tmp_path = os.path.join(static_folder, MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w') as fh:
+        json.dump(manifest, fh, indent=0, sort_keys=True)
+    os.replace(tmp_path, os.path.join(static_folder, MANIFEST_NAME))
+    return manifest
+
+def _precompress(path):
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    with open(path + '.gz', 'wb') as fh:
+        fh.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + '.br', 'wb') as fh:
+            fh.write(brotli.compress(data, quality=11))
+
+class AssetResolver:
+    """Maps logical static filenames to their current content digest"""
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self._manifest = {}
+        self._lazy = {}
+        self._lock = threading.Lock()
+        self.load_manifest()
+
+    def load_manifest(self):
+        try:
+            with open(os.path.join(self.static_folder, MANIFEST_NAME)) as fh:
+                self._manifest = json.load(fh)
+        except (OSError, ValueError):
+            self._manifest = {}
+
+    def digest(self, filename):
+        """Digest for a static file, or None if it does not exist"""
+        digest = self._manifest.get(filename)
+        if digest is not None:
+            return digest
+        path = os.path.join(self.static_folder, filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        cached = self._lazy.get(filename)
+        if cached and cached[0] == (stat.st_mtime_ns, stat.st_size):
+            return cached[1]
+        digest = file_digest(path)
+        with self._lock:
+            self._lazy[filename] = ((stat.st_mtime_ns, stat.st_size), digest)
+        return digest
+
+    def url_filename(self, filename):
+        digest = self.digest(filename)
+        return hashed_name(filename, digest) if digest else filename
+
+def _negotiate(static_folder, filename):
+    """Pick a precompressed sibling the client accepts and that is not older than the file"""
+    accepted = request.accept_encodings
+    try:
+        source_mtime = os.stat(os.path.join(static_folder, filename)).st_mtime
+    except OSError:
+        return None, filename
+    for encoding, suffix in ENCODINGS:
+        if not accepted[encoding]:
+            continue
+        try:
+            if os.stat(os.path.join(static_folder, filename + suffix)).st_mtime >= source_mtime:
+                return encoding, filename + suffix
+        except OSError:
+            continue
+    return None, filename
+
+def init_assets(app):
+    """Fingerprint url_for('static') URLs and replace the static view"""
+    resolver = AssetResolver(app.static_folder)
+    app.extensions['assets'] = resolver
+
+    @app.url_defaults
+    def fingerprint_static(endpoint, values):
+        if endpoint == 'static' and app.config.get('ASSET_FINGERPRINTING', True):
+            filename = values.get('filename')
+            if filename:
+                values['filename'] = resolver.url_filename(filename)
+
+    def static(filename):
+        logical, digest = split_hashed(filename)
+        fresh = digest is not None and digest == resolver.digest(logical)
+        encoding, served = (None, logical)
+        if os.path.splitext(logical)[1].lower() in COMPRESSIBLE:
+            encoding, served = _negotiate(app.static_folder, logical)
+
+        response = send_static_file(
+            app.static_folder, served,
+            mimetype=mimetypes.guess_type(logical)[0] or 'application/octet-stream',
+            max_age=IMMUTABLE_MAX_AGE if fresh else app.get_send_file_max_age(logical),
+            download_name=os.path.basename(logical),
+            # Precompressed siblings stay in-process: the proxy would not keep Content-Encoding
+            offload=encoding is None and logical.startswith(OFFLOAD_DIRS),
+        )
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if os.path.splitext(logical)[1].lower() in COMPRESSIBLE:
+            response.vary.add('Accept-Encoding')
+        if fresh:
+            response.cache_control.public = True
+            response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = static
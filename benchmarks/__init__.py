@@ -0,0 +1,10 @@
+"""
+Load and latency benchmarks.
+
+    python -m benchmarks.run                      # seed, test-client and multi-worker runs
+    python -m benchmarks.run --baseline benchmarks/results/baseline.json
+
+seed.py fills a throwaway database with synthetic content, harness.py drives
+every public and admin route and collects latency and SQL statement counts,
+and run.py writes the report as JSON and compares it against a baseline.
+"""
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Check that the queries behind every benchmarked route are served by indexes.
+
+    python -m benchmarks.explain
+    python -m benchmarks.explain --scale 0.5 --verbose
+    python -m benchmarks.explain --database-url postgresql://localhost/portfolio_explain
+
+Builds a throwaway database through the migrations (the same path as
+flask db upgrade), seeds it, requests each route with the page and fragment
+caches off and runs EXPLAIN on every SELECT the route issued. A statement is
+flagged when the plan
+
+  - filters a content table with a full scan instead of an index lookup, or
+  - sorts rows read by such a scan (SQLite temp B-tree, PostgreSQL Sort node)
+    instead of reading them in index order. Sorting the few rows a keyed
+    lookup returned, like the tags of one page of posts, is fine.
+
+On PostgreSQL sequential scans and sorts are disabled for the session, so a
+Seq Scan or Sort left in the plan means no index can serve the query at all,
+whatever the table sizes. The process exits non-zero when anything is flagged.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Tables that grow with the site's content; lookup tables (tags, settings, counters) are small
+CONTENT_TABLES = {'project', 'blog_post', 'contact_message', 'skill', 'experience', 'email_outbox'}
+_SQLITE_SCAN_RE = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+_FILTERED_RE = re.compile(r'\bWHERE\b', re.IGNORECASE)
+
+def capture_statements(engine):
+    """Start recording (statement, parameters) for each SELECT run on engine; returns the list"""
+    from sqlalchemy import event
+
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and not executemany:
+            captured.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    return captured
+
+def explain_sqlite(connection, statement, parameters):
+    """Plan lines and the problems found in them"""
+    lines = [row[3] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+    # Any walk over a content table, in rowid or some index's order, as opposed to a keyed SEARCH
+    scanned = any(line.startswith('SCAN ') and line.split()[1] in CONTENT_TABLES for line in lines)
+    problems = []
+    for line in lines:
+        scan = _SQLITE_SCAN_RE.match(line)
+        if scan and scan.group(1) in CONTENT_TABLES and _FILTERED_RE.search(statement):
+            problems.append(line)
+        elif line.startswith('USE TEMP B-TREE') and scanned:
+            problems.append(line)
+    return lines, problems
+
+def _pg_nodes(node):
+    yield node
+    for child in node.get('Plans', ()):
+        yield from _pg_nodes(child)
+
+def _pg_full_scan(node):
+    """A content-table read that is not an index lookup: a Seq Scan or a whole-index walk"""
+    return node.get('Relation Name') in CONTENT_TABLES and (
+        node['Node Type'] == 'Seq Scan'
+        or node['Node Type'] in ('Index Scan', 'Index Only Scan') and not node.get('Index Cond'))
+
+def explain_postgresql(connection, statement, parameters):
+    """Plan nodes and the problems found in them"""
+    plan = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement, parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    lines, problems = [], []
+    for node in _pg_nodes(plan[0]['Plan']):
+        relation = node.get('Relation Name')
+        line = node['Node Type'] + (f' on {relation}' if relation else '') + (
+            f" using {node['Index Name']}" if node.get('Index Name') else '')
+        lines.append(line)
+        if _pg_full_scan(node) and node.get('Filter'):
+            problems.append(f"{line} (filter {node['Filter']})")
+        elif node['Node Type'] in ('Sort', 'Incremental Sort') and any(map(_pg_full_scan, _pg_nodes(node))):
+            problems.append(f"{line} by {', '.join(node.get('Sort Key', ()))}")
+    return lines, problems
+
+def check_routes(app, routes, verbose=False):
+    """Request every route, EXPLAIN what it ran; returns {route: [(statement, problems)]} for flagged ones"""
+    from app import db
+    from benchmarks import harness
+
+    with app.app_context():
+        engine = db.engine
+        explain = explain_postgresql if engine.dialect.name == 'postgresql' else explain_sqlite
+    captured = capture_statements(engine)
+
+    anonymous = app.test_client()
+    admin = app.test_client()
+    admin.post('/admin/login', data={'username': harness.ADMIN_USERNAME, 'password': harness.ADMIN_PASSWORD})
+
+    flagged = {}
+    for name, url, needs_admin in routes:
+        del captured[:]
+        response = (admin if needs_admin else anonymous).get(url)
+        response.get_data()  # streamed bodies query as they are read
+        response.close()
+        statements = dict.fromkeys(captured)  # distinct, in execution order
+        with engine.connect() as connection:
+            if engine.dialect.name == 'postgresql':
+                connection.exec_driver_sql('SET enable_seqscan = off')
+                connection.exec_driver_sql('SET enable_sort = off')
+            results = [(statement, *explain(connection, statement, parameters))
+                       for statement, parameters in statements]
+        problems = [(statement, found) for statement, _, found in results if found]
+        status = 'FLAGGED' if problems else 'ok'
+        print(f"{name:<22}{response.status_code:>5}{len(results):>5} queries  {status}")
+        for statement, lines, found in results:
+            if found or verbose:
+                print('    ' + ' '.join(statement.split())[:160])
+                for line in (lines if verbose else found):
+                    print(f"      {'!' if line in found else '-'} {line}")
+        if problems:
+            flagged[name] = problems
+    return flagged
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=float, default=0.2, help='multiplier for the seeded row counts')
+    parser.add_argument('--database-url', help='check against an existing empty database instead of a temp SQLite file')
+    parser.add_argument('--verbose', action='store_true', help='print every plan, not only flagged ones')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'explain.db')
+    os.environ['OUTBOX_WORKER'] = 'off'
+    os.environ['STATS_RECONCILE_INTERVAL'] = '0'
+    os.environ['IMAGE_PROCESSING'] = 'inline'
+    os.environ['PAGE_CACHE_ENABLED'] = '0'
+    os.environ['FRAGMENT_CACHE_ENABLED'] = '0'
+    os.environ.pop('FREEZE_DIR', None)
+    os.environ.pop('DATABASE_REPLICA_URL', None)
+
+    from app import create_app, db
+    from benchmarks import harness
+    from benchmarks.seed import seed
+    from database import upgrade_schema
+
+    app = create_app({'WTF_CSRF_ENABLED': False})
+
+    with app.app_context():
+        upgrade_schema()
+        sizes = seed(scale=args.scale)
+        harness.ensure_admin()
+        # Fresh planner statistics, as a long-running database would have
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql('ANALYZE')
+        routes = harness.build_routes()
+    print(f"Seeded {sizes}\n")
+
+    flagged = check_routes(app, routes, args.verbose)
+    if flagged:
+        print(f"\n{len(flagged)} route(s) with unindexed queries: {', '.join(flagged)}")
+        sys.exit(1)
+    print("\nAll route queries are served by indexes.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""Drive every public and admin route and collect latency and SQL statement counts"""
+
+import http.client
+import logging
+import multiprocessing
+import random
+import re
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ADMIN_USERNAME = 'bench'
+ADMIN_PASSWORD = 'bench-password'
+# Statement counts come from the app's own Server-Timing header (instrumentation.py)
+_QUERIES_RE = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+def ensure_admin():
+    from app import db
+    from models import AdminUser
+    from werkzeug.security import generate_password_hash
+    if not AdminUser.query.filter_by(username=ADMIN_USERNAME).first():
+        db.session.add(AdminUser(username=ADMIN_USERNAME, email='bench@example.com',
+                                 password_hash=generate_password_hash(ADMIN_PASSWORD)))
+        db.session.commit()
+
+def build_routes():
+    """(name, url, needs_admin) for every benchmarked route, resolved against seeded rows"""
+    from app import db
+    from models import Project, BlogPost, Tag
+
+    project_id = db.session.query(Project.id).order_by(Project.id).first()[0]
+    category = db.session.query(Project.category).first()[0]
+    slug = db.session.query(BlogPost.slug).filter(BlogPost.is_published == True).first()[0]  # noqa: E712
+    post_id = db.session.query(BlogPost.id).first()[0]
+    tag = db.session.query(Tag.name).filter(Tag.post_count > 0).order_by(Tag.post_count.desc()).first()[0]
+
+    public = [
+        ('index', '/'),
+        ('about', '/about'),
+        ('skills', '/skills'),
+        ('projects', '/projects'),
+        ('projects_page', '/projects?page=3'),
+        ('projects_category', f'/projects?category={category}'),
+        ('project_detail', f'/project/{project_id}'),
+        ('blog', '/blog'),
+        ('blog_page', '/blog?page=5'),
+        ('blog_tag', f'/blog?tag={tag}'),
+        ('blog_detail', f'/blog/{slug}'),
+        ('search', '/search?q=flask+cache'),
+        ('contact', '/contact'),
+        ('sitemap', '/sitemap.xml'),
+        ('atom', '/feed.xml'),
+        ('rss', '/rss.xml'),
+    ]
+    admin = [
+        ('admin_dashboard', '/admin/'),
+        ('admin_projects', '/admin/projects'),
+        ('admin_project_edit', f'/admin/projects/{project_id}/edit'),
+        ('admin_blog', '/admin/blog'),
+        ('admin_blog_edit', f'/admin/blog/{post_id}/edit'),
+        ('admin_skills', '/admin/skills'),
+        ('admin_experience', '/admin/experience'),
+        ('admin_messages', '/admin/messages'),
+        ('admin_admins', '/admin/admins'),
+        ('admin_settings', '/admin/settings'),
+    ]
+    return [(name, url, False) for name, url in public] + [(name, url, True) for name, url in admin]
+
+def percentile(values, pct):
+    """Linear-interpolated percentile of an already sorted list"""
+    if not values:
+        return None
+    rank = (len(values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+def summarize(samples):
+    """Per-route statistics from {name: [(ms, statements, status, cache), ...]}.
+
+    requests/sec is derived from the summed latencies of the route itself, i.e.
+    what one client issuing that route back to back would get. Concurrent runs
+    interleave all routes, so their overall throughput is reported once for
+    the whole run (run_http's '_total'), not per route.
+    """
+    report = {}
+    for name, rows in samples.items():
+        timings = sorted(ms for ms, _, _, _ in rows)
+        statements = [sql for _, sql, _, _ in rows if sql is not None]
+        busy = sum(timings) / 1000 or 1e-9
+        report[name] = {
+            'requests': len(rows),
+            'errors': sum(1 for _, _, status, _ in rows if status >= 400),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3),
+            'rps': round(len(rows) / busy, 1),
+            'sql_mean': round(sum(statements) / len(statements), 2) if statements else None,
+            'sql_max': max(statements) if statements else None,
+            'cache_hits': sum(1 for _, _, _, cache in rows if cache == 'HIT'),
+        }
+    return report
+
+def _record(samples, name, started, response_status, headers):
+    elapsed = (time.perf_counter() - started) * 1000
+    match = _QUERIES_RE.search(headers.get('Server-Timing') or '')
+    samples.setdefault(name, []).append(
+        (elapsed, int(match.group(1)) if match else None, response_status, headers.get('X-Cache'))
+    )
+
+def run_test_client(app, routes, requests_per_route=50, warmup=3):
+    """Sequential in-process run through the Flask test client"""
+    anonymous = app.test_client()
+    admin = app.test_client()
+    admin.post('/admin/login', data={'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD})
+
+    samples = {}
+    for name, url, needs_admin in routes:
+        client = admin if needs_admin else anonymous
+        for _ in range(warmup):
+            client.get(url).close()
+        for _ in range(requests_per_route):
+            started = time.perf_counter()
+            response = client.get(url)
+            response.get_data()
+            response.close()  # streamed responses hold their request context until closed
+            _record(samples, name, started, response.status_code, response.headers)
+    return summarize(samples)
+
+def _serve(app, sock):
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    # The app's pools were reset on fork (database.init_database)
+    make_server(*sock.getsockname(), app, fd=sock.fileno()).serve_forever()
+
+def start_workers(app, workers):
+    """Fork WSGI worker processes sharing one listening socket; returns (port, processes)"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(512)
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=_serve, args=(app, sock), daemon=True) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    port = sock.getsockname()[1]
+    sock.close()
+    return port, processes
+
+def stop_workers(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join(5)
+
+def _request(port, method, url, body=None, headers=None):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        connection.request(method, url, body=body, headers=headers or {})
+        response = connection.getresponse()
+        response.read()
+        return response.status, response.headers
+    finally:
+        connection.close()
+
+def _login_cookie(port):
+    body = f'username={ADMIN_USERNAME}&password={ADMIN_PASSWORD}'
+    _, headers = _request(port, 'POST', '/admin/login', body,
+                          {'Content-Type': 'application/x-www-form-urlencoded'})
+    cookie = headers.get('Set-Cookie', '')
+    return cookie.split(';', 1)[0]
+
+def run_http(port, routes, requests_per_route=50, concurrency=8, warmup=3):
+    """Concurrent run against forked workers over real HTTP connections"""
+    cookie = _login_cookie(port)
+    jobs = [(name, url, needs_admin) for name, url, needs_admin in routes for _ in range(requests_per_route)]
+    random.Random(0).shuffle(jobs)
+    for name, url, needs_admin in routes:
+        for _ in range(warmup):
+            _request(port, 'GET', url, headers={'Cookie': cookie} if needs_admin else {})
+
+    samples = {name: [] for name, _, _ in routes}
+
+    def job(item):
+        name, url, needs_admin = item
+        started = time.perf_counter()
+        status, headers = _request(port, 'GET', url, headers={'Cookie': cookie} if needs_admin else {})
+        _record(samples, name, started, status, headers)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(job, jobs))
+    wall = time.perf_counter() - started
+    report = summarize(samples)
+    report['_total'] = {'requests': len(jobs), 'wall_seconds': round(wall, 3),
+                        'rps': round(len(jobs) / wall, 1), 'concurrency': concurrency}
+    return report
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Check that upgrade_schema() brings old and new databases to the models' schema.
+
+    python -m benchmarks.migrations
+    python -m benchmarks.migrations --database path/to/copy-of-production.db
+
+Upgrades throwaway SQLite databases the way init-db does:
+
+  - an empty database;
+  - a database adopted from before migrations existed: the baseline (0001)
+    tables without alembic_version, as db.create_all() built them;
+  - a copy of the shipped instance/portfolio.db, which predates even the
+    baseline's later tables;
+  - a copy of each --database given.
+
+Each must reach the head revision and then match the models as
+`flask db check` would see them. The process exits non-zero otherwise.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def _include_object(object, name, type_, reflected, compare_to):
+    # As in migrations/env.py: tables without a model (the search index) are managed in code
+    return not (type_ == 'table' and reflected and compare_to is None)
+
+def schema_problems(db):
+    """Differences between the primary database and the models, plus a revision that is not head"""
+    from alembic.autogenerate import compare_metadata
+    from alembic.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+    from flask import current_app
+
+    with db.engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={'include_object': _include_object})
+        problems = [repr(diff) for diff in compare_metadata(context, db.metadata)]
+        current = context.get_current_revision()
+    script = ScriptDirectory(current_app.extensions['migrate'].directory)
+    if current != script.get_current_head():
+        problems.append(f'at revision {current}, head is {script.get_current_head()}')
+    return problems
+
+def build_baseline(db):
+    """A pre-migration database: the baseline tables and no alembic_version"""
+    from flask_migrate import upgrade
+    from sqlalchemy import text
+
+    upgrade(revision='0001')
+    with db.engine.begin() as connection:
+        connection.execute(text('DROP TABLE alembic_version'))
+
+def check(name, path, prepare=None):
+    from app import create_app, db
+    from database import upgrade_schema
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    try:
+        with app.app_context():
+            if prepare:
+                prepare(db)
+            upgrade_schema()
+            problems = schema_problems(db)
+            db.engine.dispose()
+    except Exception as error:
+        problems = [f'{type(error).__name__}: {error}'.splitlines()[0]]
+    print(f"{name:<28}{'ok' if not problems else 'FAILED'}")
+    for problem in problems:
+        print(f'    {problem}')
+    return not problems
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database', action='append', default=[], help='SQLite file to upgrade a copy of')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = 'sqlite://'
+    os.environ['OUTBOX_WORKER'] = 'off'
+    os.environ['STATS_RECONCILE_INTERVAL'] = '0'
+    os.environ.pop('DATABASE_REPLICA_URL', None)
+
+    workdir = tempfile.mkdtemp()
+    copies = [os.path.join(ROOT, 'instance', 'portfolio.db')] + args.database
+    results = [
+        check('empty', os.path.join(workdir, 'empty.db')),
+        check('create_all() baseline', os.path.join(workdir, 'baseline.db'), build_baseline),
+    ]
+    for n, source in enumerate(copies):
+        if not os.path.exists(source):
+            continue
+        path = os.path.join(workdir, f'copy-{n}.db')
+        shutil.copy(source, path)
+        results.append(check(os.path.relpath(source, ROOT), path))
+    if not all(results):
+        sys.exit(1)
+    print("\nEvery database was upgraded to the models' schema.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Seed a throwaway database and benchmark every public and admin route.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --scale 5 --workers 4 --concurrency 16
+    python -m benchmarks.run --output benchmarks/results/baseline.json
+    python -m benchmarks.run --baseline benchmarks/results/baseline.json --threshold 0.15
+
+Reports p50/p95/p99 latency, requests/sec and SQL statements per request for
+an in-process test-client run and a multi-worker WSGI run. With --baseline the
+process exits non-zero when any route's p95 or SQL count regressed past the
+threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def print_report(title, report):
+    print(f"\n{title}")
+    print(f"{'route':<22}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'sql':>7}{'hits':>6}{'err':>5}")
+    for name, row in report.items():
+        if name.startswith('_'):
+            continue
+        sql = '-' if row['sql_mean'] is None else f"{row['sql_mean']:g}"
+        print(f"{name:<22}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['p99_ms']:>9.2f}"
+              f"{row['rps']:>9.1f}{sql:>7}{row['cache_hits']:>6}{row['errors']:>5}")
+    if '_total' in report:
+        total = report['_total']
+        print(f"{'total':<22}{total['requests']} requests in {total['wall_seconds']}s = {total['rps']} req/s")
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Print per-route deltas against a baseline; returns the list of regressions"""
+    regressions = []
+    print(f"\nComparison with baseline ({baseline.get('label')}, threshold {threshold:.0%})")
+    for mode in ('test_client', 'wsgi'):
+        for name, row in results.get(mode, {}).items():
+            before = baseline.get(mode, {}).get(name)
+            if name.startswith('_') or not before:
+                continue
+            p95_change = (row['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0.0
+            sql_grew = (row['sql_mean'] or 0) > (before['sql_mean'] or 0)
+            flag = ''
+            slower = p95_change > threshold and row['p95_ms'] - before['p95_ms'] > min_delta_ms
+            if slower or sql_grew:
+                flag = '  REGRESSION'
+                regressions.append(f'{mode}:{name}')
+            print(f"{mode:<12}{name:<22}p95 {before['p95_ms']:>8.2f} -> {row['p95_ms']:>8.2f} ({p95_change:+.0%})"
+                  f"  sql {before['sql_mean']} -> {row['sql_mean']}{flag}")
+    return regressions
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark public and admin routes')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplier for the seeded row counts')
+    parser.add_argument('--requests', type=int, default=50, help='timed requests per route')
+    parser.add_argument('--workers', type=int, default=4, help='WSGI worker processes (0 skips the HTTP run)')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent HTTP clients')
+    parser.add_argument('--no-page-cache', action='store_true', help='measure the render path, not cache hits')
+    parser.add_argument('--database-url', help='benchmark an existing empty database instead of a temp SQLite file')
+    parser.add_argument('--label', default=None, help='name stored in the results file')
+    parser.add_argument('--output', help='JSON results path (default benchmarks/results/<label>.json)')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='allowed relative p95 slowdown')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='ignore p95 slowdowns smaller than this (timer noise on fast routes)')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ['OUTBOX_WORKER'] = 'off'
+    os.environ['STATS_RECONCILE_INTERVAL'] = '0'
+    os.environ['IMAGE_PROCESSING'] = 'inline'
+    os.environ.pop('FREEZE_DIR', None)
+    os.environ['SQL_INSTRUMENTATION'] = '1'
+    os.environ['SERVER_TIMING'] = '1'
+    if args.no_page_cache:
+        os.environ['PAGE_CACHE_ENABLED'] = '0'
+
+    from app import create_app, db
+    from benchmarks import harness
+    from benchmarks.seed import seed
+
+    app = create_app({'WTF_CSRF_ENABLED': False})
+
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        sizes = seed(scale=args.scale)
+        harness.ensure_admin()
+        print(f"Seeded {sizes} in {time.perf_counter() - started:.1f}s")
+        routes = harness.build_routes()
+
+    label = args.label or datetime.now().strftime('%Y%m%d-%H%M%S')
+    results = {
+        'label': label,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'database': os.environ['DATABASE_URL'].split(':', 1)[0],
+        'settings': {'scale': args.scale, 'sizes': sizes, 'requests': args.requests, 'workers': args.workers,
+                     'concurrency': args.concurrency, 'page_cache': not args.no_page_cache},
+    }
+
+    results['test_client'] = harness.run_test_client(app, routes, args.requests)
+    print_report('Test client (single process, sequential)', results['test_client'])
+
+    if args.workers > 0:
+        port, processes = harness.start_workers(app, args.workers)
+        try:
+            time.sleep(0.5)
+            results['wsgi'] = harness.run_http(port, routes, args.requests, args.concurrency)
+            results['wsgi']['_total']['workers'] = args.workers
+        finally:
+            harness.stop_workers(processes)
+        print_report(f'WSGI ({args.workers} workers, {args.concurrency} clients)', results['wsgi'])
+
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results', f'{label}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as fh:
+        json.dump(results, fh, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            regressions = compare(results, json.load(fh), args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
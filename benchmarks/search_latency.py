@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Measure /search query latency against a synthetic corpus.
+
+Seeds N published blog posts and N/10 projects into a throwaway database,
+builds the full-text index and times a mix of queries through search.search().
+
+    python benchmarks/search_latency.py --docs 100000
+    DATABASE_URL=postgresql://... python benchmarks/search_latency.py --keep
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORDS = ('flask python sqlalchemy postgres index query cache latency render template '
+         'deploy docker nginx gunicorn worker thread async queue react vue design '
+         'portfolio game unity data analysis pandas chart model training api rest '
+         'security token session cookie upload image resize storage backup').split()
+
+QUERIES = ['flask', 'postgres index', 'cache latency', 'game unity', 'pand',
+           'docker nginx gunicorn', 'security token', 'nonexistentword']
+
+def build_vocabulary(rng, size=20_000):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return [''.join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size)]
+
+def sentence(rng, n, vocabulary):
+    # ~2% of words come from the topical list so queries match a realistic fraction of documents
+    return ' '.join(rng.choice(WORDS) if rng.random() < 0.02 else rng.choice(vocabulary) for _ in range(n))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--docs', type=int, default=100_000, help='number of blog posts to seed')
+    parser.add_argument('--runs', type=int, default=50, help='timed runs per query')
+    parser.add_argument('--keep', action='store_true', help='reuse DATABASE_URL instead of a temp SQLite file')
+    args = parser.parse_args()
+
+    if not args.keep or not os.environ.get('DATABASE_URL'):
+        path = os.path.join(tempfile.mkdtemp(), 'search_bench.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+
+    from app import create_app, db
+    from models import BlogPost, Project
+    from search import rebuild_search_index, search
+
+    app = create_app()
+
+    rng = random.Random(42)
+    vocabulary = build_vocabulary(rng)
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        batch = 5_000
+        for offset in range(0, args.docs, batch):
+            db.session.execute(BlogPost.__table__.insert(), [
+                {
+                    'title': sentence(rng, 6, vocabulary).title(),
+                    'slug': f'bench-post-{i}',
+                    'excerpt': sentence(rng, 20, vocabulary),
+                    'content': '<p>' + '</p><p>'.join(sentence(rng, 40, vocabulary) for _ in range(5)) + '</p>',
+                    'tags': ', '.join(rng.sample(WORDS, 3)),
+                    'is_published': True,
+                }
+                for i in range(offset, min(offset + batch, args.docs))
+            ])
+        db.session.execute(Project.__table__.insert(), [
+            {
+                'title': sentence(rng, 4, vocabulary).title(),
+                'short_description': sentence(rng, 15, vocabulary),
+                'description': '<p>' + sentence(rng, 80, vocabulary) + '</p>',
+                'category': 'web',
+            }
+            for _ in range(max(1, args.docs // 10))
+        ])
+        db.session.commit()
+        print(f"Seeded {args.docs} posts in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        rebuild_search_index()
+        print(f"Indexed in {time.perf_counter() - started:.1f}s")
+        print()
+        print(f"{'query':<24}{'hits':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+
+        for query in QUERIES:
+            timings = []
+            for run in range(args.runs):
+                page = 1 + run % 3
+                started = time.perf_counter()
+                results = search(query, page=page)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(f"{query:<24}{results.total:>8}{statistics.median(timings):>10.2f}{p95:>10.2f}{timings[-1]:>10.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Bulk-generate synthetic portfolio content through the existing models"""
+
+import random
+from datetime import date, datetime, timedelta
+
+WORDS = ('flask python sqlalchemy postgres index query cache latency render template '
+         'deploy docker nginx gunicorn worker thread async queue react vue design '
+         'portfolio game unity data analysis pandas chart model training api rest '
+         'security token session cookie upload image resize storage backup').split()
+
+PROJECT_CATEGORIES = ('web', 'game', 'data', 'mobile', 'tools')
+SKILL_CATEGORIES = ('frontend', 'backend', 'database', 'tools', 'languages', 'other')
+
+DEFAULT_SIZES = {'projects': 200, 'posts': 1000, 'skills': 60, 'experiences': 20, 'messages': 2000}
+
+def _text(rng, n):
+    return ' '.join(rng.choice(WORDS) for _ in range(n))
+
+def _html(rng, paragraphs, words):
+    return ''.join(f'<p>{_text(rng, words)}</p>' for _ in range(paragraphs))
+
+def _insert(table, rows, batch_size=2000):
+    from app import db
+    for offset in range(0, len(rows), batch_size):
+        db.session.execute(table.insert(), rows[offset:offset + batch_size])
+
+def seed(sizes=None, scale=1.0, seed_value=42):
+    """Insert synthetic rows and rebuild the derived indexes; returns the row counts used.
+
+    Must run inside an app context on an empty (throwaway) database.
+    """
+    from app import db
+    from models import Project, BlogPost, Skill, Experience, ContactMessage
+    from utils import rebuild_tag_index
+    from search import rebuild_search_index
+    from content import rebuild_rendered_content
+    from stats import reconcile_counters
+
+    sizes = {name: max(1, int(count * scale)) for name, count in {**DEFAULT_SIZES, **(sizes or {})}.items()}
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+
+    _insert(Project.__table__, [
+        {
+            'title': _text(rng, 3).title(),
+            'short_description': _text(rng, 15),
+            'description': _html(rng, 4, 60),
+            'category': rng.choice(PROJECT_CATEGORIES),
+            'tech_stack': ', '.join(rng.sample(WORDS, 4)),
+            'tags': ', '.join(rng.sample(WORDS, 3)),
+            'github_link': f'https://github.com/example/project-{i}',
+            'is_featured': i % 25 == 0,
+            'order_index': rng.randint(0, 10),
+            'created_at': now - timedelta(hours=i),
+        }
+        for i in range(sizes['projects'])
+    ])
+    _insert(BlogPost.__table__, [
+        {
+            'title': _text(rng, 6).title(),
+            'slug': f'post-{i}',
+            'excerpt': _text(rng, 25),
+            'content': _html(rng, 8, 80),
+            'tags': ', '.join(rng.sample(WORDS, 3)),
+            'is_published': i % 10 != 0,
+            'created_at': now - timedelta(hours=i),
+            'updated_at': now - timedelta(hours=i),
+        }
+        for i in range(sizes['posts'])
+    ])
+    _insert(Skill.__table__, [
+        {
+            'name': f'{rng.choice(WORDS).title()} {i}',
+            'category': SKILL_CATEGORIES[i % len(SKILL_CATEGORIES)],
+            'level': rng.randint(30, 100),
+            'order_index': i,
+        }
+        for i in range(sizes['skills'])
+    ])
+    _insert(Experience.__table__, [
+        {
+            'job_title': _text(rng, 2).title(),
+            'company': f'Company {i}',
+            'location': 'Remote',
+            'start_date': date(2010 + i % 14, 1 + i % 12, 1),
+            'end_date': None if i == 0 else date(2011 + i % 14, 1 + i % 12, 1),
+            'description': _html(rng, 2, 40),
+            'is_current': i == 0,
+            'order_index': i,
+        }
+        for i in range(sizes['experiences'])
+    ])
+    _insert(ContactMessage.__table__, [
+        {
+            'name': f'Visitor {i}',
+            'email': f'visitor{i}@example.com',
+            'subject': _text(rng, 4),
+            'message': _text(rng, 60),
+            'is_read': i % 3 != 0,
+            'created_at': now - timedelta(minutes=i),
+        }
+        for i in range(sizes['messages'])
+    ])
+    db.session.commit()
+
+    rebuild_tag_index()
+    rebuild_search_index()
+    rebuild_rendered_content()
+    reconcile_counters()
+    return sizes
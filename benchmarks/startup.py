@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Measure cold start: importing app.py and building the app with create_app().
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 20
+
+Each run is a fresh interpreter, so module imports are not cached between
+runs. The database is a throwaway SQLite file migrated once up front, which
+is what a worker starting against an existing database sees. For a
+per-module breakdown of the import step:
+
+    python -X importtime -c "import app" 2> importtime.log
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+print((imported - started) * 1000, (time.perf_counter() - imported) * 1000)
+'''
+
+SETUP = '''
+from app import create_app
+from database import upgrade_schema
+with create_app().app_context():
+    upgrade_schema()
+'''
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='interpreter starts to time')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'startup_bench.db')
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{path}', OUTBOX_WORKER='off')
+    subprocess.run([sys.executable, '-c', SETUP], cwd=ROOT, env=env, check=True, capture_output=True)
+
+    imports, creates = [], []
+    for _ in range(args.runs):
+        output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env, check=True,
+                                capture_output=True, text=True).stdout
+        imported, created = map(float, output.split()[-2:])
+        imports.append(imported)
+        creates.append(created)
+
+    print(f"{'step':<16}{'p50 ms':>10}{'min ms':>10}{'max ms':>10}")
+    for name, timings in (('import app', imports), ('create_app()', creates),
+                          ('total', [a + b for a, b in zip(imports, creates)])):
+        print(f"{name:<16}{statistics.median(timings):>10.1f}{min(timings):>10.1f}{max(timings):>10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""
+Fingerprint and precompress static assets.
+
+Run at deploy time (and after editing CSS/JS) so the app serves hashed URLs
+from the manifest instead of hashing files on first use:
+
+    python build_assets.py
+"""
+
+import argparse
+import os
+from assets import brotli, build_assets
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the static asset manifest and .gz/.br siblings')
+    parser.add_argument('--static', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'),
+                        help='static folder to process')
+    parser.add_argument('--no-compress', action='store_true', help='only write the manifest')
+    args = parser.parse_args()
+
+    manifest = build_assets(args.static, compress=not args.no_compress)
+    print(f"Fingerprinted {len(manifest)} files in {args.static}")
+    if not args.no_compress and brotli is None:
+        print("brotli is not installed; only gzip variants were written")
+
+if __name__ == '__main__':
+    main()
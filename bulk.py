@@ -0,0 +1,156 @@
+"""
+Set-based bulk actions for the admin inbox, projects and blog posts.
+
+Each action is a handful of UPDATE ... WHERE / DELETE ... WHERE statements
+over a selection of rows (checked ids, or for messages a sender and date
+filter). No ORM objects are loaded. Derived data is kept in step in the same
+transaction: the tag index and tag counts, the search index, pre-rendered
+content and the dashboard counters. The action then commits, purges the affected cached pages and
+returns the number of rows it changed.
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, select, update
+from app import db
+from cache import purge_pages
+from content import remove_rendered
+from models import ContactMessage, EmailOutbox, Project, BlogPost, blog_post_tags, project_tags, project_technologies
+from search import index_documents, remove_documents
+from stats import adjust_counter
+from utils import refresh_tag_counts
+
+_NO_SYNC = {'synchronize_session': False}
+
+def message_criteria(ids=None, email=None, start=None, end=None):
+    """WHERE criteria for a message selection; start/end are inclusive dates.
+
+    An email starting with '@' matches every sender at that domain. Raises
+    ValueError for an empty selection rather than matching the whole inbox.
+    """
+    criteria = []
+    if ids:
+        criteria.append(ContactMessage.id.in_(ids))
+    if email:
+        email = email.strip().lower()
+        if email.startswith('@'):
+            criteria.append(func.lower(ContactMessage.email).like('%' + email))
+        else:
+            criteria.append(func.lower(ContactMessage.email) == email)
+    if start is not None:
+        criteria.append(ContactMessage.created_at >= datetime.combine(start, datetime.min.time()))
+    if end is not None:
+        criteria.append(ContactMessage.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    if not criteria:
+        raise ValueError('No messages selected')
+    return criteria
+
+def _counters_changed(name, delta):
+    if delta:
+        adjust_counter(name, delta)
+        db.session.info['counters_changed'] = True
+
+def mark_messages(criteria, is_read=True):
+    """Mark the selected messages read (or unread); returns how many changed"""
+    result = db.session.execute(
+        update(ContactMessage)
+        .where(*criteria, ContactMessage.is_read == (not is_read))
+        .values(is_read=is_read),
+        execution_options=_NO_SYNC,
+    )
+    _counters_changed('unread_messages', -result.rowcount if is_read else result.rowcount)
+    db.session.commit()
+    return result.rowcount
+
+def delete_messages(criteria):
+    """Delete the selected messages; returns how many were removed"""
+    selected = select(ContactMessage.id).where(*criteria)
+    # Keep delivery history, as the ORM delete did, by detaching outbox rows first
+    db.session.execute(
+        update(EmailOutbox).where(EmailOutbox.contact_message_id.in_(selected)).values(contact_message_id=None),
+        execution_options=_NO_SYNC,
+    )
+    # Unread rows go first so the unread counter can be adjusted without a separate count
+    unread = db.session.execute(
+        delete(ContactMessage).where(*criteria, ContactMessage.is_read == False),  # noqa: E712
+        execution_options=_NO_SYNC,
+    ).rowcount
+    rest = db.session.execute(delete(ContactMessage).where(*criteria), execution_options=_NO_SYNC).rowcount
+    _counters_changed('unread_messages', -unread)
+    db.session.commit()
+    return unread + rest
+
+def set_projects_featured(ids, featured=True):
+    """Feature or unfeature projects by id; returns how many changed"""
+    changed = db.session.execute(
+        update(Project).where(Project.id.in_(ids), Project.is_featured.isnot(featured)).values(is_featured=featured)
+        .returning(Project.id),
+        execution_options=_NO_SYNC,
+    ).scalars().all()
+    db.session.commit()
+    if changed:
+        purge_pages('projects', *[f'project:{id_}' for id_ in changed])
+    return len(changed)
+
+def delete_projects(ids):
+    """Delete projects by id with their tag links and search entries; returns how many were removed"""
+    ids = db.session.execute(select(Project.id).where(Project.id.in_(ids))).scalars().all()
+    if not ids:
+        return 0
+    for table in (project_tags, project_technologies):
+        db.session.execute(delete(table).where(table.c.project_id.in_(ids)))
+    remove_documents('project', ids)
+    remove_rendered('project', ids)
+    count = db.session.execute(delete(Project).where(Project.id.in_(ids)), execution_options=_NO_SYNC).rowcount
+    _counters_changed('projects', -count)
+    db.session.commit()
+    purge_pages('projects', *[f'project:{id_}' for id_ in ids])
+    return count
+
+def _post_tag_ids(post_ids):
+    return set(db.session.execute(
+        select(blog_post_tags.c.tag_id).where(blog_post_tags.c.blog_post_id.in_(post_ids)).distinct()
+    ).scalars())
+
+def set_posts_published(ids, published=True):
+    """Publish or unpublish blog posts by id; returns how many changed"""
+    changed = db.session.execute(
+        update(BlogPost).where(BlogPost.id.in_(ids), BlogPost.is_published.isnot(published))
+        .values(is_published=published)
+        .returning(BlogPost.id, BlogPost.slug),
+        execution_options=_NO_SYNC,
+    ).all()
+    if not changed:
+        db.session.rollback()
+        return 0
+    changed_ids = [id_ for id_, _ in changed]
+    refresh_tag_counts(_post_tag_ids(changed_ids))
+    if published:
+        index_documents([
+            ('post', id_, title, excerpt, content)
+            for id_, title, excerpt, content in db.session.execute(
+                select(BlogPost.id, BlogPost.title, BlogPost.excerpt, BlogPost.content)
+                .where(BlogPost.id.in_(changed_ids))
+            )
+        ])
+    else:
+        remove_documents('post', changed_ids)
+    db.session.commit()
+    purge_pages('blog', *[f'blog:{slug}' for _, slug in changed])
+    return len(changed)
+
+def delete_posts(ids):
+    """Delete blog posts by id with their tag links and search entries; returns how many were removed"""
+    posts = db.session.execute(select(BlogPost.id, BlogPost.slug).where(BlogPost.id.in_(ids))).all()
+    if not posts:
+        return 0
+    ids = [id_ for id_, _ in posts]
+    tag_ids = _post_tag_ids(ids)
+    db.session.execute(delete(blog_post_tags).where(blog_post_tags.c.blog_post_id.in_(ids)))
+    remove_documents('post', ids)
+    remove_rendered('post', ids)
+    count = db.session.execute(delete(BlogPost).where(BlogPost.id.in_(ids)), execution_options=_NO_SYNC).rowcount
+    refresh_tag_counts(tag_ids)
+    _counters_changed('blog_posts', -count)
+    db.session.commit()
+    purge_pages('blog', *[f'blog:{slug}' for _, slug in posts])
+    return count
@@ -0,0 +1,344 @@
+import hashlib
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import current_app, g, request, session, make_response, render_template, stream_with_context
+from flask_login import current_user
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from sqlalchemy import delete, exc, func, insert, select
+from werkzeug.http import is_resource_modified
+
+logger = logging.getLogger(__name__)
+
+# Query arguments that change what a public page renders; everything else
+# (tracking parameters, cache busters) is dropped from the cache key.
+CACHE_QUERY_ARGS = ('category', 'page', 'tag', 'q', 'cursor')
+
+class TaggedCache:
+    """Bounded LRU cache with TTL and tag-based purging"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry['expires'] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key, entry, tags, ttl, max_size):
+        entry.update(tags=frozenset(tags), expires=time.monotonic() + ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def purge(self, *tags):
+        """Remove every entry carrying any of the given tags"""
+        tags = set(tags)
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry['tags'] & tags]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class ResponseCache(TaggedCache):
+    """Rendered responses of public pages"""
+
+    def set(self, key, response, tags, ttl, max_size, body=None):
+        self._store(key, {
+            'status': response.status_code,
+            'headers': [(k, v) for k, v in response.headers if k.lower() != 'set-cookie'],
+            'body': response.get_data() if body is None else body,
+        }, tags, ttl, max_size)
+
+class FragmentCache(TaggedCache):
+    """Rendered template fragments from {% cache %} blocks"""
+
+    def set(self, key, body, tags, ttl, max_size):
+        self._store(key, {'body': body}, tags, ttl, max_size)
+
+page_cache = ResponseCache()
+fragment_cache = FragmentCache()
+
+def cache_key():
+    """Build a cache key from the request path and normalized query string"""
+    args = sorted(
+        (name, value)
+        for name in CACHE_QUERY_ARGS
+        for value in request.args.getlist(name)
+        if value
+    )
+    query = '&'.join(f'{name}={value}' for name, value in args)
+    return f'{request.path}?{query}' if query else request.path
+
+def _bypass_cache():
+    if request.method != 'GET' or not current_app.config.get('PAGE_CACHE_ENABLED', True):
+        return True
+    if current_user.is_authenticated:
+        return True
+    # Pending flash messages are rendered into the page and must not be shared
+    return bool(session.get('_flashes'))
+
+def cached_page(*tags):
+    """Cache a public view's response; tags may reference view args, e.g. 'project:{id}'.
+
+    Every page is also tagged 'settings' because the base layout reads site settings.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if _bypass_cache():
+                return view(*args, **kwargs)
+
+            sync_purges()
+            key = cache_key()
+            entry = page_cache.get(key)
+            if entry is not None:
+                response = make_response(entry['body'], entry['status'], entry['headers'])
+                response.headers['X-Cache'] = 'HIT'
+                return response.make_conditional(request)
+
+            generation = _purges['generation']
+            response = make_response(view(*args, **kwargs))
+            if (response.status_code == 200 and not response.direct_passthrough and not session.modified
+                    and not _replica_may_lag()):
+                store = (key, response, page_tags(wrapper, kwargs),
+                         current_app.config.get('PAGE_CACHE_TTL', 300),
+                         current_app.config.get('PAGE_CACHE_SIZE', 512))
+                if response.is_streamed:
+                    response.response = _cache_when_sent(response.response, generation, *store)
+                elif _purges['generation'] == generation:
+                    # A purge during the render may have come after the rows it read
+                    page_cache.set(*store)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        wrapper.cache_tags = tags
+        return wrapper
+    return decorator
+
+def _replica_may_lag():
+    """Whether the response was read from a replica that may not have the last purged change yet"""
+    applied_at = _purges['applied_at']
+    return (g.get('db_replica_read', False) and applied_at is not None
+            and time.monotonic() - applied_at < current_app.config.get('DB_REPLICA_MAX_LAG', 10))
+
+def _cache_when_sent(chunks, generation, key, response, tags, ttl, max_size):
+    """Pass a streamed body through and cache it once the client has received all of it"""
+    sent = []
+    iterator = iter(chunks)
+    try:
+        for chunk in iterator:
+            chunk = chunk.encode() if isinstance(chunk, str) else chunk
+            sent.append(chunk)
+            yield chunk
+    finally:
+        if hasattr(iterator, 'close'):
+            iterator.close()
+    if _purges['generation'] == generation:
+        page_cache.set(key, response, tags, ttl, max_size, body=b''.join(sent))
+
+def page_tags(view, view_args):
+    """Resolved content tags of a cached view for the given view arguments"""
+    return {tag.format(**view_args) for tag in getattr(view, 'cache_tags', ())} | {'settings'}
+
+# Every process (gunicorn worker, CLI command) has its own caches. purge_pages()
+# records each purge in the cache_purge table, and sync_purges() replays the
+# rows other processes wrote, at most CACHE_SYNC_INTERVAL seconds apart. A page
+# or fragment can therefore outlive a purge elsewhere by that interval.
+_purges = {
+    'generation': 0,     # bumped on every purge applied here, local or replayed
+    'applied_at': None,  # monotonic time of the last one
+    'after_id': None,    # rows up to this id have been applied; None until the first sync
+    'seen': {},          # {id: monotonic time} of rows applied above after_id
+    'next_sync': 0.0,
+}
+_sync_lock = threading.Lock()
+_purge_generations = itertools.count(1)
+# A row committed late can have a lower id than one already read, so after_id
+# only moves past rows seen at least this many seconds ago
+PURGE_COMMIT_GRACE = 10
+
+def _apply_purge(tags):
+    _purges['generation'] = next(_purge_generations)
+    _purges['applied_at'] = time.monotonic()
+    fragment_cache.purge(*tags)
+    return page_cache.purge(*tags)
+
+def purge_pages(*tags):
+    """Invalidate cached pages and template fragments that depend on the given content tags.
+
+    Call it after the change is committed: the purge is recorded for the
+    other processes in a transaction of its own.
+    """
+    purged = _apply_purge(tags)
+    # After the purge, so the re-export renders the pages instead of reading the old cached copies
+    if current_app.config.get('FREEZE_DIR'):
+        from freezer import schedule_refreeze
+        schedule_refreeze(current_app._get_current_object(), tags)
+    if current_app.config.get('CACHE_SYNC_INTERVAL', 2) > 0:
+        _record_purge(tags)
+    return purged
+
+def _record_purge(tags):
+    from app import db
+    from models import CachePurge
+
+    config = current_app.config
+    # Rows older than every cache TTL can no longer match a cached entry
+    retention = max(config.get('PAGE_CACHE_TTL', 300), config.get('FRAGMENT_CACHE_TTL', 3600)) + PURGE_COMMIT_GRACE
+    with db.engine.begin() as connection:
+        purge_id = connection.execute(
+            insert(CachePurge).values(tags=sorted(set(tags)), created_at=datetime.utcnow()).returning(CachePurge.id)
+        ).scalar()
+        connection.execute(delete(CachePurge).where(
+            CachePurge.created_at < datetime.utcnow() - timedelta(seconds=retention)))
+    with _sync_lock:
+        _purges['seen'][purge_id] = time.monotonic()
+
+def sync_purges():
+    """Apply purges other processes recorded since the last sync; throttled to CACHE_SYNC_INTERVAL"""
+    interval = current_app.config.get('CACHE_SYNC_INTERVAL', 2)
+    if interval <= 0 or time.monotonic() < _purges['next_sync'] or not _sync_lock.acquire(blocking=False):
+        return
+    try:
+        now = time.monotonic()
+        _purges['next_sync'] = now + interval
+        _replay_purges(now)
+    except exc.SQLAlchemyError as error:
+        logger.warning("Could not read cache purges from other processes: %s", error)
+    finally:
+        _sync_lock.release()
+
+def _replay_purges(now):
+    from app import db
+    from models import CachePurge
+
+    # sql_trace=False: not counted against the request's queries and budget (instrumentation.py)
+    with db.engine.connect().execution_options(sql_trace=False) as connection:
+        if _purges['after_id'] is None:
+            # Nothing is cached yet in a process that never synced
+            _purges['after_id'] = connection.execute(select(func.max(CachePurge.id))).scalar() or 0
+            return
+        rows = connection.execute(
+            select(CachePurge.id, CachePurge.tags).where(CachePurge.id > _purges['after_id']).order_by(CachePurge.id)
+        ).all()
+    seen = _purges['seen']
+    tags = set()
+    for purge_id, purged in rows:
+        if purge_id not in seen:
+            seen[purge_id] = now
+            tags.update(purged)
+    if tags:
+        _apply_purge(tags)
+        if 'settings' in tags:
+            from utils import invalidate_settings_cache
+            invalidate_settings_cache()
+    settled = [purge_id for purge_id, seen_at in seen.items() if now - seen_at >= PURGE_COMMIT_GRACE]
+    if settled:
+        _purges['after_id'] = max(_purges['after_id'], *settled)
+        for purge_id in settled:
+            del seen[purge_id]
+
+class FragmentCacheExtension(Extension):
+    """{% cache key, dep, ... %}...{% endcache %}: render the body once and reuse it.
+
+    The key is any expression and is scoped to the template; the dependency
+    tags are the ones purge_pages() is called with, e.g. 'skills' or
+    'settings'. Only the body is cached, so values it reads from the context
+    must be reached lazily (e.g. a function called inside the block) to skip
+    their queries on a hit. Bodies must not depend on the user or session.
+    Purges from other processes reach fragments through sync_purges(), like
+    pages, so a fragment outlives them by at most CACHE_SYNC_INTERVAL.
+    """
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [nodes.Const(parser.name), parser.parse_expression()]
+        deps = []
+        while parser.stream.skip_if('comma'):
+            deps.append(parser.parse_expression())
+        args.append(nodes.List(deps))
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', args), [], [], body).set_lineno(lineno)
+
+    def _render(self, template, key, deps, caller):
+        config = current_app.config
+        if not config.get('FRAGMENT_CACHE_ENABLED', True):
+            return caller()
+        sync_purges()
+        key = f'{template}:{key!r}'
+        entry = fragment_cache.get(key)
+        if entry is not None:
+            return Markup(entry['body'])
+        generation = _purges['generation']
+        body = caller()
+        if _purges['generation'] == generation:
+            tags = [tag for dep in deps for tag in ((dep,) if isinstance(dep, str) else dep)]
+            fragment_cache.set(key, str(body), tags,
+                               ttl=config.get('FRAGMENT_CACHE_TTL', 3600),
+                               max_size=config.get('FRAGMENT_CACHE_SIZE', 256))
+        return Markup(body)
+
+def row_version(obj):
+    """Version string for a model row: its update timestamp, or a hash of its columns"""
+    updated_at = getattr(obj, 'updated_at', None)
+    if updated_at is not None:
+        return f'{obj.id}@{updated_at.isoformat()}'
+    values = tuple(getattr(obj, column.key) for column in obj.__table__.columns)
+    return f'{obj.id}#' + hashlib.sha1(repr(values).encode()).hexdigest()[:12]
+
+def content_etag(*parts):
+    """Strong ETag over the given content versions and the current site settings"""
+    from utils import settings_version
+    digest = hashlib.sha1(repr((parts, settings_version())).encode())
+    return digest.hexdigest()
+
+def render_conditional(etag, last_modified, template, **context):
+    """Render a template unless the client's validators still match.
+
+    Returns a bodiless 304 without touching the template when If-None-Match or
+    If-Modified-Since is satisfied.
+    """
+    return conditional_response(etag, last_modified, lambda: render_template(template, **context))
+
+def conditional_response(etag, last_modified, build, mimetype=None):
+    """Response with the body from build() unless the client's validators still match.
+
+    build returns the body, or an iterator of chunks that is streamed inside
+    the request context; it is not called for a 304.
+    """
+    if last_modified is not None:
+        last_modified = last_modified.replace(microsecond=0)
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = make_response('', 304)
+    else:
+        body = build()
+        if not isinstance(body, (str, bytes)):
+            body = stream_with_context(body)
+        response = current_app.response_class(body, mimetype=mimetype)
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    return response
@@ -0,0 +1,89 @@
+"""
+Flask CLI commands for database setup, registered on the app by create_app():
+
+    flask --app main init-db         apply schema migrations, create the search index
+    flask --app main create-admin    add an admin user (prompts for anything not given)
+    flask --app main render-content  pre-render rich text saved before it was rendered at save time
+    flask --app main media-gc        delete uploaded files no row references any more
+"""
+
+import click
+from flask.cli import with_appcontext
+from werkzeug.security import generate_password_hash
+from app import db
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Migrate the schema to the latest revision and backfill the tag index and rendered content"""
+    from content import rebuild_rendered_content
+    from database import upgrade_schema
+    from models import AdminUser, RenderedContent, Tag
+    from search import ensure_search_index
+    from utils import rebuild_tag_index
+
+    upgrade_schema()  # primary only; the read replica receives the schema from it
+    # Backfill the tag index for databases created before it existed
+    if not Tag.query.first():
+        rebuild_tag_index()
+        db.session.commit()
+    ensure_search_index()
+    if not RenderedContent.query.first():
+        rebuild_rendered_content()
+    click.echo("Database ready.")
+    if not AdminUser.query.first():
+        click.echo("No admin users yet; run 'flask create-admin'.")
+
+@click.command('create-admin')
+@click.option('--username', prompt=True)
+@click.option('--email', prompt=True)
+@click.option('--password', prompt=True, hide_input=True, confirmation_prompt=True)
+@with_appcontext
+def create_admin_command(username, email, password):
+    """Create an admin user"""
+    from models import AdminUser
+
+    if AdminUser.query.filter((AdminUser.username == username) | (AdminUser.email == email)).first():
+        raise click.ClickException(f"An admin with username '{username}' or email '{email}' already exists")
+    admin = AdminUser()
+    admin.username = username
+    admin.email = email
+    admin.password_hash = generate_password_hash(password)
+    db.session.add(admin)
+    db.session.commit()
+    click.echo(f"Admin user '{username}' created.")
+
+@click.command('render-content')
+@click.option('--force', is_flag=True, help='Re-render everything, e.g. after new image variants were built')
+@with_appcontext
+def render_content_command(force):
+    """Pre-render post, project and experience HTML whose source changed"""
+    from cache import purge_pages
+    from content import rebuild_rendered_content
+
+    written = rebuild_rendered_content(force=force)
+    purge_pages('projects', 'blog', 'experience', 'settings')
+    click.echo(f"Rendered {written} item(s).")
+
+@click.command('media-gc')
+@click.option('--grace', default=3600, show_default=True, help='Keep files changed within this many seconds')
+@click.option('--batch-size', default=500, show_default=True, help='Uploads checked per query')
+@click.option('--pause', default=0.1, show_default=True, help='Seconds to sleep between batches')
+@click.option('--dry-run', is_flag=True, help='Report what would be deleted without deleting it')
+@with_appcontext
+def media_gc_command(grace, batch_size, pause, dry_run):
+    """Delete uploads (with their variants) that no project, post, certificate or testimonial references"""
+    from flask import current_app
+    from media import collect_garbage
+
+    stats = collect_garbage(current_app.static_folder, grace=grace, batch_size=batch_size,
+                            pause=pause, dry_run=dry_run)
+    verb = 'Would remove' if dry_run else 'Removed'
+    click.echo(f"{verb} {stats['removed']} upload(s), {stats['files']} file(s), {stats['bytes']} bytes; "
+               f"kept {stats['kept']}.")
+
+def register_commands(app):
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(create_admin_command)
+    app.cli.add_command(render_content_command)
+    app.cli.add_command(media_gc_command)
@@ -0,0 +1,279 @@
+"""
+Save-time processing of rich-text fields.
+
+Blog post content, project and experience descriptions and the about_text
+setting come from CKEditor. They are processed once when the admin saves them,
+not on every request. render_html() does the following:
+
+- sanitizes the HTML with nh3 (the ammonia sanitizer) against a tag,
+  attribute and URL scheme allowlist, which also balances the tags;
+- gives images loading="lazy" and decoding="async" and, once the upload's
+  variants exist (see images.py), the same <picture> markup as the picture()
+  macro;
+- adds ids to h2/h3 headings and collects them into a table of contents;
+- derives the plain text used for the reading time and excerpt.
+
+Plain text without markup is turned into paragraphs and line breaks.
+
+Results are stored in the rendered_content table, one row per owner. For
+settings the result is a companion '<key>_html' setting. Templates output
+them as they are. `flask render-content` backfills rows saved before this
+existed, or ones whose images got their variants later.
+"""
+
+import hashlib
+import re
+from collections import namedtuple
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+import nh3
+from flask import current_app
+from sqlalchemy import delete, select, update
+from app import db
+from images import load_variants
+from models import RenderedContent, BlogPost, Project, Experience
+
+WORDS_PER_MINUTE = 200
+EXCERPT_LENGTHS = {'post': 200, 'project': 120, 'experience': 200}
+IMAGE_SIZES = '(min-width: 992px) 720px, 100vw'
+
+ALLOWED_TAGS = {
+    'p', 'br', 'hr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'strong', 'b', 'em', 'i', 'u', 's', 'sub', 'sup',
+    'a', 'ul', 'ol', 'li', 'blockquote', 'pre', 'code', 'img', 'figure', 'figcaption', 'span', 'div',
+    'table', 'thead', 'tbody', 'tfoot', 'tr', 'th', 'td', 'caption',
+}
+ALLOWED_ATTRIBUTES = {
+    '*': {'class'},
+    'a': {'href', 'title'},
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+    'ol': {'start'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan', 'scope'},
+}
+# Dropped together with everything inside them
+DROPPED_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template', 'svg', 'math',
+                'form', 'textarea', 'select', 'button'}
+BLOCK_TAGS = {'p', 'br', 'hr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'blockquote', 'pre', 'figure',
+              'figcaption', 'div', 'table', 'tr', 'th', 'td', 'caption'}
+TOC_TAGS = {'h2', 'h3'}
+URL_SCHEMES = {'http', 'https', 'mailto'}  # plus relative URLs
+
+_ID_RE = re.compile(r'[^\w-]+', re.UNICODE)
+_TAG_RE = re.compile(r'</?[a-zA-Z][^>]*>')
+
+Rendered = namedtuple('Rendered', 'html toc reading_minutes excerpt')
+
+def sanitize(source):
+    """Allowlisted, well-formed HTML: unknown tags are unwrapped, DROPPED_TAGS removed with their content"""
+    return nh3.clean(source, tags=ALLOWED_TAGS, clean_content_tags=DROPPED_TAGS, attributes=ALLOWED_ATTRIBUTES,
+                     url_schemes=URL_SCHEMES, link_rel=None, strip_comments=True)
+
+def _attributes(attrs):
+    return ''.join(f' {name}="{escape(value, quote=True)}"' if value is not None else f' {name}'
+                   for name, value in attrs)
+
+class _Renderer(HTMLParser):
+    """Adds image markup, heading ids and the table of contents to sanitized HTML"""
+
+    def __init__(self, static_folder=None):
+        super().__init__(convert_charrefs=True)
+        self.static_folder = static_folder
+        self.out = []
+        self.text = []
+        self.toc = []
+        self.heading = None       # (index in out, tag, text parts) while inside an h2/h3
+        self.heading_ids = set()
+
+    def _image(self, attrs):
+        """Markup for an <img>: a <picture> like the picture() macro once variants exist"""
+        values = dict(attrs)
+        if not values.get('src'):
+            return None
+        attrs = [(name, value) for name, value in attrs if name not in ('width', 'height')]
+        lazy = [('loading', 'lazy'), ('decoding', 'async')]
+        variants = self._variants(values['src'])
+        if not variants:
+            attrs += [(name, values[name]) for name in ('width', 'height') if values.get(name)]
+            return f'<img{_attributes(attrs + lazy)}>'
+
+        prefix = values['src'].rsplit('/', 1)[0]
+        attrs = [(name, f'{prefix}/{variants["src"].rsplit("/", 1)[-1]}' if name == 'src' else value)
+                 for name, value in attrs]
+
+        def srcset(candidates):
+            return ', '.join(f'{prefix}/{path.rsplit("/", 1)[-1]} {width}w' for path, width in candidates)
+
+        sources = ''.join(
+            f'<source{_attributes([("type", mime), ("sizes", IMAGE_SIZES), ("srcset", srcset(candidates))])}>'
+            for mime, candidates in variants['srcsets'] if mime != variants['type']
+        )
+        fallback = dict(variants['srcsets']).get(variants['type'])
+        if fallback:
+            attrs += [('srcset', srcset(fallback)), ('sizes', IMAGE_SIZES)]
+        attrs += [('width', str(variants['width'])), ('height', str(variants['height']))]
+        return f'<picture>{sources}<img{_attributes(attrs + lazy)}></picture>'
+
+    def _variants(self, src):
+        static_url = current_app.static_url_path.rstrip('/') + '/'
+        path = urlsplit(src).path
+        if not self.static_folder or not path.startswith(static_url):
+            return None
+        return load_variants(self.static_folder, path[len(static_url):])
+
+    def handle_starttag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag == 'img':
+            image = self._image(attrs)
+            if image:
+                self.out.append(image)
+            return
+        if tag == 'a' and any(name == 'href' and '//' in (value or '') for name, value in attrs):
+            attrs.append(('rel', 'noopener'))
+        if tag in TOC_TAGS and self.heading is None:
+            self.heading = (len(self.out), tag, [])
+        self.out.append(f'<{tag}{_attributes(attrs)}>')
+
+    def handle_endtag(self, tag):
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        self.out.append(f'</{tag}>')
+        if self.heading and self.heading[1] == tag:
+            self._finish_heading()
+
+    def _finish_heading(self):
+        index, tag, parts = self.heading
+        self.heading = None
+        title = ' '.join(''.join(parts).split())
+        if not title:
+            return
+        base = _ID_RE.sub('-', title.lower()).strip('-')[:60] or 'section'
+        anchor, n = base, 2
+        while anchor in self.heading_ids:
+            anchor, n = f'{base}-{n}', n + 1
+        self.heading_ids.add(anchor)
+        self.out[index] = self.out[index][:-1] + f' id="{anchor}">'
+        self.toc.append({'level': int(tag[1]), 'id': anchor, 'title': title})
+
+    def handle_data(self, data):
+        self.out.append(escape(data, quote=False))
+        self.text.append(data)
+        if self.heading:
+            self.heading[2].append(data)
+
+    def finish(self):
+        self.close()
+        return ''.join(self.out), ' '.join(''.join(self.text).split())
+
+def _paragraphs(text):
+    """Markup for plain text: blank lines separate paragraphs, single newlines become <br>"""
+    blocks = [block.strip() for block in re.split(r'\n\s*\n', text.replace('\r\n', '\n').replace('\r', '\n'))]
+    return ''.join('<p>' + '<br>'.join(escape(line) for line in block.split('\n')) + '</p>'
+                   for block in blocks if block)
+
+def excerpt_of(text, length):
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(' ', 1)[0]
+    return cut.rstrip(' ,.;:') + '...'
+
+def render_html(source, excerpt_length=200, static_folder=None):
+    """Sanitize and enrich one rich-text value; returns a Rendered tuple"""
+    source = source or ''
+    if not _TAG_RE.search(source):
+        source = _paragraphs(source)
+    renderer = _Renderer(static_folder)
+    renderer.feed(sanitize(source))
+    html, text = renderer.finish()
+    words = len(text.split())
+    return Rendered(html, renderer.toc, max(1, round(words / WORDS_PER_MINUTE)), excerpt_of(text, excerpt_length))
+
+def source_hash(source):
+    return hashlib.sha1((source or '').encode()).hexdigest()
+
+def _row(owner_type, owner_id, source):
+    rendered = render_html(source, EXCERPT_LENGTHS[owner_type], current_app.static_folder)
+    return {'owner_type': owner_type, 'owner_id': owner_id, 'html': rendered.html, 'toc': rendered.toc,
+            'reading_minutes': rendered.reading_minutes, 'excerpt': rendered.excerpt,
+            'source_hash': source_hash(source)}
+
+def store_rendered(owner_type, owner_id, source, force=False):
+    """Render one field and upsert its rendered_content row; runs in the caller's transaction"""
+    row = db.session.get(RenderedContent, (owner_type, owner_id))
+    if row is not None and not force and row.source_hash == source_hash(source):
+        return row
+    values = _row(owner_type, owner_id, source)
+    if row is None:
+        row = RenderedContent()
+        db.session.add(row)
+    for key, value in values.items():
+        setattr(row, key, value)
+    return row
+
+def render_post(post):
+    """Pre-render a blog post's content after an admin save"""
+    db.session.flush()
+    store_rendered('post', post.id, post.content)
+
+def render_project(project):
+    """Pre-render a project's description after an admin save"""
+    db.session.flush()
+    store_rendered('project', project.id, project.description)
+
+def render_experience(experience):
+    """Pre-render an experience entry's description after an admin save"""
+    db.session.flush()
+    store_rendered('experience', experience.id, experience.description)
+
+def render_setting(value):
+    """Rendered HTML for a rich-text setting, saved alongside it as '<key>_html'"""
+    return render_html(value, static_folder=current_app.static_folder).html
+
+def insert_rendered(documents):
+    """Bulk-insert rows for freshly created owners from (owner type, id, source) tuples"""
+    if documents:
+        db.session.execute(RenderedContent.__table__.insert(),
+                           [_row(owner_type, owner_id, source) for owner_type, owner_id, source in documents])
+
+def remove_rendered(owner_type, owner_ids):
+    """Drop the rows of deleted owners; runs in the caller's transaction"""
+    if owner_ids:
+        db.session.execute(delete(RenderedContent).where(RenderedContent.owner_type == owner_type,
+                                                         RenderedContent.owner_id.in_(owner_ids)),
+                           execution_options={'synchronize_session': False})
+
+RENDERED_SOURCES = (('post', BlogPost, BlogPost.content), ('project', Project, Project.description),
+                    ('experience', Experience, Experience.description))
+
+def rebuild_rendered_content(force=False, batch_size=500):
+    """Render every field whose source changed since it was stored (all of them with force);
+    returns the number of rows written"""
+    from utils import get_setting, set_settings
+
+    written = 0
+    for owner_type, model, column in RENDERED_SOURCES:
+        stored = dict(db.session.execute(
+            select(RenderedContent.owner_id, RenderedContent.source_hash)
+            .where(RenderedContent.owner_type == owner_type)
+        ).all())
+        pending = [(owner_id, source)
+                   for owner_id, source in db.session.execute(select(model.id, column).order_by(model.id))
+                   if force or stored.get(owner_id) != source_hash(source)]
+        for offset in range(0, len(pending), batch_size):
+            rows = [_row(owner_type, owner_id, source) for owner_id, source in pending[offset:offset + batch_size]]
+            new = [row for row in rows if row['owner_id'] not in stored]
+            changed = [row for row in rows if row['owner_id'] in stored]
+            if new:
+                db.session.execute(RenderedContent.__table__.insert(), new)
+            if changed:
+                # ORM bulk UPDATE by primary key, one executemany per batch
+                db.session.execute(update(RenderedContent), changed)
+            db.session.commit()
+            written += len(rows)
+
+    about_text = get_setting('about_text')
+    if about_text:
+        set_settings({'about_text_html': render_setting(about_text)})
+        written += 1
+    return written
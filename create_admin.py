@@ -13,9 +13,11 @@ from werkzeug.security import generate_password_hash
 # Add the current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from app import app, db
+from app import create_app, db
 from models import AdminUser
 
+app = create_app()
+
 def create_admin():
     """Create a new admin user"""
     print("=== Portfolio Admin User Creation ===")
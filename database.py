@@ -0,0 +1,342 @@
+"""
+Database engine and connection pool configuration.
+
+engine_options() turns the DB_* settings in app.config (read from the
+environment in app.py) into SQLALCHEMY_ENGINE_OPTIONS. The settings apply
+per process, so with gunicorn the database sees up to
+
+    workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+
+connections, which must stay below max_connections (or the PgBouncer pool).
+
+PostgreSQL:
+    DB_POOL_PRE_PING     test connections on checkout so ones the server or a
+                         proxy dropped while idle are replaced, not failed
+    DB_POOL_RECYCLE      seconds after which connections are reopened
+    DB_STATEMENT_TIMEOUT milliseconds, sent as a startup option (0 disables)
+    DB_PGBOUNCER         for PgBouncer in transaction mode: no pooling here
+                         (PgBouncer pools) and no startup options, which
+                         PgBouncer rejects. Set statement_timeout on the role
+                         instead (ALTER ROLE ... SET statement_timeout).
+
+SQLite (local use): WAL journal, synchronous=NORMAL, and SQLITE_BUSY_TIMEOUT
+instead of "database is locked" errors while another process writes.
+
+Pool checkouts, wait times, timeouts and invalidated connections are counted
+per process for the admin performance page. Forked children (gunicorn
+--preload workers, multiprocessing) start with an empty pool.
+
+Read replica (DATABASE_REPLICA_URL, bound as 'replica'): views decorated with
+@use_replica run their GET/HEAD queries there through RoutingSession; all
+writes, flushes and every other request use the primary. After a request
+commits a write, the client's session records when (and on PostgreSQL the
+primary's WAL position). Its replica reads go to the primary until the
+replica has replayed that position, or DB_REPLICA_MAX_LAG seconds have
+passed. If the replica errors, the view is retried on the primary and the
+replica is skipped for DB_REPLICA_RETRY seconds. For DB_REPLICA_MAX_LAG
+seconds after a cache purge, pages rendered from the replica are not cached,
+so a lagging replica cannot put the purged content back for a whole TTL.
+
+To try it locally with two SQLite files, copy the database and point the
+replica at the copy; writes then show up on public pages only once the copy is
+refreshed (sqlite3 primary.db ".backup replica.db"):
+
+    DATABASE_URL=sqlite:////path/primary.db
+    DATABASE_REPLICA_URL=sqlite:////path/replica.db
+
+Schema changes are Alembic migrations in migrations/versions (Flask-Migrate:
+flask db migrate / flask db upgrade). upgrade_schema(), run by init-db,
+also adopts databases created with db.create_all() before migrations existed.
+"""
+
+import logging
+import os
+import threading
+import time
+import weakref
+from functools import wraps
+from flask import current_app, g, has_app_context, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, QueuePool
+
+REPLICA_BIND = 'replica'
+
+logger = logging.getLogger(__name__)
+
+def normalize_database_url(url):
+    """Accept the postgres:// scheme hosting providers hand out, which SQLAlchemy rejects"""
+    if url and url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+class PoolStats:
+    """Checkout counters for the current process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.connects = 0
+            self.invalidated = 0
+            self.timeouts = 0
+            self.waited = 0       # checkouts that had to wait for a free connection
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def record_checkout(self, seconds, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            if seconds > 0.001:
+                self.waited += 1
+                self.wait_total += seconds
+                self.wait_max = max(self.wait_max, seconds)
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+pool_stats = PoolStats()
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.record_checkout(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_stats.record_checkout(time.perf_counter() - started)
+        return connection
+
+def engine_options(config, url=None):
+    """Engine options for a database URL, by default the primary's (SQLALCHEMY_ENGINE_OPTIONS)"""
+    url = url or config.get('SQLALCHEMY_DATABASE_URI')
+    if not url:
+        return {}
+    url = make_url(url)
+
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            return {}  # Flask-SQLAlchemy sets up a StaticPool for in-memory databases
+        return {
+            'poolclass': InstrumentedQueuePool,
+            'pool_size': config['DB_POOL_SIZE'],
+            'max_overflow': config['DB_MAX_OVERFLOW'],
+            'pool_timeout': config['DB_POOL_TIMEOUT'],
+            'connect_args': {'timeout': config['SQLITE_BUSY_TIMEOUT'] / 1000},
+        }
+
+    connect_args = {}
+    if url.get_backend_name() == 'postgresql':
+        connect_args['connect_timeout'] = config['DB_CONNECT_TIMEOUT']
+        if config['DB_STATEMENT_TIMEOUT'] and not config['DB_PGBOUNCER']:
+            connect_args['options'] = f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT']}"
+
+    if config['DB_PGBOUNCER']:
+        if config['DB_STATEMENT_TIMEOUT']:
+            logger.warning("DB_STATEMENT_TIMEOUT is ignored with DB_PGBOUNCER; set statement_timeout on the role")
+        return {'poolclass': NullPool, 'connect_args': connect_args}
+
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'connect_args': connect_args,
+    }
+
+def _sqlite_pragmas(wal):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if wal:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+    return on_connect
+
+def replica_bind(config):
+    """SQLALCHEMY_BINDS entry for the read replica, or None when there is none"""
+    url = config.get('DATABASE_REPLICA_URL')
+    if not url:
+        return None
+    return {'url': url, **engine_options(config, url)}
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica inside @use_replica views"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and not getattr(clause, 'is_dml', False)
+                and has_app_context() and g.get('db_replica')):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _flushed(session, flush_context):
+    session.info['wrote'] = True
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _executed(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['wrote'] = True
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _committed(session):
+    if session.info.pop('wrote', False) and has_request_context():
+        g.db_committed = True
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _rolled_back(session):
+    session.info.pop('wrote', None)
+
+_replica_down_until = 0.0
+
+def _replica_failed(error):
+    global _replica_down_until
+    _replica_down_until = time.monotonic() + current_app.config['DB_REPLICA_RETRY']
+    logger.warning("Read replica failed, using the primary for %ss: %s", current_app.config['DB_REPLICA_RETRY'], error)
+
+def _replica_usable(db):
+    """Whether this request may read from the replica: it is up and has the client's last write"""
+    if REPLICA_BIND not in db.engines or time.monotonic() < _replica_down_until:
+        return False
+    marker = session.get('db_write')
+    if not marker:
+        return True
+    written_at, position = marker
+    if time.time() - written_at > current_app.config['DB_REPLICA_MAX_LAG']:
+        session.pop('db_write')
+        return True
+    replica = db.engines[REPLICA_BIND]
+    if not position or replica.dialect.name != 'postgresql':
+        return False
+    try:
+        with replica.connect() as connection:
+            caught_up = connection.execute(
+                text('SELECT pg_last_wal_replay_lsn() >= CAST(:position AS pg_lsn)'), {'position': position}
+            ).scalar()
+    except exc.DBAPIError as error:
+        _replica_failed(error)
+        return False
+    if caught_up:
+        session.pop('db_write')
+    return bool(caught_up)
+
+def use_replica(view):
+    """Run a view's GET/HEAD queries on the read replica, falling back to the primary"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        from app import db
+
+        if request.method not in ('GET', 'HEAD') or not _replica_usable(db):
+            return view(*args, **kwargs)
+        g.db_replica = True
+        g.db_replica_read = True  # tells cached_page the response may predate a purge
+        try:
+            return view(*args, **kwargs)
+        except exc.DBAPIError as error:
+            if not g.get('db_replica_error'):
+                raise
+            _replica_failed(error)
+            db.session.rollback()
+            g.db_replica = g.db_replica_read = False
+            return view(*args, **kwargs)
+        finally:
+            g.db_replica = False
+    return wrapper
+
+def _replica_error(context):
+    # Tells use_replica that a failure came from the replica, not the primary
+    if has_app_context():
+        g.db_replica_error = True
+
+def _remember_write(response):
+    """After a committed write, pin the client's replica reads until the replica catches up"""
+    if g.get('db_committed'):
+        from app import db
+
+        position = None
+        if db.engine.dialect.name == 'postgresql':
+            with db.engine.connect() as connection:
+                position = connection.execute(text('SELECT pg_current_wal_lsn()::text')).scalar()
+        session['db_write'] = [time.time(), position]
+    return response
+
+# Engines of every app in this process, disposed in forked children. The hook is
+# registered once: create_app() runs per test and would otherwise stack them up.
+_fork_engines = weakref.WeakSet()
+_fork_hook_registered = False
+
+def _reset_pools():
+    # close=False: the parent still owns those sockets; the child just drops its references
+    for engine in list(_fork_engines):
+        engine.dispose(close=False)
+    pool_stats._lock = threading.Lock()  # the parent's lock may have been held mid-fork
+    pool_stats.reset()
+
+def init_database(app):
+    """Set up the app's engines: SQLite profile, pool statistics and a pool reset after fork"""
+    from app import db
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', _sqlite_pragmas(app.config['SQLITE_WAL']))
+        event.listen(engine, 'connect', lambda *args: pool_stats.count('connects'))
+        event.listen(engine, 'invalidate', lambda *args: pool_stats.count('invalidated'))
+    if app.config.get('DATABASE_REPLICA_URL'):
+        with app.app_context():
+            event.listen(db.engines[REPLICA_BIND], 'handle_error', _replica_error)
+        app.after_request(_remember_write)
+
+    global _fork_hook_registered
+    _fork_engines.update(engines)
+    if not _fork_hook_registered:
+        os.register_at_fork(after_in_child=_reset_pools)
+        _fork_hook_registered = True
+
+def pool_status():
+    """Live pool state and this process's checkout statistics"""
+    from app import db
+
+    pool = db.engine.pool
+    status = {
+        'pool_class': type(pool).__name__,
+        'checkouts': pool_stats.checkouts,
+        'connects': pool_stats.connects,
+        'invalidated': pool_stats.invalidated,
+        'timeouts': pool_stats.timeouts,
+        'waited': pool_stats.waited,
+        'wait_mean_ms': pool_stats.wait_total / pool_stats.waited * 1000 if pool_stats.waited else 0.0,
+        'wait_max_ms': pool_stats.wait_max * 1000,
+    }
+    if isinstance(pool, QueuePool):
+        status.update(size=pool.size(), checked_out=pool.checkedout(), checked_in=pool.checkedin(),
+                      overflow=max(pool.overflow(), 0), max_overflow=pool._max_overflow,
+                      timeout=pool.timeout())
+    return status
+
+def upgrade_schema():
+    """Migrate the primary database to the latest revision (flask db upgrade).
+
+    Databases created with db.create_all() before migrations existed have
+    tables but no alembic_version. The baseline revision creates its tables
+    and indexes only if they do not exist, so such a database gets the
+    baseline tables it is missing, as 0001 defines them rather than as the
+    models look today. It then takes the later revisions like any other.
+    """
+    from flask_migrate import upgrade
+
+    upgrade()
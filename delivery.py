@@ -0,0 +1,139 @@
+"""
+Static file bodies: handed to the front proxy, or sent with byte ranges.
+
+Downloads of the resume PDF (static/files) and of uploaded images
+(static/uploads) can keep a worker busy for as long as a slow client takes
+to read them. With STATIC_DELIVERY set, the static view only resolves and
+checks the file. It then returns an empty response carrying the file's
+location, and the proxy sends the body itself, handling Range and
+conditional requests. 'x-accel' (nginx) sends STATIC_ACCEL_PREFIX plus the
+static path, served by an internal location:
+
+    location /_static/ {
+        internal;
+        alias /path/to/static/;
+    }
+
+'x-sendfile' (Apache mod_xsendfile, lighttpd) sends the absolute path.
+Content-Type, Cache-Control and Content-Disposition are set by the app as
+usual, and the proxy keeps them.
+
+Everything else, and every file in the default 'app' mode, goes through
+send_static_file(). It checks If-None-Match/If-Modified-Since before Range,
+so a cached copy gets a 304 even when a range is asked for. It honours a
+single byte range when If-Range is absent or matches exactly: a strong ETag
+or the Last-Modified date. Otherwise, and for several ranges at once, it
+sends the whole file, which RFC 9110 allows.
+"""
+
+import os
+import zlib
+from datetime import datetime, timezone
+from urllib.parse import quote
+from flask import current_app, request
+from werkzeug.datastructures import ContentRange
+from werkzeug.exceptions import NotFound
+from werkzeug.http import is_resource_modified, parse_date
+from werkzeug.security import safe_join
+from werkzeug.wsgi import wrap_file
+
+OFFLOAD_DIRS = ('files/', 'uploads/')   # large bodies worth handing to the proxy
+CHUNK_SIZE = 64 * 1024
+
+def send_static_file(static_folder, filename, mimetype, max_age=None, download_name=None, offload=False):
+    """Response for a file under static_folder; offload lets STATIC_DELIVERY pass it to the proxy"""
+    path = safe_join(static_folder, filename)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+    path = os.path.abspath(path)
+
+    response = current_app.response_class(mimetype=mimetype, direct_passthrough=True)
+    if max_age is None:
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    _set_disposition(response, download_name or os.path.basename(filename))
+
+    mode = current_app.config.get('STATIC_DELIVERY', 'app')
+    if offload and mode == 'x-accel':
+        prefix = current_app.config.get('STATIC_ACCEL_PREFIX', '/_static/')
+        response.headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(filename.replace(os.sep, '/'))
+        return response
+    if offload and mode == 'x-sendfile':
+        response.headers['X-Sendfile'] = path
+        return response
+    return _send_ranges(response, path)
+
+def _set_disposition(response, name):
+    try:
+        name.encode('ascii')
+    except UnicodeEncodeError:
+        response.headers['Content-Disposition'] = f"inline; filename*=UTF-8''{quote(name)}"
+    else:
+        response.headers.set('Content-Disposition', 'inline', filename=name)
+
+def _send_ranges(response, path):
+    stat = os.stat(path)
+    size = stat.st_size
+    last_modified = datetime.fromtimestamp(int(stat.st_mtime), timezone.utc)
+    # The path tells a file from its precompressed sibling written in the same second
+    etag = f'{stat.st_mtime_ns:x}-{size:x}-{zlib.adler32(path.encode()):x}'
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.accept_ranges = 'bytes'
+
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response.status_code = 304
+        return response
+
+    span = _requested_range(size, etag, last_modified)
+    if span is False:
+        response.status_code = 416
+        response.headers['Content-Range'] = f'bytes */{size}'
+        return response
+    start, stop = span or (0, size)
+    if span:
+        response.status_code = 206
+        response.content_range = ContentRange('bytes', start, stop, size)
+    response.content_length = stop - start
+    if request.method != 'HEAD':
+        if span:
+            response.response = _read_range(path, start, stop)
+        else:
+            # Lets the server use sendfile() through wsgi.file_wrapper
+            response.response = wrap_file(request.environ, open(path, 'rb'))
+    return response
+
+def _requested_range(size, etag, last_modified):
+    """(start, stop) of the one range to send, None for the whole file, False if unsatisfiable"""
+    ranges = request.range  # None when absent or malformed, which means ignore it
+    if ranges is None or ranges.units != 'bytes' or len(ranges.ranges) != 1:
+        return None
+    if_range = request.headers.get('If-Range')
+    if if_range:
+        if if_range.startswith(('"', 'W/')):
+            # Strong comparison: a weak validator never matches
+            if if_range != f'"{etag}"':
+                return None
+        elif parse_date(if_range) != last_modified:
+            return None
+    start, stop = ranges.ranges[0]
+    if start < 0:  # suffix range: the last -start bytes, or all of a shorter file
+        start, stop = max(size + start, 0), size
+    else:
+        stop = size if stop is None else min(stop, size)
+    if start >= size:
+        return False
+    return start, stop
+
+def _read_range(path, start, stop):
+    with open(path, 'rb') as fh:
+        fh.seek(start)
+        remaining = stop - start
+        while remaining:
+            chunk = fh.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Export contact messages, blog posts or projects as CSV or JSON Lines.
+
+    python export_data.py messages --status unread --start 2025-01-01 -o unread.csv
+    python export_data.py posts --format jsonl -o posts.jsonl.gz
+    python export_data.py projects --format jsonl > projects.jsonl
+    python export_data.py messages --spreadsheet -o messages.csv
+
+CSV values are exported as stored, ready for import_data.py; --spreadsheet
+escapes values that a spreadsheet app would run as formulas.
+
+Output ending in .gz is gzip-compressed. Rows are streamed, so memory use
+does not grow with the table size.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('OUTBOX_WORKER', 'off')
+
+from app import create_app
+from exports import EXPORTS, FORMATS, parse_date, stream_export
+
+app = create_app()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stream table exports as CSV or JSON Lines')
+    parser.add_argument('kind', choices=sorted(EXPORTS))
+    parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+    parser.add_argument('--start', type=parse_date, help='first created_at date to include (YYYY-MM-DD)')
+    parser.add_argument('--end', type=parse_date, help='last created_at date to include (YYYY-MM-DD)')
+    parser.add_argument('--status', choices=('read', 'unread'), help='messages only')
+    parser.add_argument('-o', '--output', help='output file (default: stdout)')
+    parser.add_argument('--gzip', action='store_true', help='compress even when the name lacks .gz')
+    parser.add_argument('--spreadsheet', action='store_true',
+                        help='CSV only: quote values starting with = + - @ so spreadsheets show them as text')
+    args = parser.parse_args()
+
+    compress = args.gzip or bool(args.output and args.output.endswith('.gz'))
+    is_read = {'read': True, 'unread': False}.get(args.status)
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        with app.app_context():
+            for chunk in stream_export(args.kind, args.format, compress, args.spreadsheet,
+                                       start=args.start, end=args.end, is_read=is_read):
+                out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
@@ -0,0 +1,117 @@
+"""
+Streaming CSV / JSON Lines export of messages, blog posts and projects.
+
+Rows are read with yield_per, which uses a server-side cursor on PostgreSQL,
+and formatted chunk by chunk, with optional gzip compression as the chunks
+are produced. Memory use stays flat however large the table is. The same
+generators back the admin download views and export_data.py.
+
+CSV values are written as stored, so an export can be re-imported
+(importer.py) unchanged. For files meant to be opened in a spreadsheet,
+spreadsheet=True prefixes text that starts like a formula (= + - @, tab,
+carriage return) with a single quote, so visitor-supplied text is not
+evaluated.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timedelta
+from sqlalchemy import select
+from app import db
+from models import ContactMessage, BlogPost, Project
+
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+BATCH_SIZE = 1000   # rows fetched per round trip
+CHUNK_ROWS = 200    # rows formatted per yielded chunk
+
+# kind -> (model, exported columns)
+EXPORTS = {
+    'messages': (ContactMessage, ('id', 'name', 'email', 'subject', 'message', 'is_read', 'created_at')),
+    'posts': (BlogPost, ('id', 'title', 'slug', 'excerpt', 'content', 'tags', 'is_published',
+                         'created_at', 'updated_at')),
+    'projects': (Project, ('id', 'title', 'short_description', 'description', 'category', 'tech_stack',
+                           'tags', 'github_link', 'live_link', 'is_featured', 'order_index', 'created_at')),
+}
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD filter value; empty values mean no bound"""
+    return date.fromisoformat(value) if value else None
+
+def export_statement(kind, start=None, end=None, is_read=None):
+    """SELECT for one export; start/end are inclusive dates, is_read only applies to messages"""
+    model, columns = EXPORTS[kind]
+    stmt = select(*[getattr(model, name) for name in columns]).order_by(model.id)
+    if start is not None:
+        stmt = stmt.where(model.created_at >= datetime.combine(start, datetime.min.time()))
+    if end is not None:
+        stmt = stmt.where(model.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    if is_read is not None and kind == 'messages':
+        stmt = stmt.where(ContactMessage.is_read == is_read)
+    return stmt
+
+def iter_rows(kind, **filters):
+    result = db.session.execute(export_statement(kind, **filters).execution_options(yield_per=BATCH_SIZE))
+    try:
+        for partition in result.partitions():
+            yield from partition
+    finally:
+        result.close()
+
+def _csv_value(value, spreadsheet=False):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ', timespec='seconds')
+    if spreadsheet and isinstance(value, str) and value[:1] in ('=', '+', '-', '@', '\t', '\r'):
+        # Keep spreadsheet apps from evaluating visitor-supplied text as a formula
+        return "'" + value
+    return value
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+def iter_csv(kind, spreadsheet=False, **filters):
+    columns = EXPORTS[kind][1]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for count, row in enumerate(iter_rows(kind, **filters), 1):
+        writer.writerow([_csv_value(value, spreadsheet) for value in row])
+        if count % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def iter_jsonl(kind, **filters):
+    columns = EXPORTS[kind][1]
+    lines = []
+    for row in iter_rows(kind, **filters):
+        lines.append(json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False))
+        if len(lines) == CHUNK_ROWS:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+def gzip_chunks(chunks, level=6):
+    """Compress an iterable of text chunks into gzip bytes as it is consumed"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+def stream_export(kind, fmt, compress=False, spreadsheet=False, **filters):
+    """Byte chunks of a complete export file; spreadsheet escapes formula-like CSV values"""
+    chunks = iter_csv(kind, spreadsheet, **filters) if fmt == 'csv' else iter_jsonl(kind, **filters)
+    if compress:
+        return gzip_chunks(chunks)
+    return (chunk.encode() for chunk in chunks)
+
+def export_filename(kind, fmt, compress=False):
+    stamp = datetime.utcnow().strftime('%Y%m%d')
+    return f'{kind}-{stamp}.{fmt}' + ('.gz' if compress else '')
@@ -0,0 +1,179 @@
+"""
+sitemap.xml and the Atom (/feed.xml) and RSS (/rss.xml) feeds.
+
+The sitemap lists the static pages, every project and every published post,
+posts with <lastmod> from BlogPost.updated_at. Past SITEMAP_MAX_URLS URLs,
+/sitemap.xml becomes a sitemap index of numbered files per section
+(/sitemap-posts-2.xml). Posts are listed oldest first, so new ones land in
+the last file and earlier files keep their content. Rows are read with
+yield_per and the XML is written in chunks like exports.py, so a large
+sitemap streams with flat memory. The feeds carry the FEED_ENTRIES newest
+published posts.
+
+post_versions() and project_versions() are single aggregate queries (count,
+newest timestamp, id sum). They give the views their ETag, and the sitemap
+its file count, without reading the rows, so a conditional GET that matches
+costs two small queries. No Last-Modified is sent: deleting or unpublishing
+a post does not move the newest timestamp, so If-Modified-Since alone would
+keep serving the removed entry. The id sum in the ETag does change.
+"""
+
+import math
+from collections import namedtuple
+from xml.sax.saxutils import escape, quoteattr
+from flask import url_for
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+from werkzeug.http import http_date
+from app import db
+from models import BlogPost, Project
+from utils import get_setting
+
+BATCH_SIZE = 1000   # rows fetched per round trip
+CHUNK_URLS = 500    # <url> elements per yielded chunk
+
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+
+# Pages without rows of their own; they make up the 'pages' section
+STATIC_ENDPOINTS = ('main.index', 'main.about', 'main.projects', 'main.skills', 'main.blog', 'main.contact')
+
+Versions = namedtuple('Versions', 'count newest id_sum')
+
+def _published():
+    return BlogPost.is_published == True  # noqa: E712
+
+def post_versions():
+    """Count, newest updated_at and id sum of the published posts"""
+    row = db.session.execute(
+        select(func.count(), func.max(BlogPost.updated_at), func.coalesce(func.sum(BlogPost.id), 0))
+        .where(_published())
+    ).one()
+    return Versions(*row)
+
+def project_versions():
+    """Count, newest created_at and id sum of the projects (they have no update timestamp)"""
+    row = db.session.execute(
+        select(func.count(), func.max(Project.created_at), func.coalesce(func.sum(Project.id), 0))
+    ).one()
+    return Versions(*row)
+
+def sitemap_sections(posts, projects, max_urls):
+    """(section, number) of every sitemap file, given the post and project versions"""
+    sections = [('pages', 1)]
+    for section, versions in (('projects', projects), ('posts', posts)):
+        sections += [(section, number) for number in range(1, math.ceil(versions.count / max_urls) + 1)]
+    return sections
+
+def _page_urls(offset, limit):
+    for endpoint in STATIC_ENDPOINTS[offset:offset + limit if limit else None]:
+        yield url_for(endpoint, _external=True), None
+
+def _project_urls(offset, limit):
+    stmt = select(Project.id).order_by(Project.id).offset(offset).limit(limit)
+    for project_id, in _stream(stmt):
+        yield url_for('main.project_detail', id=project_id, _external=True), None
+
+def _post_urls(offset, limit):
+    # Served in order by ix_blog_post_published
+    stmt = (select(BlogPost.slug, BlogPost.updated_at).where(_published())
+            .order_by(BlogPost.created_at, BlogPost.id).offset(offset).limit(limit))
+    for slug, updated_at in _stream(stmt):
+        yield url_for('main.blog_detail', slug=slug, _external=True), updated_at
+
+SECTIONS = {'pages': _page_urls, 'projects': _project_urls, 'posts': _post_urls}
+
+def _stream(stmt):
+    result = db.session.execute(stmt.execution_options(yield_per=BATCH_SIZE))
+    try:
+        for partition in result.partitions():
+            yield from partition
+    finally:
+        result.close()
+
+def sitemap_urls(section=None, number=1, max_urls=None):
+    """(loc, lastmod) for one sitemap file, or for the whole site when section is None"""
+    if section is None:
+        for urls in SECTIONS.values():
+            yield from urls(0, None)
+    else:
+        yield from SECTIONS[section]((number - 1) * max_urls, max_urls)
+
+def _w3c_datetime(value):
+    # Timestamps are stored as naive UTC
+    return value.replace(microsecond=0).isoformat() + '+00:00'
+
+def iter_urlset(urls):
+    """Text chunks of a <urlset> document"""
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n'
+    lines = []
+    for loc, lastmod in urls:
+        lastmod = f'<lastmod>{_w3c_datetime(lastmod)}</lastmod>' if lastmod else ''
+        lines.append(f'<url><loc>{escape(loc)}</loc>{lastmod}</url>\n')
+        if len(lines) == CHUNK_URLS:
+            yield ''.join(lines)
+            lines = []
+    yield ''.join(lines) + '</urlset>\n'
+
+def sitemap_index(sections):
+    """<sitemapindex> document pointing at the numbered sitemap files"""
+    entries = ''.join(
+        f"<sitemap><loc>{escape(url_for('main.sitemap_file', section=section, number=number, _external=True))}</loc></sitemap>\n"
+        for section, number in sections
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NS}">\n{entries}</sitemapindex>\n'
+
+def recent_posts(limit):
+    return (BlogPost.query.options(joinedload(BlogPost.rendered)).filter(_published())
+            .order_by(BlogPost.created_at.desc(), BlogPost.id.desc()).limit(limit).all())
+
+def _site():
+    return get_setting('site_title') or 'Portfolio', get_setting('site_description') or ''
+
+def atom_feed(posts, updated):
+    """Atom 1.0 document for the given posts; updated is the feed's last change"""
+    title, description = _site()
+    home = url_for('main.index', _external=True)
+    parts = [
+        f'<?xml version="1.0" encoding="utf-8"?>\n<feed xmlns="{ATOM_NS}">\n',
+        f'<title>{escape(title)}</title>\n',
+        f'<subtitle>{escape(description)}</subtitle>\n' if description else '',
+        f"<link rel=\"self\" href={quoteattr(url_for('main.atom', _external=True))}/>\n",
+        f'<link href={quoteattr(home)}/>\n<id>{escape(home)}</id>\n',
+        f'<updated>{_w3c_datetime(updated)}</updated>\n<author><name>{escape(title)}</name></author>\n',
+    ]
+    for post in posts:
+        url = url_for('main.blog_detail', slug=post.slug, _external=True)
+        parts.append(
+            f'<entry>\n<title>{escape(post.title)}</title>\n<link href={quoteattr(url)}/>\n<id>{escape(url)}</id>\n'
+            f'<published>{_w3c_datetime(post.created_at)}</published>\n'
+            f'<updated>{_w3c_datetime(post.updated_at or post.created_at)}</updated>\n'
+            + ''.join(f'<category term={quoteattr(tag.name)}/>\n' for tag in post.tag_items)
+            + f'<summary>{escape(str(post.summary))}</summary>\n'
+            # Rendered bodies link to /static/... relative to the site
+            f'<content type="html" xml:base={quoteattr(home)}>{escape(str(post.content_html))}</content>\n'
+            '</entry>\n'
+        )
+    parts.append('</feed>\n')
+    return ''.join(parts)
+
+def rss_feed(posts, updated):
+    """RSS 2.0 document for the given posts"""
+    title, description = _site()
+    parts = [
+        f'<?xml version="1.0" encoding="utf-8"?>\n<rss version="2.0" xmlns:atom="{ATOM_NS}">\n<channel>\n',
+        f"<title>{escape(title)}</title>\n<link>{escape(url_for('main.index', _external=True))}</link>\n",
+        f'<description>{escape(description or title)}</description>\n',
+        f"<atom:link rel=\"self\" type=\"application/rss+xml\" href={quoteattr(url_for('main.rss', _external=True))}/>\n",
+        f'<lastBuildDate>{http_date(updated)}</lastBuildDate>\n',
+    ]
+    for post in posts:
+        url = url_for('main.blog_detail', slug=post.slug, _external=True)
+        parts.append(
+            f'<item>\n<title>{escape(post.title)}</title>\n<link>{escape(url)}</link>\n'
+            f'<guid isPermaLink="true">{escape(url)}</guid>\n<pubDate>{http_date(post.created_at)}</pubDate>\n'
+            + ''.join(f'<category>{escape(tag.name)}</category>\n' for tag in post.tag_items)
+            + f'<description>{escape(str(post.content_html))}</description>\n</item>\n'
+        )
+    parts.append('</channel>\n</rss>\n')
+    return ''.join(parts)
@@ -1,5 +1,5 @@
 from flask_wtf import FlaskForm
-from flask_wtf.file import FileField, FileAllowed
+from flask_wtf.file import FileField, FileAllowed, FileRequired
 from wtforms import StringField, TextAreaField, IntegerField, BooleanField, SelectField, DateField, PasswordField
 from wtforms.validators import DataRequired, Email, Length, NumberRange, Optional
 from wtforms.widgets import TextArea
@@ -95,3 +95,13 @@ class SettingsForm(FlaskForm):
     github_url = StringField('GitHub URL')
     linkedin_url = StringField('LinkedIn URL')
     twitter_url = StringField('Twitter URL')
+
+class ImportForm(FlaskForm):
+    kind = SelectField('Content Type', choices=[
+        ('projects', 'Projects'),
+        ('posts', 'Blog Posts'),
+        ('skills', 'Skills'),
+        ('experience', 'Experience')
+    ])
+    file = FileField('File', validators=[FileRequired(), FileAllowed(['csv', 'jsonl', 'gz'], 'CSV, JSONL or .gz files only')])
+    dry_run = BooleanField('Validate only (dry run)')
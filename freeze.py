@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Export the public site as static HTML for nginx to serve directly.
+
+    python freeze.py build/site                      # full export
+    python freeze.py build/site --tags project:5     # only pages affected by a change
+
+Tags are the page-cache tags the admin purges: projects, project:<id>, blog,
+blog:<slug>, skills, experience and settings. See freezer.py for the nginx
+configuration. Setting FREEZE_DIR makes the app re-export affected pages on
+every admin save.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Rendering pages must not start the app's background delivery threads
+os.environ.setdefault('OUTBOX_WORKER', 'off')
+os.environ.setdefault('STATS_RECONCILE_INTERVAL', '0')
+
+from app import create_app
+from freezer import freeze_site
+
+app = create_app()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export the public site to static HTML')
+    parser.add_argument('output', nargs='?', default=os.environ.get('FREEZE_DIR', 'build/site'),
+                        help='output directory')
+    parser.add_argument('--tags', nargs='+', help='only re-export pages depending on these content tags')
+    args = parser.parse_args()
+
+    with app.app_context():
+        started = time.perf_counter()
+        stats = freeze_site(app, args.output, args.tags)
+        print(f"✅ Exported to {args.output} in {time.perf_counter() - started:.2f}s: "
+              f"{stats['written']} written, {stats['skipped']} unchanged, {stats['removed']} removed")
@@ -0,0 +1,195 @@
+"""
+Static export of the public site.
+
+freeze_site() renders every public page through the app itself and writes
+the HTML to a directory that nginx serves directly. Only /contact (and the
+free-text /search) stay dynamic. Each exported page records the content tags
+the page cache already uses ('projects', 'project:5', 'blog:<slug>',
+'settings', ...). Passing the tags an admin change purged re-exports only the
+pages that depend on them. Pages that no longer exist are removed.
+
+File layout (query-string listings use one file per argument combination):
+
+    /                       -> index.html
+    /about                  -> about.html
+    /project/5              -> project/5.html
+    /projects?category=web  -> projects/category=web&page=.html
+    /blog?tag=flask&page=2  -> blog/page=2&tag=flask.html
+
+Matching nginx configuration:
+
+    location = /projects { default_type text/html; try_files "/projects/category=${arg_category}&page=${arg_page}.html" @app; }
+    location = /blog     { default_type text/html; try_files "/blog/page=${arg_page}&tag=${arg_tag}.html" @app; }
+    location /contact    { proxy_pass http://app; }
+    location /search     { proxy_pass http://app; }
+    location /admin      { proxy_pass http://app; }
+    location = /         { default_type text/html; try_files /index.html @app; }
+    location /           { default_type text/html; try_files $uri.html @app; }
+
+Static files are served from the app's static folder as described in assets.py.
+"""
+
+import json
+import logging
+import math
+import os
+import queue
+import threading
+from urllib.parse import urlsplit
+from flask import url_for
+from sqlalchemy import func
+from app import db
+from cache import page_tags
+from models import Project, BlogPost, Tag
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = '.freeze-manifest.json'
+STATIC_EXPORT_ENVIRON = 'portfolio.static_export'  # set on export requests; listings then ignore CURSOR_PAGINATION
+
+# Listing endpoints whose query arguments select the page, in file-name order
+LISTING_ARGS = {
+    'main.projects': ('category', 'page'),
+    'main.blog': ('page', 'tag'),
+}
+
+def _raw_query(query_string):
+    # Keep values exactly as url_for encoded them, since nginx's $arg_* is not decoded either
+    return dict(part.split('=', 1) for part in query_string.split('&') if '=' in part)
+
+def output_path(endpoint, url):
+    """Relative file an exported URL is written to"""
+    parts = urlsplit(url)
+    path = parts.path.strip('/')
+    if endpoint in LISTING_ARGS:
+        args = _raw_query(parts.query)
+        name = '&'.join(f'{key}={args.get(key, "")}' for key in LISTING_ARGS[endpoint])
+        return f'{path}/{name}.html'
+    return f'{path}.html' if path else 'index.html'
+
+def _listing_pages(total, per_page):
+    return max(1, math.ceil(total / per_page))
+
+def public_pages():
+    """Yield (endpoint, view args, query args) for every page the site can currently render"""
+    from routes.main import PROJECTS_PER_PAGE, BLOG_PER_PAGE
+
+    for endpoint in ('main.index', 'main.about', 'main.skills'):
+        yield endpoint, {}, {}
+
+    categories = db.session.query(Project.category, func.count()).group_by(Project.category).all()
+    listings = [(None, sum(count for _, count in categories))] + [(c, n) for c, n in categories if c]
+    for category, total in listings:
+        yield 'main.projects', {}, {'category': category}
+        for page in range(1, _listing_pages(total, PROJECTS_PER_PAGE) + 1):
+            yield 'main.projects', {}, {'category': category, 'page': page}
+
+    for project_id, in db.session.query(Project.id).order_by(Project.id):
+        yield 'main.project_detail', {'id': project_id}, {}
+
+    published = BlogPost.query.filter_by(is_published=True)
+    listings = [(None, published.count())] + [
+        (tag.name, tag.post_count)
+        for tag in Tag.query.filter(Tag.post_count > 0).order_by(Tag.name)
+    ]
+    for tag, total in listings:
+        yield 'main.blog', {}, {'tag': tag}
+        for page in range(1, _listing_pages(total, BLOG_PER_PAGE) + 1):
+            yield 'main.blog', {}, {'page': page, 'tag': tag}
+
+    for slug, in db.session.query(BlogPost.slug).filter(BlogPost.is_published == True).order_by(BlogPost.id):  # noqa: E712
+        yield 'main.blog_detail', {'slug': slug}, {}
+
+def _load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME)) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+def _write_atomic(path, data, mode='wb'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, mode) as fh:
+        fh.write(data)
+    os.replace(tmp_path, path)
+
+def _remove(output_dir, relative):
+    try:
+        os.remove(os.path.join(output_dir, relative))
+    except FileNotFoundError:
+        pass
+
+def freeze_site(app, output_dir, tags=None):
+    """Export the public site to output_dir; with tags, only pages depending on them.
+
+    Returns a dict with 'written', 'skipped' and 'removed' counts.
+    """
+    previous = _load_manifest(output_dir)
+    changed = set(tags) if tags is not None else None
+    stats = {'written': 0, 'skipped': 0, 'removed': 0}
+    manifest = {}
+
+    with app.test_request_context():
+        pages = []
+        for endpoint, view_args, query_args in public_pages():
+            url = url_for(endpoint, **view_args, **{k: v for k, v in query_args.items() if v is not None})
+            file_tags = sorted(page_tags(app.view_functions[endpoint], view_args))
+            pages.append((url, output_path(endpoint, url), file_tags))
+        db.session.remove()
+
+    client = app.test_client()
+    for url, relative, file_tags in pages:
+        if relative in manifest:
+            continue
+        manifest[relative] = {'url': url, 'tags': file_tags}
+        if changed is not None and relative in previous and not changed.intersection(file_tags):
+            stats['skipped'] += 1
+            continue
+        response = client.get(url, environ_base={STATIC_EXPORT_ENVIRON: True})
+        if response.status_code != 200:
+            logger.warning("Freeze: %s returned %s", url, response.status_code)
+            manifest.pop(relative)
+            _remove(output_dir, relative)
+            continue
+        _write_atomic(os.path.join(output_dir, relative), response.get_data())
+        stats['written'] += 1
+
+    for relative in previous.keys() - manifest.keys():
+        _remove(output_dir, relative)
+        stats['removed'] += 1
+    _write_atomic(os.path.join(output_dir, MANIFEST_NAME), json.dumps(manifest, indent=0, sort_keys=True), 'w')
+    return stats
+
+_pending = queue.Queue()
+_worker = None
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+def _refreeze_loop(app):
+    while True:
+        tags = set(_pending.get())
+        # Coalesce changes that arrived while the previous export ran
+        while not _pending.empty():
+            tags.update(_pending.get_nowait())
+        with app.app_context():
+            try:
+                stats = freeze_site(app, app.config['FREEZE_DIR'], tags)
+                logger.info("Re-exported pages for %s: %s", sorted(tags), stats)
+            except Exception:
+                logger.exception("Static re-export failed")
+            finally:
+                db.session.remove()
+
+def schedule_refreeze(app, tags):
+    """Queue an incremental re-export of pages tagged with any of tags"""
+    global _worker, _worker_pid
+    _pending.put(tuple(tags))
+    if _worker_pid == os.getpid() and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker_pid == os.getpid() and _worker.is_alive():
+            return
+        _worker = threading.Thread(target=_refreeze_loop, args=(app,), name='static-refreeze', daemon=True)
+        _worker.start()
+        _worker_pid = os.getpid()
@@ -0,0 +1,167 @@
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, features
+
+# This module must not import the Flask app: process_upload() runs in spawned
+# worker processes that only need Pillow.
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (320, 480, 640, 960, 1280)
+MANIFEST_SUFFIX = '.variants.json'
+
+_MIME_TYPES = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'WEBP': 'image/webp', 'AVIF': 'image/avif'}
+_EXTENSIONS = {'WEBP': '.webp', 'AVIF': '.avif'}
+
+def _modern_formats():
+    """Next-gen formats this Pillow build can encode, best first"""
+    formats = []
+    if features.check('avif'):
+        formats.append('AVIF')
+    if features.check('webp'):
+        formats.append('WEBP')
+    return formats
+
+def manifest_path(file_path):
+    stem, _ = os.path.splitext(file_path)
+    return stem + MANIFEST_SUFFIX
+
+def _save_atomic(img, file_path, fmt, **options):
+    tmp_path = f'{file_path}.tmp'
+    img.save(tmp_path, format=fmt, **options)
+    os.replace(tmp_path, file_path)
+
+def _encode_options(fmt, quality):
+    if fmt == 'PNG':
+        return {'optimize': True}
+    return {'quality': quality}
+
+def process_upload(file_path, max_size=None, widths=VARIANT_WIDTHS, quality=82):
+    """Write a downscaled copy of an upload, width/format variants and a manifest.
+
+    Runs in a worker process. JPEGs are decoded in draft mode so the decoder
+    scales them down while reading, keeping memory bounded for huge uploads.
+    The upload itself is never rewritten: its name is the hash of its bytes
+    (media.py). With max_size the downscaled copy, re-encoded without
+    metadata, is written as the full-width variant and recorded as the
+    manifest's 'src', which pages show instead of the upload.
+    """
+    with Image.open(file_path) as img:
+        fmt = img.format
+        if getattr(img, 'is_animated', False):
+            return None
+
+        if max_size:
+            img.draft(img.mode, max_size)
+            img.thumbnail(max_size, Image.Resampling.LANCZOS)
+        else:
+            img.load()
+
+        width, height = img.size
+        directory = os.path.dirname(file_path)
+        stem, ext = os.path.splitext(os.path.basename(file_path))
+        targets = [w for w in widths if w < width] + [width]
+
+        src = os.path.basename(file_path)
+        if max_size:
+            src = f'{stem}-{width}w{ext}'
+            _save_atomic(img, os.path.join(directory, src), fmt, **_encode_options(fmt, 85))
+
+        sources = {}
+        for target in targets:
+            resized = img if target == width else img.resize(
+                (target, max(1, round(height * target / width))), Image.Resampling.LANCZOS
+            )
+            variant_formats = _modern_formats()
+            if fmt in ('JPEG', 'PNG') and target != width:
+                variant_formats.append(fmt)
+            for variant_format in variant_formats:
+                name = f'{stem}-{target}w{_EXTENSIONS.get(variant_format, ext)}'
+                _save_atomic(resized, os.path.join(directory, name), variant_format,
+                             **_encode_options(variant_format, quality))
+                sources.setdefault(_MIME_TYPES[variant_format], []).append([name, target])
+
+        # The downscaled copy (or the upload) is the largest candidate of its own type,
+        # unless the loop above already wrote that format at full width
+        if fmt in _MIME_TYPES and fmt not in _modern_formats():
+            sources.setdefault(_MIME_TYPES[fmt], []).append([src, width])
+
+        manifest = {'width': width, 'height': height, 'type': _MIME_TYPES.get(fmt), 'src': src,
+                    'sources': sources}
+        tmp_path = manifest_path(file_path) + '.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump(manifest, fh)
+        os.replace(tmp_path, manifest_path(file_path))
+        return manifest
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor(max_workers):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: workers never inherit the parent's DB connections or threads
+            _executor = ProcessPoolExecutor(max_workers=max_workers,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+def _log_failure(future):
+    exc = future.exception()
+    if exc is not None:
+        logger.error("Image processing failed: %s", exc)
+
+def schedule_processing(file_path, max_size=None, max_workers=2, inline=False):
+    """Queue process_upload() on the worker pool, or run it now when inline is set"""
+    if inline:
+        try:
+            return process_upload(file_path, max_size)
+        except Exception as e:
+            logger.error("Image processing failed: %s", e)
+            return None
+    future = _get_executor(max_workers).submit(process_upload, file_path, max_size)
+    future.add_done_callback(_log_failure)
+    return future
+
+_manifest_cache = {}
+
+def load_variants(static_folder, image_path):
+    """Return the variant manifest for a static-relative image path, or None if not built yet.
+
+    Manifests are cached per path and re-read only when the file's mtime changes.
+    """
+    if not image_path:
+        return None
+    path = manifest_path(os.path.join(static_folder, image_path))
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    cached = _manifest_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    try:
+        with open(path) as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+    prefix = os.path.dirname(image_path)
+    # Manifests written before 'src' existed belong to uploads that were downscaled in place
+    src = manifest.get('src') or os.path.basename(image_path)
+    manifest['src'] = f'{prefix}/{src}' if prefix else src
+    manifest['srcsets'] = [
+        (mime, [(f'{prefix}/{name}' if prefix else name, width) for name, width in candidates])
+        for mime, candidates in sorted(manifest['sources'].items(), key=lambda item: _source_order(item[0]))
+    ]
+    _manifest_cache[path] = (mtime, manifest)
+    return manifest
+
+def _source_order(mime):
+    # <source> elements are tried in order, so list the most efficient formats first
+    order = ('image/avif', 'image/webp')
+    return order.index(mime) if mime in order else len(order)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Bulk-import projects, blog posts, skills or experience from CSV or JSON Lines.
+
+    python import_data.py posts posts.jsonl
+    python import_data.py projects projects.csv --batch-size 500
+    python import_data.py skills skills.csv --dry-run
+
+Column names match the admin form fields (e.g. title, slug, content, tags,
+is_published for posts), plus created_at/updated_at and image_path as written
+by export_data.py. Rows failing validation are skipped and listed.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('OUTBOX_WORKER', 'off')
+
+from app import create_app
+from importer import IMPORTS, import_records, read_records
+
+app = create_app()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bulk-import content from CSV or JSONL')
+    parser.add_argument('kind', choices=sorted(IMPORTS))
+    parser.add_argument('path', help='.csv or .jsonl file (optionally .gz)')
+    parser.add_argument('--batch-size', type=int, default=1000, help='rows per INSERT and commit')
+    parser.add_argument('--dry-run', action='store_true', help='validate only, write nothing')
+    args = parser.parse_args()
+
+    with app.app_context(), open(args.path, 'rb') as fh:
+        started = time.perf_counter()
+        result = import_records(args.kind, read_records(fh, args.path), args.batch_size, args.dry_run)
+        elapsed = time.perf_counter() - started
+
+    for line, errors in result.errors:
+        details = '; '.join(f"{field}: {', '.join(messages)}" for field, messages in errors.items())
+        print(f"line {line}: {details}")
+    verb = 'Validated' if args.dry_run else 'Imported'
+    print(f"✅ {verb} {result.imported} {args.kind} in {elapsed:.2f}s, skipped {result.skipped} invalid rows")
@@ -0,0 +1,261 @@
+"""
+Bulk import of projects, blog posts, skills and experience from CSV or JSONL.
+
+Every record is validated with the same WTForms form the admin uses (one
+form instance, re-processed per record). Valid rows are written in chunks:
+one multi-row INSERT ... RETURNING per chunk, with the tag index, tag counts,
+search index, pre-rendered content and dashboard counters updated alongside
+it, and one commit per chunk. Invalid records are skipped and reported with their line
+numbers. Blog slugs go through utils.create_slug and get a numeric suffix
+when they collide with an existing or earlier imported post.
+
+created_at / updated_at values in the file (as written by exports.py) are
+kept; rows without them are stamped with the import time. An image_path must
+name an existing file under static/uploads.
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import posixpath
+from collections import Counter
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import insert, select
+from werkzeug.datastructures import MultiDict
+from werkzeug.security import safe_join
+from wtforms import BooleanField
+from app import db
+from cache import purge_pages
+from content import insert_rendered
+from forms import ProjectForm, BlogPostForm, SkillForm, ExperienceForm
+from models import Project, BlogPost, Skill, Experience, blog_post_tags, project_tags, project_technologies
+from search import index_documents
+from stats import adjust_counter
+from utils import create_slug, unique_slug, parse_tags, parse_tech_stack, bulk_attach_tags, adjust_tag_counts
+
+MAX_REPORTED_ERRORS = 200
+TIMESTAMP_COLUMNS = ('created_at', 'updated_at')
+_TRUE_VALUES = ('1', 'true', 'yes', 'y', 'on')
+
+class ImportResult:
+    def __init__(self, kind):
+        self.kind = kind
+        self.imported = 0
+        self.skipped = 0
+        self.errors = []   # (line number, {field: [messages]}) for the first MAX_REPORTED_ERRORS rows
+
+    def add_error(self, line, errors):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, errors))
+
+def _project_row(form):
+    return {
+        'title': form.title.data,
+        'short_description': form.short_description.data,
+        'description': form.description.data,
+        'category': form.category.data,
+        'tech_stack': form.tech_stack.data,
+        'tags': form.tags.data,
+        'github_link': form.github_link.data,
+        'live_link': form.live_link.data,
+        'is_featured': form.is_featured.data,
+        'order_index': form.order_index.data or 0,
+    }
+
+def _post_row(form):
+    return {
+        'title': form.title.data,
+        'slug': form.slug.data,
+        'excerpt': form.excerpt.data,
+        'content': form.content.data,
+        'tags': form.tags.data,
+        'is_published': form.is_published.data,
+    }
+
+def _skill_row(form):
+    return {
+        'name': form.name.data,
+        'category': form.category.data,
+        'level': form.level.data,
+        'order_index': form.order_index.data or 0,
+    }
+
+def _experience_row(form):
+    return {
+        'job_title': form.job_title.data,
+        'company': form.company.data,
+        'location': form.location.data,
+        'start_date': form.start_date.data,
+        'end_date': form.end_date.data,
+        'description': form.description.data,
+        'is_current': form.is_current.data,
+        'order_index': form.order_index.data or 0,
+    }
+
+# kind -> (form, model, row builder, dashboard counter, page-cache tag)
+IMPORTS = {
+    'projects': (ProjectForm, Project, _project_row, 'projects', 'projects'),
+    'posts': (BlogPostForm, BlogPost, _post_row, 'blog_posts', 'blog'),
+    'skills': (SkillForm, Skill, _skill_row, 'skills', 'skills'),
+    'experience': (ExperienceForm, Experience, _experience_row, None, 'experience'),
+}
+
+def read_records(stream, filename):
+    """Yield (line number, dict) from a CSV or JSONL upload; .gz files are decompressed.
+
+    A JSONL line holding anything but an object yields None for its record,
+    which import_records() reports as an invalid row.
+    """
+    if filename.endswith('.gz'):
+        stream = gzip.open(stream)
+        filename = filename[:-3]
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if filename.endswith('.csv'):
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record
+    else:
+        for line_number, line in enumerate(text, 1):
+            if line.strip():
+                record = json.loads(line)
+                yield line_number, record if isinstance(record, dict) else None
+
+def _boolean_fields(form_class):
+    return {name for name, field in vars(form_class).items()
+            if getattr(field, 'field_class', None) is BooleanField}
+
+def _formdata(record, booleans):
+    data = MultiDict()
+    for key, value in record.items():
+        if value is None or value == '':
+            # Empty CSV cells count as absent so fields fall back to their defaults
+            continue
+        if key in booleans:
+            if value is True or str(value).strip().lower() in _TRUE_VALUES:
+                data[key] = 'y'
+            continue
+        if isinstance(value, list):
+            value = ', '.join(str(item) for item in value)
+        data[key] = str(value)
+    return data
+
+def _parse_timestamp(value):
+    """Naive UTC datetime from an ISO 8601 value, the form the columns are stored in"""
+    value = datetime.fromisoformat(str(value).strip())
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _upload_path(value):
+    """Static-relative path of an existing file under static/uploads, or None"""
+    path = posixpath.normpath(str(value).strip().lstrip('/'))
+    if not path.startswith('uploads/') or len(path) > 200:
+        return None
+    full_path = safe_join(current_app.static_folder, path)
+    return path if full_path and os.path.isfile(full_path) else None
+
+def _source_columns(table, record, now):
+    """Timestamps and image path taken from the record as is; returns (values, errors)"""
+    # Every row carries every column: a multi-row insert takes its keys from the first row
+    values, errors = {}, {}
+    for name in TIMESTAMP_COLUMNS:
+        if name not in table.c:
+            continue
+        value = record.get(name)
+        try:
+            values[name] = _parse_timestamp(value) if value not in (None, '') else now
+        except (TypeError, ValueError):
+            errors[name] = ['Not an ISO 8601 date and time.']
+    if 'image_path' in table.c:
+        path = _upload_path(record['image_path']) if record.get('image_path') else None
+        if record.get('image_path') and path is None:
+            errors['image_path'] = ['Not an existing file under static/uploads.']
+        values['image_path'] = path
+    return values, errors
+
+def import_records(kind, records, batch_size=1000, dry_run=False):
+    """Validate and insert records [(line, dict), ...]; returns an ImportResult.
+
+    Must run inside an app context. With dry_run nothing is written.
+    """
+    form_class, model, build_row, counter, cache_tag = IMPORTS[kind]
+    booleans = _boolean_fields(form_class)
+    result = ImportResult(kind)
+    taken_slugs = set(db.session.execute(select(BlogPost.slug)).scalars()) if kind == 'posts' else None
+    form = form_class(meta={'csrf': False})
+
+    now = datetime.utcnow()
+    chunk = []
+    for line, record in records:
+        if record is None:
+            result.add_error(line, {'record': ['Not an object of field names and values.']})
+            continue
+        if kind == 'posts' and not str(record.get('slug') or '').strip():
+            record = dict(record, slug=create_slug(str(record.get('title') or '')))
+        form.process(_formdata(record, booleans))
+        if not form.validate():
+            result.add_error(line, form.errors)
+            continue
+        source, errors = _source_columns(model.__table__, record, now)
+        if errors:
+            result.add_error(line, errors)
+            continue
+        row = build_row(form)
+        row.update(source)
+        if kind == 'posts':
+            row['slug'] = unique_slug(create_slug(row['slug']) or create_slug(row['title']), taken_slugs)
+        chunk.append(row)
+        if len(chunk) >= batch_size:
+            _write_chunk(kind, model, counter, chunk, dry_run)
+            result.imported += len(chunk)
+            chunk = []
+    if chunk:
+        _write_chunk(kind, model, counter, chunk, dry_run)
+        result.imported += len(chunk)
+    if result.imported and not dry_run:
+        purge_pages(cache_tag)
+    return result
+
+# Columns read back from INSERT ... RETURNING to build the derived index rows
+_RETURNED_COLUMNS = {
+    'posts': ('title', 'excerpt', 'content', 'tags', 'is_published'),
+    'projects': ('title', 'short_description', 'description', 'tags', 'tech_stack'),
+    'experience': ('description',),
+}
+
+def _write_chunk(kind, model, counter, rows, dry_run):
+    """Insert one chunk and its derived index rows in a single transaction"""
+    if dry_run:
+        return
+    table = model.__table__
+    # The derived rows come from RETURNING itself rather than from zipping ids with
+    # the input, so no row order is needed and SQLite can batch the INSERT.
+    returned = [table.c[name] for name in _RETURNED_COLUMNS.get(kind, ())]
+    inserted = db.session.execute(insert(table).returning(table.c.id, *returned), rows).all()
+
+    if kind == 'posts':
+        tag_ids = bulk_attach_tags(blog_post_tags, 'blog_post_id', {row.id: parse_tags(row.tags) for row in inserted})
+        adjust_tag_counts(Counter(tag_id for row in inserted if row.is_published
+                                  for tag_id in tag_ids.get(row.id, ())))
+        index_documents([('post', row.id, row.title, row.excerpt, row.content)
+                         for row in inserted if row.is_published])
+        insert_rendered([('post', row.id, row.content) for row in inserted])
+    elif kind == 'projects':
+        bulk_attach_tags(project_tags, 'project_id', {row.id: parse_tags(row.tags) for row in inserted})
+        bulk_attach_tags(project_technologies, 'project_id',
+                         {row.id: parse_tech_stack(row.tech_stack) for row in inserted})
+        index_documents([('project', row.id, row.title, row.short_description, row.description)
+                         for row in inserted])
+        insert_rendered([('project', row.id, row.description) for row in inserted])
+    elif kind == 'experience':
+        insert_rendered([('experience', row.id, row.description) for row in inserted])
+
+    if counter:
+        # Core inserts bypass the ORM flush hook that maintains the counters
+        adjust_counter(counter, len(inserted))
+        db.session.info['counters_changed'] = True
+    db.session.commit()
@@ -1,5 +1,17 @@
-from app import app, db
+from app import create_app
+from utils import rebuild_tag_index
+from search import rebuild_search_index
+from content import rebuild_rendered_content
+from database import upgrade_schema
+
+app = create_app()
 
 with app.app_context():
-    db.create_all()
+    upgrade_schema()
     print("Database created successfully!")
+    rebuild_tag_index()
+    print("Tag index rebuilt.")
+    rebuild_search_index()
+    print("Search index rebuilt.")
+    rebuild_rendered_content()
+    print("Rich text pre-rendered.")
@@ -0,0 +1,172 @@
+"""
+Per-request SQL instrumentation.
+
+Cursor-execute hooks count statements and database time for the current
+request and group them by statement pattern, so the same query repeated per
+row (an N+1) stands out. Each response gets a Server-Timing header
+(db;dur=...;desc="N queries", app;dur=...). Every request is logged at
+DEBUG, and suspected N+1 patterns at WARNING. Totals are aggregated per
+endpoint for the admin "slow endpoints" page.
+
+Views can declare a query budget with @query_budget(n), or via the
+QUERY_BUDGETS config mapping of endpoint to limit. With QUERY_BUDGET_MODE set
+to 'raise', a request over budget raises QueryBudgetExceeded, which fails
+tests driving it through the test client. 'warn' only logs.
+
+Statements run with the sql_trace=False execution option (the cache purge
+sync in cache.py) are left out of the counts.
+
+Streamed responses (exports, sitemaps) run queries while the body is sent,
+after the totals are taken: their Server-Timing and per-endpoint numbers
+cover only the queries issued before streaming started, and no budget is
+enforced for them.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_SIZE = 200  # recent request durations kept per endpoint for percentiles
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_IN_LIST_RE = re.compile(r'IN \((?:\?|%s|%\(\w+\)s)(?:, ?(?:\?|%s|%\(\w+\)s))*\)')
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+def query_budget(limit):
+    """Declare the maximum number of SQL statements a view may issue per request"""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+def statement_pattern(statement):
+    """Normalize a statement so the same query with different IN-list sizes groups together"""
+    return _IN_LIST_RE.sub('IN (...)', _WHITESPACE_RE.sub(' ', statement).strip())
+
+class EndpointStats:
+    """Per-endpoint request, time and query totals for this process"""
+
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, total_ms, db_ms, queries, duplicates):
+        with self._lock:
+            entry = self._endpoints.get(endpoint)
+            if entry is None:
+                entry = self._endpoints[endpoint] = {
+                    'requests': 0, 'total_ms': 0.0, 'db_ms': 0.0, 'queries': 0, 'max_queries': 0,
+                    'n_plus_one': 0, 'last_pattern': None, 'recent': deque(maxlen=SAMPLE_SIZE),
+                }
+            entry['requests'] += 1
+            entry['total_ms'] += total_ms
+            entry['db_ms'] += db_ms
+            entry['queries'] += queries
+            entry['max_queries'] = max(entry['max_queries'], queries)
+            entry['recent'].append(total_ms)
+            if duplicates:
+                entry['n_plus_one'] += 1
+                entry['last_pattern'] = duplicates[0][0]
+
+    def snapshot(self):
+        """Rows for every endpoint, slowest p95 first"""
+        with self._lock:
+            items = [(endpoint, dict(entry, recent=sorted(entry['recent'])))
+                     for endpoint, entry in self._endpoints.items()]
+        rows = []
+        for endpoint, entry in items:
+            recent = entry['recent']
+            requests = entry['requests']
+            rows.append({
+                'endpoint': endpoint,
+                'requests': requests,
+                'mean_ms': entry['total_ms'] / requests,
+                'p95_ms': recent[min(len(recent) - 1, int(len(recent) * 0.95))],
+                'max_ms': recent[-1],
+                'db_ms': entry['db_ms'] / requests,
+                'queries': entry['queries'] / requests,
+                'max_queries': entry['max_queries'],
+                'n_plus_one': entry['n_plus_one'],
+                'last_pattern': entry['last_pattern'],
+            })
+        return sorted(rows, key=lambda row: row['p95_ms'], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+endpoint_stats = EndpointStats()
+
+# The start time lives on the execution context, not the connection: after_cursor_execute
+# never fires for a statement that raises, which would leave a stale entry behind
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if (context is not None and context.execution_options.get('sql_trace', True)
+            and has_request_context() and 'sql_trace' in g):
+        context._query_start = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_start', None)
+    if started is None or not has_request_context() or 'sql_trace' not in g:
+        return
+    trace = g.sql_trace
+    trace['count'] += 1
+    trace['db_time'] += time.perf_counter() - started
+    trace['patterns'][statement_pattern(statement)] += 1
+
+def budget_for(endpoint):
+    """Query budget that applies to an endpoint, or None"""
+    budgets = current_app.config.get('QUERY_BUDGETS') or {}
+    if endpoint in budgets:
+        return budgets[endpoint]
+    view = current_app.view_functions.get(endpoint)
+    return getattr(view, 'query_budget', current_app.config.get('QUERY_BUDGET_DEFAULT'))
+
+def init_instrumentation(app):
+    """Register the per-request hooks on the app"""
+
+    @app.before_request
+    def start_sql_trace():
+        if app.config.get('SQL_INSTRUMENTATION', True):
+            g.sql_trace = {'count': 0, 'db_time': 0.0, 'patterns': Counter(), 'started': time.perf_counter()}
+
+    @app.after_request
+    def finish_sql_trace(response):
+        trace = g.pop('sql_trace', None)
+        if trace is None:
+            return response
+        total_ms = (time.perf_counter() - trace['started']) * 1000
+        db_ms = trace['db_time'] * 1000
+        count = trace['count']
+        endpoint = request.endpoint or 'unmatched'
+        threshold = app.config.get('N_PLUS_ONE_THRESHOLD', 3)
+        duplicates = [(pattern, n) for pattern, n in trace['patterns'].most_common() if n >= threshold]
+
+        if app.config.get('SERVER_TIMING', True):
+            response.headers['Server-Timing'] = (
+                f'db;dur={db_ms:.2f};desc="{count} queries", app;dur={total_ms:.2f}'
+            )
+        logger.debug("%s %s [%s]: %d queries, %.1f ms db, %.1f ms total",
+                     request.method, request.full_path.rstrip('?'), endpoint, count, db_ms, total_ms)
+        for pattern, n in duplicates:
+            logger.warning("Possible N+1 in %s: %d x %s", endpoint, n, pattern[:300])
+        endpoint_stats.record(endpoint, total_ms, db_ms, count, duplicates)
+
+        budget = budget_for(endpoint)
+        mode = app.config.get('QUERY_BUDGET_MODE', 'warn')
+        if budget is not None and count > budget and mode != 'off' and not response.is_streamed:
+            message = f"{endpoint} issued {count} queries (budget {budget})"
+            if mode == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
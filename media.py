@@ -0,0 +1,153 @@
+"""
+Content-addressed upload storage and garbage collection of unreferenced files.
+
+store_upload() names a file after the SHA-256 of its bytes, so uploading the
+same image twice to a folder stores it (and builds its variants) once. The
+file is written to a temporary name and hard-linked into place, which fails
+instead of overwriting when the content is already there.
+
+Rows never own their files: with deduplication two projects can share an
+image, and cached or exported pages can still point at an old one. Deleting
+or replacing content therefore leaves files behind, and collect_garbage()
+(flask --app main media-gc) removes them later. It walks static/uploads one
+folder at a time. Each batch of uploads is checked against every column that
+can reference one (media_columns()) in a single query. An upload is removed with
+its width variants and manifest (images.py) only if nothing references it and
+none of its files changed within the grace period. That period covers uploads
+whose form has not been committed yet, and a dedup hit touches the existing
+file to restart it. The sweep only reads from the database and sleeps between
+batches, so it can run next to live traffic.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import time
+import uuid
+from collections import defaultdict
+from images import MANIFEST_SUFFIX
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_ROOT = 'uploads'   # under the static folder
+HASH_LENGTH = 32          # hex digits of SHA-256 kept in file names
+CHUNK_SIZE = 64 * 1024
+
+_VARIANT_RE = re.compile(r'^(?P<stem>.+)-\d+w\.\w+$')
+
+def store_upload(stream, folder, ext):
+    """Write stream to folder under the hash of its content; returns (file name, whether it is new)"""
+    os.makedirs(folder, exist_ok=True)
+    digest = hashlib.sha256()
+    tmp_path = os.path.join(folder, f'.{uuid.uuid4().hex}.tmp')
+    try:
+        with open(tmp_path, 'xb') as fh:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                fh.write(chunk)
+        name = digest.hexdigest()[:HASH_LENGTH] + ext.lower()
+        path = os.path.join(folder, name)
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            os.utime(path)  # restart its grace period so a running sweep keeps it
+            return name, False
+        except OSError:
+            # No hard links on this filesystem; fall back to a (racy) existence check
+            if os.path.exists(path):
+                os.utime(path)
+                return name, False
+            os.replace(tmp_path, path)
+        return name, True
+    finally:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+
+def media_columns():
+    """Every column that stores a static-relative upload path"""
+    from models import BlogPost, Certificate, Project, Testimonial
+    return (Project.image_path, BlogPost.image_path, Certificate.image_path, Certificate.pdf_path,
+            Testimonial.image_path)
+
+def referenced_paths(paths):
+    """The subset of paths some row still points at, in one query"""
+    from sqlalchemy import select, union
+    from app import db
+
+    if not paths:
+        return set()
+    query = union(*[select(column.label('path')).where(column.in_(paths)) for column in media_columns()])
+    return set(db.session.execute(query).scalars())
+
+def _upload_groups(directory):
+    """{stem: [file names]} for a folder; an upload's variants, manifest and temp files share its stem"""
+    groups = defaultdict(list)
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            name = entry.name
+            if name.endswith('.tmp'):
+                stem = name  # abandoned temporary file, on its own
+            elif name.endswith(MANIFEST_SUFFIX):
+                stem = name[:-len(MANIFEST_SUFFIX)]
+            else:
+                variant = _VARIANT_RE.match(name)
+                stem = variant.group('stem') if variant else os.path.splitext(name)[0]
+            groups[stem].append(name)
+    return groups
+
+def _original(stem, names):
+    """The uploaded file of a group, the one rows reference; None for leftover variants"""
+    for name in names:
+        if os.path.splitext(name)[0] == stem and not name.endswith(('.tmp', MANIFEST_SUFFIX)):
+            return name
+    return None
+
+def collect_garbage(static_folder, grace=3600, batch_size=500, pause=0.1, dry_run=False):
+    """Delete uploads nothing references; returns counts of removed/kept uploads, files and bytes"""
+    from app import db
+
+    stats = {'removed': 0, 'kept': 0, 'files': 0, 'bytes': 0}
+    root = os.path.join(static_folder, UPLOAD_ROOT)
+    if not os.path.isdir(root):
+        return stats
+    for directory, _, _ in os.walk(root):
+        prefix = os.path.relpath(directory, static_folder).replace(os.sep, '/')
+        groups = list(_upload_groups(directory).items())
+        for start in range(0, len(groups), batch_size):
+            batch = groups[start:start + batch_size]
+            originals = {stem: _original(stem, names) for stem, names in batch}
+            referenced = referenced_paths([f'{prefix}/{name}' for name in originals.values() if name])
+            db.session.remove()  # end the read transaction before touching files
+            cutoff = time.time() - grace
+            for stem, names in batch:
+                original = originals[stem]
+                if original and f'{prefix}/{original}' in referenced:
+                    stats['kept'] += 1
+                    continue
+                paths = [os.path.join(directory, name) for name in names]
+                try:
+                    sizes = [(os.stat(path).st_mtime, os.stat(path).st_size) for path in paths]
+                except FileNotFoundError:
+                    continue  # changed under us; the next sweep sees it again
+                if max(mtime for mtime, _ in sizes) > cutoff:
+                    stats['kept'] += 1
+                    continue
+                stats['removed'] += 1
+                stats['files'] += len(paths)
+                stats['bytes'] += sum(size for _, size in sizes)
+                if dry_run:
+                    continue
+                for path in paths:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                logger.info("Removed unreferenced upload %s/%s (%d files)", prefix, original or stem, len(paths))
+            if pause:
+                time.sleep(pause)
+    return stats
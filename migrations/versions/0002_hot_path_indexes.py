@@ -0,0 +1,47 @@
+"""indexes for the listing, featured and per-category queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 23:10:00.000000
+
+Each index matches the filter and ORDER BY of a route query, so those pages
+read rows in index order instead of scanning and sorting the table
+(python -m benchmarks.explain checks this). On PostgreSQL they are built
+CONCURRENTLY, outside a transaction, so writes are not blocked while they
+build; IF NOT EXISTS lets the revision re-run after an interrupted build and
+skip indexes db.create_all() already made.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_project_listing', 'project', ['order_index', 'created_at', 'id']),
+    ('ix_project_featured', 'project', ['is_featured', 'order_index']),
+    ('ix_project_category', 'project', ['category', 'order_index', 'created_at', 'id']),
+    ('ix_skill_category', 'skill', ['category', 'order_index']),
+    ('ix_experience_order', 'experience', ['order_index']),
+    ('ix_blog_post_published', 'blog_post', ['is_published', 'created_at', 'id']),
+    ('ix_blog_post_created', 'blog_post', ['created_at', 'id']),
+    ('ix_contact_message_created', 'contact_message', ['created_at', 'id']),
+    ('ix_contact_message_unread', 'contact_message', ['is_read', 'created_at']),
+    ('ix_email_outbox_contact_message', 'email_outbox', ['contact_message_id']),
+)
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
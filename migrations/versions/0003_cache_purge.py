@@ -0,0 +1,39 @@
+"""cache_purge log shared by the page and fragment caches of every process
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 23:40:00.000000
+
+purge_pages() appends the purged tags here, and each worker replays rows it
+has not seen yet (cache.sync_purges), so an admin change clears every
+worker's cached copies, not only the one that handled the request. The
+table is skipped when it already exists: upgrade_schema() used to adopt
+pre-migration databases by creating every model's table before stamping
+0001.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if inspect(op.get_bind()).has_table('cache_purge'):
+        return
+    op.create_table('cache_purge',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tags', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('cache_purge')
@@ -1,6 +1,7 @@
 from app import db
 from flask_login import UserMixin
 from datetime import datetime
+from markupsafe import Markup
 from sqlalchemy import Text
 
 class AdminUser(UserMixin, db.Model):
@@ -10,7 +11,71 @@ class AdminUser(UserMixin, db.Model):
     password_hash = db.Column(db.String(256), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+# Tag associations keep the order tags were entered in via `position`
+blog_post_tags = db.Table(
+    'blog_post_tags',
+    db.Column('blog_post_id', db.Integer, db.ForeignKey('blog_post.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id', ondelete='CASCADE'), primary_key=True, index=True),
+    db.Column('position', db.Integer, default=0),
+)
+
+project_tags = db.Table(
+    'project_tags',
+    db.Column('project_id', db.Integer, db.ForeignKey('project.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id', ondelete='CASCADE'), primary_key=True, index=True),
+    db.Column('position', db.Integer, default=0),
+)
+
+project_technologies = db.Table(
+    'project_technologies',
+    db.Column('project_id', db.Integer, db.ForeignKey('project.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id', ondelete='CASCADE'), primary_key=True, index=True),
+    db.Column('position', db.Integer, default=0),
+)
+
+class Tag(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+    post_count = db.Column(db.Integer, default=0, nullable=False)  # Published posts using this tag
+
+class RenderedContent(db.Model):
+    """Sanitized HTML and derived fields for a rich-text column, produced at save time by content.py"""
+    owner_type = db.Column(db.String(16), primary_key=True)  # post, project, experience
+    owner_id = db.Column(db.Integer, primary_key=True)
+    html = db.Column(Text, nullable=False)
+    toc = db.Column(db.JSON)  # [{'level', 'id', 'title'}] for h2/h3 headings
+    reading_minutes = db.Column(db.Integer, default=1, nullable=False)
+    excerpt = db.Column(Text)
+    source_hash = db.Column(db.String(40), nullable=False)  # sha1 of the source it was rendered from
+    rendered_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+def _rendering(owner, owner_type, source):
+    """The stored rendering, or one made now (and kept on the instance) for a row saved without it"""
+    if owner.rendered is not None:
+        return owner.rendered
+    live = owner.__dict__.get('_live_rendering')
+    if live is None or live[0] != source:
+        from flask import current_app
+        from content import EXCERPT_LENGTHS, render_html
+        live = owner.__dict__['_live_rendering'] = (
+            source, render_html(source, EXCERPT_LENGTHS[owner_type], current_app.static_folder))
+    return live[1]
+
+def _rendered(owner_type, model):
+    return db.relationship(
+        'RenderedContent', uselist=False, viewonly=True,
+        primaryjoin=f"and_(RenderedContent.owner_type == '{owner_type}', "
+                    f"foreign(RenderedContent.owner_id) == {model}.id)",
+    )
+
 class Project(db.Model):
+    # Listing order (projects page and admin), featured cards and per-category listings
+    __table_args__ = (
+        db.Index('ix_project_listing', 'order_index', 'created_at', 'id'),
+        db.Index('ix_project_featured', 'is_featured', 'order_index'),
+        db.Index('ix_project_category', 'category', 'order_index', 'created_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(Text, nullable=False)
@@ -25,7 +90,27 @@ class Project(db.Model):
     order_index = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Parsed views of `tags` / `tech_stack`, kept in sync by utils.sync_project_tags
+    tag_items = db.relationship('Tag', secondary=project_tags, viewonly=True,
+                                order_by=project_tags.c.position, lazy='selectin')
+    tech_items = db.relationship('Tag', secondary=project_technologies, viewonly=True,
+                                 order_by=project_technologies.c.position, lazy='selectin')
+    # Pre-rendered description; views joinedload it where it is shown
+    rendered = _rendered('project', 'Project')
+
+    @property
+    def description_html(self):
+        return Markup(_rendering(self, 'project', self.description).html)
+
+    @property
+    def summary(self):
+        if self.short_description:
+            return self.short_description
+        return _rendering(self, 'project', self.description).excerpt
+
 class Skill(db.Model):
+    __table_args__ = (db.Index('ix_skill_category', 'category', 'order_index'),)
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     category = db.Column(db.String(50), nullable=False)  # Frontend, Backend, Tools, Languages
@@ -34,6 +119,8 @@ class Skill(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Experience(db.Model):
+    __table_args__ = (db.Index('ix_experience_order', 'order_index'),)
+
     id = db.Column(db.Integer, primary_key=True)
     job_title = db.Column(db.String(100), nullable=False)
     company = db.Column(db.String(100), nullable=False)
@@ -45,6 +132,12 @@ class Experience(db.Model):
     order_index = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    rendered = _rendered('experience', 'Experience')
+
+    @property
+    def description_html(self):
+        return Markup(_rendering(self, 'experience', self.description).html)
+
 class Certificate(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
@@ -57,6 +150,12 @@ class Certificate(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class BlogPost(db.Model):
+    # Public listing (published only) and the admin listing, newest first
+    __table_args__ = (
+        db.Index('ix_blog_post_published', 'is_published', 'created_at', 'id'),
+        db.Index('ix_blog_post_created', 'created_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(150), nullable=False)
     slug = db.Column(db.String(150), unique=True, nullable=False)
@@ -68,6 +167,29 @@ class BlogPost(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Parsed view of `tags`, kept in sync by utils.sync_post_tags
+    tag_items = db.relationship('Tag', secondary=blog_post_tags, viewonly=True,
+                                order_by=blog_post_tags.c.position, lazy='selectin')
+    rendered = _rendered('post', 'BlogPost')
+
+    @property
+    def content_html(self):
+        return Markup(_rendering(self, 'post', self.content).html)
+
+    @property
+    def summary(self):
+        if self.excerpt:
+            return self.excerpt
+        return _rendering(self, 'post', self.content).excerpt
+
+    @property
+    def reading_minutes(self):
+        return _rendering(self, 'post', self.content).reading_minutes
+
+    @property
+    def toc(self):
+        return _rendering(self, 'post', self.content).toc or []
+
 class Testimonial(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -81,6 +203,11 @@ class Testimonial(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class ContactMessage(db.Model):
+    __table_args__ = (
+        db.Index('ix_contact_message_created', 'created_at', 'id'),
+        db.Index('ix_contact_message_unread', 'is_read', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), nullable=False)
@@ -89,6 +216,38 @@ class ContactMessage(db.Model):
     is_read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class EmailOutbox(db.Model):
+    """Outgoing email queued in the same transaction as the row that triggered it"""
+    __table_args__ = (
+        db.Index('ix_email_outbox_due', 'status', 'next_attempt_at'),
+        db.Index('ix_email_outbox_contact_message', 'contact_message_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    contact_message_id = db.Column(db.Integer, db.ForeignKey('contact_message.id', ondelete='SET NULL'))
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(Text, nullable=False)
+    status = db.Column(db.String(16), default='pending', nullable=False)  # pending, sending, sent, dead
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(Text)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    contact_message = db.relationship('ContactMessage', backref=db.backref('notification', uselist=False))
+
+class SiteCounter(db.Model):
+    """Row counts maintained incrementally by stats.py"""
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, default=0, nullable=False)
+
+class CachePurge(db.Model):
+    """Cache tags purged by one process, replayed by the others (cache.sync_purges)"""
+    id = db.Column(db.Integer, primary_key=True)
+    tags = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
 class SiteSettings(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     key = db.Column(db.String(50), unique=True, nullable=False)
@@ -0,0 +1,185 @@
+"""
+Transactional email outbox.
+
+Views queue mail with enqueue_email() inside their own transaction, so a row
+is only ever queued if the change that triggered it commits. A background
+worker (a thread per app process, or outbox_worker.py) claims due rows, sends
+them over a single reused SMTP connection, retries failures with exponential
+backoff and moves rows that keep failing to the 'dead' state for the admin.
+
+For local testing point the app at a debugging SMTP server, e.g.:
+
+    python -m aiosmtpd -n -l localhost:1025
+    MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_USE_TLS=0 python outbox_worker.py --once
+"""
+
+import logging
+import os
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from flask_mail import Message
+from sqlalchemy import and_
+from app import db, mail
+from models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = 30     # seconds before the first retry, doubled per attempt
+BACKOFF_MAX = 3600
+CLAIM_TIMEOUT = 300   # a 'sending' row older than this was abandoned by a dead worker
+
+def enqueue_email(recipient, subject, body, contact_message=None):
+    """Queue an email; it is committed together with the caller's transaction"""
+    item = EmailOutbox()
+    item.recipient = recipient
+    item.subject = subject[:200]
+    item.body = body
+    item.contact_message = contact_message
+    db.session.add(item)
+    return item
+
+def retry_email(item):
+    """Put a dead or failing email back at the front of the queue"""
+    item.status = 'pending'
+    item.attempts = 0
+    item.next_attempt_at = datetime.utcnow()
+
+def backoff_seconds(attempts):
+    return min(BACKOFF_BASE * 2 ** max(attempts - 1, 0), BACKOFF_MAX)
+
+def _due_filter(now):
+    # For 'sending' rows next_attempt_at is the lease expiry, so expired leases are reclaimed
+    return and_(EmailOutbox.status.in_(('pending', 'sending')), EmailOutbox.next_attempt_at <= now)
+
+def _claim_batch(batch_size):
+    """Atomically lease up to batch_size due rows to this worker"""
+    now = datetime.utcnow()
+    candidates = [
+        row_id for row_id, in db.session.query(EmailOutbox.id)
+        .filter(_due_filter(now))
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(batch_size)
+    ]
+    claimed = []
+    lease = now + timedelta(seconds=CLAIM_TIMEOUT)
+    for row_id in candidates:
+        # The conditional UPDATE only succeeds for one worker per row
+        updated = EmailOutbox.query.filter(EmailOutbox.id == row_id, _due_filter(now)).update(
+            {'status': 'sending', 'next_attempt_at': lease}, synchronize_session=False
+        )
+        if updated:
+            claimed.append(row_id)
+    db.session.commit()
+    if not claimed:
+        return []
+    return EmailOutbox.query.filter(EmailOutbox.id.in_(claimed)).order_by(EmailOutbox.id).all()
+
+def _record_failure(item, error):
+    item.attempts += 1
+    item.last_error = str(error)[:1000]
+    if item.attempts >= MAX_ATTEMPTS:
+        item.status = 'dead'
+        logger.error("Email %s dead after %s attempts: %s", item.id, item.attempts, error)
+    else:
+        item.status = 'pending'
+        item.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff_seconds(item.attempts))
+        logger.warning("Email %s failed (attempt %s): %s", item.id, item.attempts, error)
+
+def _open_connection():
+    connection = mail.connect()
+    connection.__enter__()
+    return connection
+
+def _close_connection(connection):
+    if connection is None or connection.host is None:
+        return
+    try:
+        connection.host.quit()
+    except (smtplib.SMTPException, OSError):
+        pass
+
+def drain_outbox(batch_size=20):
+    """Send every due email, reusing one SMTP connection across batches.
+
+    Returns a (sent, failed) tuple. Must be called inside an app context.
+    """
+    sent = failed = 0
+    connection = None
+    try:
+        batch = _claim_batch(batch_size)
+        while batch:
+            for index, item in enumerate(batch):
+                try:
+                    if connection is None:
+                        connection = _open_connection()
+                except (smtplib.SMTPException, OSError) as e:
+                    # Server unreachable: fail the rest of this batch without reconnecting per row
+                    for pending in batch[index:]:
+                        _record_failure(pending, e)
+                        failed += 1
+                    db.session.commit()
+                    return sent, failed
+
+                try:
+                    connection.send(Message(subject=item.subject, recipients=[item.recipient], body=item.body))
+                except Exception as e:
+                    _record_failure(item, e)
+                    failed += 1
+                    if isinstance(e, (smtplib.SMTPServerDisconnected, OSError)):
+                        _close_connection(connection)
+                        connection = None
+                else:
+                    item.status = 'sent'
+                    item.attempts += 1
+                    item.sent_at = datetime.utcnow()
+                    sent += 1
+                db.session.commit()
+            batch = _claim_batch(batch_size)
+    finally:
+        _close_connection(connection)
+    return sent, failed
+
+def run_worker(app, poll_interval=5.0, stop_event=None, once=False):
+    """Drain the outbox until stop_event is set; wakes early when notify_worker() is called"""
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        with app.app_context():
+            try:
+                sent, failed = drain_outbox()
+                if sent or failed:
+                    logger.info("Outbox: %s sent, %s failed", sent, failed)
+            except Exception:
+                logger.exception("Outbox worker error")
+                db.session.rollback()
+            finally:
+                db.session.remove()
+        if once:
+            return
+        _wakeup.wait(poll_interval)
+        _wakeup.clear()
+
+_wakeup = threading.Event()
+_worker = None
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+def notify_worker():
+    """Wake the in-process worker so freshly queued mail goes out immediately"""
+    _wakeup.set()
+
+def start_worker_thread(app):
+    """Start the in-process worker once per process (safe to call on every request)"""
+    global _worker, _worker_pid
+    if _worker_pid == os.getpid() and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker_pid == os.getpid() and _worker.is_alive():
+            return
+        _worker = threading.Thread(
+            target=run_worker, name='outbox-worker', daemon=True,
+            args=(app, app.config.get('OUTBOX_POLL_INTERVAL', 5.0)),
+        )
+        _worker.start()
+        _worker_pid = os.getpid()
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Standalone outbox worker for deployments that run mail delivery in its own
+process. Set OUTBOX_WORKER=off on the web processes when using it.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from outbox import run_worker
+
+app = create_app()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Deliver queued emails")
+    parser.add_argument('--once', action='store_true', help="drain the queue once and exit (for cron)")
+    parser.add_argument('--interval', type=float, default=app.config['OUTBOX_POLL_INTERVAL'],
+                        help="seconds between polls")
+    args = parser.parse_args()
+
+    try:
+        run_worker(app, poll_interval=args.interval, once=args.once)
+    except KeyboardInterrupt:
+        print("Outbox worker stopped.")
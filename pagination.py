@@ -0,0 +1,79 @@
+import base64
+import json
+from datetime import datetime
+from flask import abort, current_app, request
+from sqlalchemy import tuple_
+
+class KeysetPage:
+    """One page of a keyset (cursor) listing; carries opaque prev/next tokens instead of page numbers"""
+
+    is_keyset = True
+    page = None
+    pages = None
+    total = None
+
+    def __init__(self, items, prev_cursor, next_cursor):
+        self.items = items
+        self.prev_cursor = prev_cursor
+        self.next_cursor = next_cursor
+        self.has_prev = prev_cursor is not None
+        self.has_next = next_cursor is not None
+
+def encode_cursor(values, direction):
+    payload = [direction] + [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decode_cursor(token, columns):
+    """Return (direction, key values) from a token, or abort with 400 if it is malformed"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, *values = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in ('next', 'prev') or len(values) != len(columns):
+            raise ValueError(token)
+        return direction, [
+            datetime.fromisoformat(value) if value is not None and column.type.python_type is datetime else value
+            for column, value in zip(columns, values)
+        ]
+    except (ValueError, TypeError, NotImplementedError):
+        abort(400)
+
+def _key(row, columns):
+    return [getattr(row, column.key) for column in columns]
+
+def keyset_paginate(query, columns, cursor=None, per_page=10):
+    """Page through query ordered by columns (all descending, last one unique) without OFFSET or COUNT"""
+    key = tuple_(*columns)
+    direction, values = decode_cursor(cursor, columns) if cursor else ('next', None)
+
+    if direction == 'next':
+        if values is not None:
+            query = query.filter(key < tuple_(*values))
+        rows = query.order_by(*[column.desc() for column in columns]).limit(per_page + 1).all()
+        more = len(rows) > per_page
+        rows = rows[:per_page]
+        prev_cursor = encode_cursor(_key(rows[0], columns), 'prev') if values is not None and rows else None
+        next_cursor = encode_cursor(_key(rows[-1], columns), 'next') if more else None
+    else:
+        # Walk backwards from the key, then restore display order
+        query = query.filter(key > tuple_(*values))
+        rows = query.order_by(*[column.asc() for column in columns]).limit(per_page + 1).all()
+        more = len(rows) > per_page
+        rows = list(reversed(rows[:per_page]))
+        prev_cursor = encode_cursor(_key(rows[0], columns), 'prev') if more else None
+        next_cursor = encode_cursor(_key(rows[-1], columns), 'next') if rows else None
+
+    return KeysetPage(rows, prev_cursor, next_cursor)
+
+def paginate_listing(query, columns, per_page):
+    """Offset pagination by default; keyset when ?cursor= is present or CURSOR_PAGINATION is on.
+
+    Static export requests always get numbered pages, since cursor URLs cannot be pre-rendered.
+    """
+    cursor = request.args.get('cursor')
+    cursor_mode = current_app.config.get('CURSOR_PAGINATION') and not request.environ.get('portfolio.static_export')
+    if cursor is not None or cursor_mode:
+        return keyset_paginate(query, columns, cursor or None, per_page)
+    page = request.args.get('page', 1, type=int)
+    return query.order_by(*[column.desc() for column in columns]).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Rebuild the full-text search index from the blog post and project tables.
+The admin keeps the index up to date on every save; run this after bulk
+changes made outside the admin, or to create the index on an existing database.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from search import rebuild_search_index
+
+app = create_app()
+
+if __name__ == '__main__':
+    with app.app_context():
+        started = time.perf_counter()
+        rebuild_search_index()
+        print(f"✅ Search index rebuilt in {time.perf_counter() - started:.2f}s")
@@ -1,16 +1,35 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from flask import (Blueprint, render_template, request, redirect, url_for, flash, current_app,
+                   Response, abort, stream_with_context)
 from flask_login import login_required, login_user, logout_user, current_user
 from werkzeug.security import check_password_hash, generate_password_hash
 from app import db
 from models import (AdminUser, Project, Skill, Experience, Certificate, BlogPost, 
-                   Testimonial, ContactMessage, SiteSettings)
+                   Testimonial, ContactMessage, SiteSettings, EmailOutbox)
 from forms import (LoginForm, ProjectForm, SkillForm, ExperienceForm, BlogPostForm, 
-                  TestimonialForm, SettingsForm)
-from utils import save_uploaded_file, create_slug, set_setting, get_setting
+                  TestimonialForm, SettingsForm, ImportForm)
+from utils import (save_uploaded_file, create_slug, set_settings, get_setting,
+                   sync_post_tags, sync_project_tags, clear_post_tags, clear_project_tags)
+from cache import purge_pages
+from content import render_post, render_project, render_experience, render_setting, remove_rendered
+from search import index_blog_post, index_project, remove_document
+from outbox import retry_email, notify_worker
+from stats import get_counters
+from pagination import paginate_listing
+from exports import EXPORTS, FORMATS, parse_date, stream_export, export_filename
+from importer import IMPORTS, import_records, read_records
+from bulk import (message_criteria, mark_messages, delete_messages, set_projects_featured, delete_projects,
+                  set_posts_published, delete_posts)
+from instrumentation import query_budget, budget_for, endpoint_stats
+from database import pool_stats, pool_status
+from sqlalchemy.orm import joinedload
+import csv
 import os
 
 bp = Blueprint('admin', __name__)
 
+def _rows(count, noun):
+    return f'{count} {noun}' + ('' if count == 1 else 's')
+
 @bp.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
@@ -44,12 +63,14 @@ def logout():
 
 @bp.route('/')
 @login_required
+@query_budget(3)
 def dashboard():
+    counters = get_counters()
     stats = {
-        'projects': Project.query.count(),
-        'blog_posts': BlogPost.query.count(),
-        'messages': ContactMessage.query.filter_by(is_read=False).count(),
-        'skills': Skill.query.count(),
+        'projects': counters['projects'],
+        'blog_posts': counters['blog_posts'],
+        'messages': counters['unread_messages'],
+        'skills': counters['skills'],
     }
     
     recent_messages = ContactMessage.query.order_by(ContactMessage.created_at.desc()).limit(5).all()
@@ -58,11 +79,9 @@ def dashboard():
 # Project Management
 @bp.route('/projects')
 @login_required
+@query_budget(6)
 def projects():
-    page = request.args.get('page', 1, type=int)
-    projects = Project.query.order_by(Project.order_index.desc(), Project.created_at.desc()).paginate(
-        page=page, per_page=10, error_out=False
-    )
+    projects = paginate_listing(Project.query, (Project.order_index, Project.created_at, Project.id), per_page=10)
     return render_template('admin/projects.html', projects=projects)
 
 @bp.route('/projects/new', methods=['GET', 'POST'])
@@ -93,7 +112,11 @@ def new_project():
                 project.image_path = f'uploads/projects/{filename}'
         
         db.session.add(project)
+        sync_project_tags(project)
+        index_project(project)
+        render_project(project)
         db.session.commit()
+        purge_pages('projects')
         flash('Project created successfully!', 'success')
         return redirect(url_for('admin.projects'))
     
@@ -118,7 +141,11 @@ def edit_project(id):
             if filename:
                 project.image_path = f'uploads/projects/{filename}'
         
+        sync_project_tags(project)
+        index_project(project)
+        render_project(project)
         db.session.commit()
+        purge_pages('projects', f'project:{project.id}')
         flash('Project updated successfully!', 'success')
         return redirect(url_for('admin.projects'))
     
@@ -128,19 +155,37 @@ def edit_project(id):
 @login_required
 def delete_project(id):
     project = Project.query.get_or_404(id)
+    clear_project_tags(project)
+    remove_document('project', project.id)
+    remove_rendered('project', [project.id])
     db.session.delete(project)
     db.session.commit()
+    purge_pages('projects', f'project:{id}')
     flash('Project deleted successfully!', 'success')
     return redirect(url_for('admin.projects'))
 
+@bp.route('/projects/bulk', methods=['POST'])
+@login_required
+def bulk_projects():
+    ids = request.form.getlist('ids', type=int)
+    action = request.form.get('action')
+    if not ids:
+        flash('Select at least one project.', 'warning')
+    elif action in ('feature', 'unfeature'):
+        count = set_projects_featured(ids, action == 'feature')
+        flash(f'{_rows(count, "project")} {action}d.', 'success')
+    elif action == 'delete':
+        flash(f'{_rows(delete_projects(ids), "project")} deleted.', 'success')
+    else:
+        abort(400)
+    return redirect(url_for('admin.projects'))
+
 # Blog Management
 @bp.route('/blog')
 @login_required
+@query_budget(6)
 def blog():
-    page = request.args.get('page', 1, type=int)
-    posts = BlogPost.query.order_by(BlogPost.created_at.desc()).paginate(
-        page=page, per_page=10, error_out=False
-    )
+    posts = paginate_listing(BlogPost.query, (BlogPost.created_at, BlogPost.id), per_page=10)
     return render_template('admin/blog.html', posts=posts)
 
 @bp.route('/blog/new', methods=['GET', 'POST'])
@@ -169,7 +214,11 @@ def new_blog_post():
                 post.image_path = f'uploads/blog/{filename}'
         
         db.session.add(post)
+        sync_post_tags(post)
+        index_blog_post(post)
+        render_post(post)
         db.session.commit()
+        purge_pages('blog')
         flash('Blog post created successfully!', 'success')
         return redirect(url_for('admin.blog'))
     
@@ -182,6 +231,7 @@ def edit_blog_post(id):
     form = BlogPostForm(obj=post)
     
     if form.validate_on_submit():
+        old_slug = post.slug
         form.populate_obj(post)
         
         if form.image.data:
@@ -194,7 +244,11 @@ def edit_blog_post(id):
             if filename:
                 post.image_path = f'uploads/blog/{filename}'
         
+        sync_post_tags(post)
+        index_blog_post(post)
+        render_post(post)
         db.session.commit()
+        purge_pages('blog', f'blog:{old_slug}', f'blog:{post.slug}')
         flash('Blog post updated successfully!', 'success')
         return redirect(url_for('admin.blog'))
     
@@ -204,14 +258,35 @@ def edit_blog_post(id):
 @login_required
 def delete_blog_post(id):
     post = BlogPost.query.get_or_404(id)
+    clear_post_tags(post)
+    remove_document('post', post.id)
+    remove_rendered('post', [post.id])
     db.session.delete(post)
     db.session.commit()
+    purge_pages('blog', f'blog:{post.slug}')
     flash('Blog post deleted successfully!', 'success')
     return redirect(url_for('admin.blog'))
 
+@bp.route('/blog/bulk', methods=['POST'])
+@login_required
+def bulk_blog_posts():
+    ids = request.form.getlist('ids', type=int)
+    action = request.form.get('action')
+    if not ids:
+        flash('Select at least one blog post.', 'warning')
+    elif action in ('publish', 'unpublish'):
+        count = set_posts_published(ids, action == 'publish')
+        flash(f'{_rows(count, "blog post")} {action}ed.', 'success')
+    elif action == 'delete':
+        flash(f'{_rows(delete_posts(ids), "blog post")} deleted.', 'success')
+    else:
+        abort(400)
+    return redirect(url_for('admin.blog'))
+
 # Skills Management
 @bp.route('/skills')
 @login_required
+@query_budget(3)
 def skills():
     skills = Skill.query.order_by(Skill.category, Skill.order_index).all()
     return render_template('admin/skills.html', skills=skills)
@@ -228,6 +303,7 @@ def new_skill():
         skill.order_index = form.order_index.data
         db.session.add(skill)
         db.session.commit()
+        purge_pages('skills')
         flash('Skill added successfully!', 'success')
         return redirect(url_for('admin.skills'))
     
@@ -239,6 +315,7 @@ def delete_skill(id):
     skill = Skill.query.get_or_404(id)
     db.session.delete(skill)
     db.session.commit()
+    purge_pages('skills')
     flash('Skill deleted successfully!', 'success')
     return redirect(url_for('admin.skills'))
 
@@ -250,6 +327,7 @@ from models import Experience
 # Experience Management
 @bp.route('/experience')
 @login_required
+@query_budget(3)
 def experience():
     experiences = Experience.query.order_by(Experience.order_index.desc()).all()
     return render_template('admin/experience.html', experiences=experiences)
@@ -269,7 +347,9 @@ def new_experience():
         experience.is_current = form.is_current.data
         experience.order_index = form.order_index.data
         db.session.add(experience)
+        render_experience(experience)
         db.session.commit()
+        purge_pages('experience')
         flash('Experience added successfully!', 'success')
         return redirect(url_for('admin.experience'))
     
@@ -280,8 +360,10 @@ def new_experience():
 @login_required
 def delete_experience(id):
     experience = Experience.query.get_or_404(id)
+    remove_rendered('experience', [experience.id])
     db.session.delete(experience)
     db.session.commit()
+    purge_pages('experience')
     flash('Experience deleted successfully.', 'success')
     return redirect(url_for('admin.experience'))
 
@@ -290,12 +372,14 @@ def delete_experience(id):
 # Messages Management
 @bp.route('/messages')
 @login_required
+@query_budget(6)
 def messages():
-    page = request.args.get('page', 1, type=int)
-    messages = ContactMessage.query.order_by(ContactMessage.created_at.desc()).paginate(
-        page=page, per_page=10, error_out=False
+    messages = paginate_listing(
+        ContactMessage.query.options(joinedload(ContactMessage.notification)),
+        (ContactMessage.created_at, ContactMessage.id), per_page=10
     )
-    return render_template('admin/messages.html', messages=messages)
+    dead_notifications = EmailOutbox.query.filter_by(status='dead').count()
+    return render_template('admin/messages.html', messages=messages, dead_notifications=dead_notifications)
 
 @bp.route('/messages/<int:id>/read', methods=['POST'])
 @login_required
@@ -314,9 +398,88 @@ def delete_message(id):
     flash('Message deleted successfully!', 'success')
     return redirect(url_for('admin.messages'))
 
+@bp.route('/messages/bulk', methods=['POST'])
+@login_required
+def bulk_messages():
+    action = request.form.get('action')
+    try:
+        if request.form.get('scope') == 'filter':
+            criteria = message_criteria(email=request.form.get('email'),
+                                        start=parse_date(request.form.get('start')),
+                                        end=parse_date(request.form.get('end')))
+        else:
+            criteria = message_criteria(ids=request.form.getlist('ids', type=int))
+    except ValueError:
+        flash('Select messages, or give a sender or date range.', 'warning')
+        return redirect(url_for('admin.messages'))
+
+    if action == 'read':
+        flash(f'{_rows(mark_messages(criteria), "message")} marked as read.', 'success')
+    elif action == 'unread':
+        flash(f'{_rows(mark_messages(criteria, False), "message")} marked as unread.', 'success')
+    elif action == 'delete':
+        flash(f'{_rows(delete_messages(criteria), "message")} deleted.', 'success')
+    else:
+        abort(400)
+    return redirect(url_for('admin.messages'))
+
+@bp.route('/export/<kind>')
+@login_required
+def export(kind):
+    fmt = request.args.get('format', 'csv')
+    if kind not in EXPORTS or fmt not in FORMATS:
+        abort(404)
+    try:
+        start = parse_date(request.args.get('start'))
+        end = parse_date(request.args.get('end'))
+    except ValueError:
+        abort(400)
+    is_read = {'read': True, 'unread': False}.get(request.args.get('status'))
+    compress = request.args.get('gzip') == '1'
+    spreadsheet = request.args.get('spreadsheet') == '1'
+
+    body = stream_export(kind, fmt, compress, spreadsheet, start=start, end=end, is_read=is_read)
+    response = Response(stream_with_context(body),
+                        mimetype='application/gzip' if compress else FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{export_filename(kind, fmt, compress)}"'
+    return response
+
+@bp.route('/import', methods=['GET', 'POST'])
+@login_required
+def import_content():
+    form = ImportForm()
+    if request.method == 'GET' and request.args.get('kind') in IMPORTS:
+        form.kind.data = request.args['kind']
+    result = None
+    if form.validate_on_submit():
+        upload = form.file.data
+        try:
+            result = import_records(form.kind.data, read_records(upload.stream, upload.filename.lower()),
+                                    dry_run=form.dry_run.data)
+        except (ValueError, OSError, csv.Error) as e:
+            # Malformed JSON, undecodable text or a corrupt .gz; earlier chunks stay committed
+            db.session.rollback()
+            flash(f'Could not read {upload.filename}: {e}', 'danger')
+        else:
+            verb = 'validated' if form.dry_run.data else 'imported'
+            flash(f'{result.imported} rows {verb}, {result.skipped} skipped.',
+                  'warning' if result.skipped else 'success')
+    return render_template('admin/import.html', form=form, result=result)
+
+@bp.route('/outbox/<int:id>/retry', methods=['POST'])
+@login_required
+def retry_notification(id):
+    item = EmailOutbox.query.get_or_404(id)
+    retry_email(item)
+    db.session.commit()
+    notify_worker()
+    flash('Email notification queued for another attempt.', 'success')
+    return redirect(url_for('admin.messages'))
+
 # Admin Management
 @bp.route('/admins')
 @login_required
+@query_budget(3)
 def admins():
     admin_users = AdminUser.query.order_by(AdminUser.created_at.desc()).all()
     return render_template('admin/admins.html', admin_users=admin_users)
@@ -383,18 +546,39 @@ def settings():
         form.twitter_url.data = get_setting('twitter_url', '')
     
     if form.validate_on_submit():
-        # Save all settings
-        set_setting('site_title', form.site_title.data)
-        set_setting('site_description', form.site_description.data)
-        set_setting('hero_title', form.hero_title.data)
-        set_setting('hero_subtitle', form.hero_subtitle.data)
-        set_setting('about_text', form.about_text.data)
-        set_setting('contact_email', form.contact_email.data)
-        set_setting('github_url', form.github_url.data)
-        set_setting('linkedin_url', form.linkedin_url.data)
-        set_setting('twitter_url', form.twitter_url.data)
+        # Save all settings in one upsert
+        set_settings({
+            'site_title': form.site_title.data,
+            'site_description': form.site_description.data,
+            'hero_title': form.hero_title.data,
+            'hero_subtitle': form.hero_subtitle.data,
+            'about_text': form.about_text.data,
+            'about_text_html': render_setting(form.about_text.data),
+            'contact_email': form.contact_email.data,
+            'github_url': form.github_url.data,
+            'linkedin_url': form.linkedin_url.data,
+            'twitter_url': form.twitter_url.data,
+        })
+        purge_pages('settings')
         
         flash('Settings updated successfully!', 'success')
         return redirect(url_for('admin.settings'))
     
     return render_template('admin/settings.html', form=form)
+
+@bp.route('/performance')
+@login_required
+def performance():
+    endpoints = endpoint_stats.snapshot()
+    for row in endpoints:
+        row['budget'] = budget_for(row['endpoint'])
+    return render_template('admin/performance.html', endpoints=endpoints, pool=pool_status(),
+                           worker_pid=os.getpid(), budget_mode=current_app.config.get('QUERY_BUDGET_MODE'))
+
+@bp.route('/performance/reset', methods=['POST'])
+@login_required
+def reset_performance():
+    endpoint_stats.reset()
+    pool_stats.reset()
+    flash('Endpoint and connection pool statistics cleared.', 'success')
+    return redirect(url_for('admin.performance'))
@@ -1,106 +1,219 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
-from flask_mail import Message
-from app import db, mail
-from models import Project, Skill, Experience, BlogPost, Testimonial, ContactMessage, SiteSettings
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, abort
+from app import db
+from models import Project, Skill, Experience, BlogPost, Testimonial, ContactMessage, SiteSettings, Tag, RenderedContent
 from forms import ContactForm
-from utils import parse_tags, get_setting
+from utils import get_setting, settings_version
+from cache import cached_page, render_conditional, conditional_response, content_etag, row_version
+from search import search as run_search
+from feeds import (STATIC_ENDPOINTS, atom_feed, rss_feed, iter_urlset, post_versions, project_versions,
+                   recent_posts, sitemap_index, sitemap_sections, sitemap_urls)
+from outbox import enqueue_email, notify_worker
+from pagination import paginate_listing
+from instrumentation import query_budget
+from database import use_replica
+from sqlalchemy.orm import joinedload, lazyload
+from markupsafe import Markup
 from collections import defaultdict
+from functools import partial
+from datetime import datetime
 
 
 bp = Blueprint('main', __name__)
 
+PROJECTS_PER_PAGE = 9
+BLOG_PER_PAGE = 6
+
+# Sidebar cards show only title and image, so skip the eager tag/technology loads
+SIDEBAR_PROJECT_OPTIONS = (lazyload(Project.tag_items), lazyload(Project.tech_items))
+# Listing cards only need the stored excerpt, not the pre-rendered body
+PROJECT_CARD_OPTIONS = (joinedload(Project.rendered).load_only(RenderedContent.excerpt),)
+POST_CARD_OPTIONS = (joinedload(BlogPost.rendered).load_only(RenderedContent.excerpt),)
+
+def skills_by_category(*order_by):
+    """Skills grouped by category; templates call this inside their {% cache %} block"""
+    groups = defaultdict(list)
+    for skill in Skill.query.order_by(*order_by).all():
+        groups[skill.category].append(skill)
+    return groups
+
+def tag_cloud():
+    """Tags used by at least one published post, from the precomputed counts"""
+    return Tag.query.filter(Tag.post_count > 0).order_by(Tag.name).all()
+
 @bp.route('/')
+@query_budget(5)
+@cached_page('projects', 'skills')
+@use_replica
 def index():
-    featured_projects = Project.query.filter_by(is_featured=True).order_by(Project.order_index).limit(3).all()
+    featured_projects = Project.query.options(*PROJECT_CARD_OPTIONS).filter_by(is_featured=True).order_by(Project.order_index).limit(3).all()
     hero_title = get_setting('hero_title', 'Hi, I\'m Shawaiz')
     hero_subtitle = get_setting('hero_subtitle', 'I\'m a web developer and game builder.')
 
-    # Group skills by category
-    skills_by_category = defaultdict(list)
-    all_skills = Skill.query.all()
-    for skill in all_skills:
-        skills_by_category[skill.category].append({
-            'name': skill.name,
-            'level': skill.level
-        })
-
     return render_template('index.html', 
                            featured_projects=featured_projects,
                            hero_title=hero_title,
                            hero_subtitle=hero_subtitle,
                            skills_by_category=skills_by_category)
 @bp.route('/about')
+@query_budget(5)
+@cached_page('experience', 'projects', 'blog')
+@use_replica
 def about():
-    experiences = Experience.query.order_by(Experience.order_index.desc()).all()
-    about_text = get_setting('about_text', '')
+    experiences = Experience.query.options(joinedload(Experience.rendered)).order_by(Experience.order_index.desc()).all()
+    # Sanitized copy saved with the settings form; the raw value covers sites not yet backfilled
+    about_text = Markup(get_setting('about_text_html') or get_setting('about_text', ''))
     return render_template('about.html', experiences=experiences, about_text=about_text)
 
 @bp.route('/projects')
+@query_budget(6)
+@cached_page('projects')
+@use_replica
 def projects():
     category = request.args.get('category', 'all')
-    page = request.args.get('page', 1, type=int)
     
-    query = Project.query
+    query = Project.query.options(*PROJECT_CARD_OPTIONS)
     if category != 'all':
         query = query.filter_by(category=category)
     
-    projects = query.order_by(Project.order_index.desc(), Project.created_at.desc()).paginate(
-        page=page, per_page=9, error_out=False
-    )
+    projects = paginate_listing(query, (Project.order_index, Project.created_at, Project.id), per_page=PROJECTS_PER_PAGE)
     
     categories = db.session.query(Project.category).distinct().all()
     categories = [cat[0] for cat in categories]
     
-    return render_template('projects.html', 
-                         projects=projects, 
-                         categories=categories, 
-                         current_category=category)
+    # Projects carry no update timestamp, so only an ETag is emitted
+    etag = content_etag(category, projects.page, projects.total, request.args.get('cursor'),
+                        [row_version(p) for p in projects.items], categories)
+    return render_conditional(etag, None, 'projects.html', 
+                              projects=projects, 
+                              categories=categories, 
+                              current_category=category)
 
 @bp.route('/project/<int:id>')
+@query_budget(5)
+@cached_page('projects', 'project:{id}')
+@use_replica
 def project_detail(id):
-    project = Project.query.get_or_404(id)
-    return render_template('project_detail.html', project=project)
+    project = Project.query.options(joinedload(Project.rendered)).get_or_404(id)
+    related_projects = Project.query.options(*SIDEBAR_PROJECT_OPTIONS).filter(
+        Project.category == project.category, Project.id != project.id
+    ).limit(3).all()
+    etag = content_etag(row_version(project), project.rendered and project.rendered.rendered_at, [row_version(p) for p in related_projects])
+    return render_conditional(etag, None, 'project_detail.html',
+                              project=project, related_projects=related_projects)
 
 @bp.route('/skills')
+@query_budget(2)
+@cached_page('skills')
+@use_replica
 def skills():
-    skills_by_category = {}
-    skills = Skill.query.order_by(Skill.category, Skill.order_index).all()
-    
-    for skill in skills:
-        if skill.category not in skills_by_category:
-            skills_by_category[skill.category] = []
-        skills_by_category[skill.category].append(skill)
-    
-    return render_template('skills.html', skills_by_category=skills_by_category)
+    return render_template('skills.html',
+                           skills_by_category=partial(skills_by_category, Skill.category, Skill.order_index))
 
 @bp.route('/blog')
+@query_budget(6)
+@cached_page('blog', 'projects')
+@use_replica
 def blog():
-    page = request.args.get('page', 1, type=int)
     tag = request.args.get('tag')
     
-    query = BlogPost.query.filter_by(is_published=True)
+    query = BlogPost.query.options(*POST_CARD_OPTIONS).filter_by(is_published=True)
     if tag:
-        query = query.filter(BlogPost.tags.like(f'%{tag}%'))
-    
-    posts = query.order_by(BlogPost.created_at.desc()).paginate(
-        page=page, per_page=6, error_out=False
-    )
+        query = query.join(BlogPost.tag_items).filter(Tag.name == tag)
     
-    # Get all tags
-    all_posts = BlogPost.query.filter_by(is_published=True).all()
-    all_tags = set()
-    for post in all_posts:
-        if post.tags:
-            all_tags.update(parse_tags(post.tags))
+    posts = paginate_listing(query, (BlogPost.created_at, BlogPost.id), per_page=BLOG_PER_PAGE)
     
-    return render_template('blog.html', posts=posts, all_tags=sorted(all_tags), current_tag=tag)
+    all_tags = tag_cloud()
+    recent_projects = Project.query.options(*SIDEBAR_PROJECT_OPTIONS).filter_by(is_featured=True).limit(3).all()
+    etag = content_etag(tag, posts.page, posts.total, request.args.get('cursor'),
+                        [row_version(p) for p in posts.items],
+                        [(t.name, t.post_count) for t in all_tags],
+                        [row_version(p) for p in recent_projects])
+    # No Last-Modified: deleting or unpublishing a post, or a tag, sidebar or settings change,
+    # moves no timestamp on this page, so If-Modified-Since alone would keep stale copies
+    return render_conditional(etag, None, 'blog.html',
+                              posts=posts, all_tags=all_tags, current_tag=tag,
+                              recent_projects=recent_projects)
 
 @bp.route('/blog/<slug>')
+@query_budget(6)
+@cached_page('blog', 'blog:{slug}')
+@use_replica
 def blog_detail(slug):
-    post = BlogPost.query.filter_by(slug=slug, is_published=True).first_or_404()
-    return render_template('blog_detail.html', post=post)
+    post = BlogPost.query.options(joinedload(BlogPost.rendered)).filter_by(slug=slug, is_published=True).first_or_404()
+    all_tags = tag_cloud()
+    related_posts = BlogPost.query.filter(
+        BlogPost.is_published == True,
+        BlogPost.id != post.id
+    ).order_by(BlogPost.created_at.desc()).limit(3).all()
+    etag = content_etag(row_version(post), post.rendered and post.rendered.rendered_at, [(t.name, t.post_count) for t in all_tags],
+                        [row_version(p) for p in related_posts])
+    # ETag only, as for the blog listing: related posts and tags can change without a newer timestamp
+    return render_conditional(etag, None, 'blog_detail.html',
+                              post=post, all_tags=all_tags, related_posts=related_posts)
+
+@bp.route('/search')
+@query_budget(8)
+@cached_page('blog', 'projects')
+@use_replica
+def search():
+    query = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+    results = run_search(query, page=page, per_page=10)
+    return render_template('search.html', results=results, query=query)
+
+@bp.route('/sitemap.xml')
+@query_budget(3)
+@cached_page('blog', 'projects')
+@use_replica
+def sitemap():
+    posts, projects = post_versions(), project_versions()
+    max_urls = current_app.config['SITEMAP_MAX_URLS']
+    sections = sitemap_sections(posts, projects, max_urls)
+    etag = content_etag('sitemap', posts, projects, max_urls)
+    if len(STATIC_ENDPOINTS) + posts.count + projects.count > max_urls:
+        return conditional_response(etag, None, lambda: sitemap_index(sections), 'application/xml')
+    # Streamed after the view returns, so the rows are read from the primary; the page cache keeps that rare
+    return conditional_response(etag, None, lambda: iter_urlset(sitemap_urls()), 'application/xml')
+
+@bp.route('/sitemap-<section>-<int:number>.xml')
+@query_budget(3)
+@cached_page('blog', 'projects')
+@use_replica
+def sitemap_file(section, number):
+    posts, projects = post_versions(), project_versions()
+    max_urls = current_app.config['SITEMAP_MAX_URLS']
+    if (section, number) not in sitemap_sections(posts, projects, max_urls):
+        abort(404)
+    etag = content_etag('sitemap', section, number, posts, projects, max_urls)
+    return conditional_response(etag, None,
+                                lambda: iter_urlset(sitemap_urls(section, number, max_urls)),
+                                'application/xml')
+
+def _feed(document, mimetype):
+    posts = post_versions()
+    limit = current_app.config['FEED_ENTRIES']
+    # The feed's title and description are site settings
+    etag = content_etag(request.path, posts, limit, settings_version())
+    updated = posts.newest or datetime.utcnow()
+    return conditional_response(etag, None,
+                                lambda: document(recent_posts(limit), updated), mimetype)
+
+@bp.route('/feed.xml')
+@query_budget(5)
+@cached_page('blog', 'settings')
+@use_replica
+def atom():
+    return _feed(atom_feed, 'application/atom+xml')
+
+@bp.route('/rss.xml')
+@query_budget(5)
+@cached_page('blog', 'settings')
+@use_replica
+def rss():
+    return _feed(rss_feed, 'application/rss+xml')
 
 @bp.route('/contact', methods=['GET', 'POST'])
+@use_replica
 def contact():
     form = ContactForm()
     
@@ -112,27 +225,25 @@ def contact():
         message.subject = form.subject.data
         message.message = form.message.data
         db.session.add(message)
-        db.session.commit()
         
-        # Send email notification (if configured)
-        try:
-            contact_email = get_setting('contact_email')
-            if contact_email and mail.mail:
-                msg = Message(
-                    subject=f"Portfolio Contact: {form.subject.data or 'New Message'}",
-                    recipients=[contact_email],
-                    body=f"""
+        # Queue the email notification (if configured) in the same transaction
+        contact_email = get_setting('contact_email')
+        if contact_email and current_app.config.get('MAIL_SERVER'):
+            enqueue_email(
+                contact_email,
+                subject=f"Portfolio Contact: {form.subject.data or 'New Message'}",
+                body=f"""
 Name: {form.name.data}
 Email: {form.email.data}
 Subject: {form.subject.data}
 
 Message:
 {form.message.data}
-                    """
-                )
-                mail.send(msg)
-        except Exception as e:
-            print(f"Failed to send email: {e}")
+                """,
+                contact_message=message,
+            )
+        db.session.commit()
+        notify_worker()
         
         flash('Thank you for your message! I\'ll get back to you soon.', 'success')
         return redirect(url_for('main.contact'))
@@ -0,0 +1,247 @@
+import math
+import re
+from markupsafe import Markup, escape
+from sqlalchemy import bindparam, text
+from app import db
+
+# One row per searchable document. On SQLite this is an FTS5 virtual table;
+# on PostgreSQL a regular table with a weighted tsvector column and GIN index.
+SEARCH_TABLE = 'search_index'
+
+# Snippet highlight markers; swapped for <mark> after the snippet is escaped
+_HIT_START, _HIT_END = '\x02', '\x03'
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+def _dialect():
+    return db.engine.dialect.name
+
+def ensure_search_index():
+    """Create the search index table if it does not exist yet"""
+    if _dialect() == 'postgresql':
+        db.session.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (
+                kind VARCHAR(16) NOT NULL,
+                ref_id INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                body TEXT NOT NULL,
+                document TSVECTOR GENERATED ALWAYS AS (
+                    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                    setweight(to_tsvector('english', coalesce(body, '')), 'B')
+                ) STORED,
+                PRIMARY KEY (kind, ref_id)
+            )
+        """))
+        db.session.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document "
+            f"ON {SEARCH_TABLE} USING GIN (document)"
+        ))
+    else:
+        db.session.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            f"kind UNINDEXED, ref_id UNINDEXED, title, body, tokenize='porter unicode61')"
+        ))
+    db.session.commit()
+
+def _plain_text(*parts):
+    """Join the given HTML/text fragments into whitespace-normalized plain text"""
+    joined = ' '.join(part for part in parts if part)
+    return ' '.join(_TAG_RE.sub(' ', joined).split())
+
+# FTS5 can only look rows up quickly by rowid, so each document gets a rowid
+# derived from its kind and id and deletes never scan the index.
+_KIND_CODES = {'post': 0, 'project': 1}
+
+def _document(kind, ref_id, title, body):
+    return {'rowid': ref_id * len(_KIND_CODES) + _KIND_CODES[kind],
+            'kind': kind, 'ref_id': ref_id, 'title': title or '', 'body': body}
+
+def _insert_sql():
+    if _dialect() == 'postgresql':
+        return text(f"INSERT INTO {SEARCH_TABLE} (kind, ref_id, title, body) VALUES (:kind, :ref_id, :title, :body)")
+    return text(f"INSERT INTO {SEARCH_TABLE} (rowid, kind, ref_id, title, body) VALUES (:rowid, :kind, :ref_id, :title, :body)")
+
+def index_document(kind, ref_id, title, body):
+    """Insert or replace one document; runs in the caller's transaction"""
+    remove_document(kind, ref_id)
+    db.session.execute(_insert_sql(), _document(kind, ref_id, title, body))
+
+def index_documents(documents):
+    """Bulk-insert (kind, ref_id, title, summary, html body) tuples for rows not yet in the index"""
+    if documents:
+        db.session.execute(_insert_sql(), [
+            _document(kind, ref_id, title, _plain_text(summary, body))
+            for kind, ref_id, title, summary, body in documents
+        ])
+
+def remove_document(kind, ref_id):
+    """Drop one document from the index; runs in the caller's transaction"""
+    if _dialect() == 'postgresql':
+        sql = f"DELETE FROM {SEARCH_TABLE} WHERE kind = :kind AND ref_id = :ref_id"
+    else:
+        sql = f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :rowid"
+    db.session.execute(text(sql), _document(kind, ref_id, None, None))
+
+def remove_documents(kind, ref_ids):
+    """Drop several documents of one kind from the index in a single statement"""
+    if not ref_ids:
+        return
+    if _dialect() == 'postgresql':
+        stmt = text(f"DELETE FROM {SEARCH_TABLE} WHERE kind = :kind AND ref_id IN :ref_ids").bindparams(
+            bindparam('ref_ids', expanding=True))
+        db.session.execute(stmt, {'kind': kind, 'ref_ids': list(ref_ids)})
+    else:
+        stmt = text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN :rowids").bindparams(
+            bindparam('rowids', expanding=True))
+        db.session.execute(stmt, {'rowids': [_document(kind, ref_id, None, None)['rowid'] for ref_id in ref_ids]})
+
+def index_blog_post(post):
+    """Index a blog post if published, otherwise make sure it is not searchable"""
+    db.session.flush()
+    if post.is_published:
+        index_document('post', post.id, post.title, _plain_text(post.excerpt, post.content))
+    else:
+        remove_document('post', post.id)
+
+def index_project(project):
+    """Index a project's title and descriptions"""
+    db.session.flush()
+    index_document('project', project.id, project.title,
+                   _plain_text(project.short_description, project.description))
+
+def rebuild_search_index(batch_size=1000):
+    """Recreate every index entry from the content tables"""
+    from models import BlogPost, Project
+    ensure_search_index()
+    db.session.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    
+    sources = (
+        ('post', db.session.query(BlogPost.id, BlogPost.title, BlogPost.excerpt, BlogPost.content)
+                           .filter(BlogPost.is_published.is_(True))),
+        ('project', db.session.query(Project.id, Project.title, Project.short_description, Project.description)),
+    )
+    insert = _insert_sql()
+    for kind, query in sources:
+        batch = []
+        for ref_id, title, summary, body in query.yield_per(batch_size):
+            batch.append(_document(kind, ref_id, title, _plain_text(summary, body)))
+            if len(batch) >= batch_size:
+                db.session.execute(insert, batch)
+                batch = []
+        if batch:
+            db.session.execute(insert, batch)
+    db.session.commit()
+
+def _fts5_query(query):
+    """Turn free text into a safe FTS5 expression: all words, last one as prefix"""
+    words = _WORD_RE.findall(query)
+    if not words:
+        return None
+    terms = ['"%s"' % word.replace('"', '""') for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+def _highlight(snippet):
+    escaped = str(escape(snippet or ''))
+    return Markup(escaped.replace(_HIT_START, '<mark>').replace(_HIT_END, '</mark>'))
+
+class SearchHit:
+    def __init__(self, kind, ref_id, title, snippet, rank):
+        self.kind = kind
+        self.ref_id = ref_id
+        self.title = title
+        self.snippet = snippet
+        self.rank = rank
+        self.obj = None
+
+class SearchResults:
+    """Pagination-compatible page of search hits (mirrors the template API of .paginate())"""
+
+    def __init__(self, items, page, per_page, total):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.pages = max(1, math.ceil(total / per_page)) if total else 0
+        self.has_prev = page > 1
+        self.has_next = page < self.pages
+        self.prev_num = page - 1 if self.has_prev else None
+        self.next_num = page + 1 if self.has_next else None
+
+    def iter_pages(self, left_edge=2, left_current=2, right_current=4, right_edge=2):
+        last = 0
+        for num in range(1, self.pages + 1):
+            if (num <= left_edge
+                    or self.page - left_current - 1 < num < self.page + right_current
+                    or num > self.pages - right_edge):
+                if last + 1 != num:
+                    yield None
+                yield num
+                last = num
+
+def _search_sqlite(query, limit, offset):
+    match = _fts5_query(query)
+    if match is None:
+        return [], 0
+    params = {'match': match, 'limit': limit, 'offset': offset,
+              'start': _HIT_START, 'end': _HIT_END}
+    total = db.session.execute(
+        text(f"SELECT count(*) FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match"), params
+    ).scalar()
+    rows = db.session.execute(text(f"""
+        SELECT kind, ref_id, title,
+               snippet({SEARCH_TABLE}, 3, :start, :end, '…', 32) AS snippet,
+               bm25({SEARCH_TABLE}, 0.0, 0.0, 10.0, 1.0) AS rank
+        FROM {SEARCH_TABLE}
+        WHERE {SEARCH_TABLE} MATCH :match
+        ORDER BY rank
+        LIMIT :limit OFFSET :offset
+    """), params).all()
+    return rows, total
+
+def _search_postgresql(query, limit, offset):
+    params = {'query': query, 'limit': limit, 'offset': offset,
+              'options': f'StartSel={_HIT_START}, StopSel={_HIT_END}, MaxWords=35, MinWords=15'}
+    total = db.session.execute(text(f"""
+        SELECT count(*) FROM {SEARCH_TABLE}
+        WHERE document @@ websearch_to_tsquery('english', :query)
+    """), params).scalar()
+    # ts_headline is expensive, so it only runs on the rows of the current page
+    rows = db.session.execute(text(f"""
+        SELECT hit.kind, hit.ref_id, hit.title,
+               ts_headline('english', hit.body, hit.q, :options) AS snippet,
+               hit.rank
+        FROM (
+            SELECT kind, ref_id, title, body, q, ts_rank_cd(document, q) AS rank
+            FROM {SEARCH_TABLE}, websearch_to_tsquery('english', :query) AS q
+            WHERE document @@ q
+            ORDER BY rank DESC
+            LIMIT :limit OFFSET :offset
+        ) AS hit
+        ORDER BY hit.rank DESC
+    """), params).all()
+    return rows, total
+
+def search(query, page=1, per_page=10):
+    """Run a ranked full-text query and return a page of hits with their rows attached"""
+    from models import BlogPost, Project
+
+    query = (query or '').strip()
+    page = max(page, 1)
+    if not query:
+        return SearchResults([], page, per_page, 0)
+
+    run = _search_postgresql if _dialect() == 'postgresql' else _search_sqlite
+    rows, total = run(query, per_page, (page - 1) * per_page)
+    hits = [SearchHit(row.kind, row.ref_id, row.title, _highlight(row.snippet), row.rank) for row in rows]
+
+    # Hydrate in one query per content type
+    post_ids = [hit.ref_id for hit in hits if hit.kind == 'post']
+    project_ids = [hit.ref_id for hit in hits if hit.kind == 'project']
+    posts = {p.id: p for p in BlogPost.query.filter(BlogPost.id.in_(post_ids)).all()} if post_ids else {}
+    projects = {p.id: p for p in Project.query.filter(Project.id.in_(project_ids)).all()} if project_ids else {}
+    for hit in hits:
+        hit.obj = (posts if hit.kind == 'post' else projects).get(hit.ref_id)
+
+    return SearchResults([hit for hit in hits if hit.obj is not None], page, per_page, total)
@@ -0,0 +1,152 @@
+"""
+Maintained row counters for the admin dashboard and navigation badges.
+
+Counts are kept in the site_counter table and adjusted by a session
+after_flush hook whenever tracked rows are inserted, deleted or (for unread
+messages) flipped to read, in the same transaction as the change. Reads go
+through a short-lived per-process cache. Anything that bypasses the ORM unit
+of work (bulk UPDATE/DELETE, raw SQL) either calls adjust_counter() itself or
+is corrected by the periodic reconcile job.
+"""
+
+import logging
+import os
+import threading
+import time
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+from app import db
+from models import SiteCounter, Project, BlogPost, ContactMessage, Skill
+
+logger = logging.getLogger(__name__)
+
+COUNTER_CACHE_TTL = 10  # seconds a worker may serve counters committed by other workers
+
+# counter name -> (model, extra criteria for rows that count)
+TRACKED = {
+    'projects': (Project, ()),
+    'blog_posts': (BlogPost, ()),
+    'unread_messages': (ContactMessage, (ContactMessage.is_read == False,)),  # noqa: E712
+    'skills': (Skill, ()),
+}
+
+def _counts_row(obj):
+    """Counter names an ORM object currently contributes to"""
+    if isinstance(obj, ContactMessage):
+        return ('unread_messages',) if not obj.is_read else ()
+    for name, (model, _) in TRACKED.items():
+        if isinstance(obj, model):
+            return (name,)
+    return ()
+
+def _flush_deltas(session):
+    deltas = {}
+    for obj in session.new:
+        for name in _counts_row(obj):
+            deltas[name] = deltas.get(name, 0) + 1
+    for obj in session.deleted:
+        # A deleted row counts as it did in the database, before any unflushed edits
+        if isinstance(obj, ContactMessage):
+            history = db.inspect(obj).attrs.is_read.history
+            was_read = history.deleted[0] if history.deleted else obj.is_read
+            if not was_read:
+                deltas['unread_messages'] = deltas.get('unread_messages', 0) - 1
+            continue
+        for name in _counts_row(obj):
+            deltas[name] = deltas.get(name, 0) - 1
+    for obj in session.dirty:
+        if isinstance(obj, ContactMessage) and obj not in session.deleted:
+            history = db.inspect(obj).attrs.is_read.history
+            if history.added and history.deleted and bool(history.added[0]) != bool(history.deleted[0]):
+                deltas['unread_messages'] = deltas.get('unread_messages', 0) + (-1 if history.added[0] else 1)
+    return {name: delta for name, delta in deltas.items() if delta}
+
+def adjust_counter(name, delta, connection=None):
+    """Atomically add delta to a counter in the current transaction"""
+    stmt = update(SiteCounter).where(SiteCounter.name == name).values(value=SiteCounter.value + delta)
+    (connection or db.session).execute(stmt)
+
+@event.listens_for(Session, 'after_flush')
+def _apply_counter_deltas(session, flush_context):
+    deltas = _flush_deltas(session)
+    if not deltas:
+        return
+    connection = session.connection()
+    for name, delta in deltas.items():
+        adjust_counter(name, delta, connection)
+    session.info['counters_changed'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _expire_counter_cache(session):
+    if session.info.pop('counters_changed', False):
+        invalidate_counters()
+
+_cache = None
+_cache_loaded_at = 0.0
+
+def invalidate_counters():
+    global _cache
+    _cache = None
+
+def get_counters():
+    """All counters as a dict, read with a single query and cached briefly"""
+    global _cache, _cache_loaded_at
+    if _cache is not None and time.monotonic() - _cache_loaded_at < COUNTER_CACHE_TTL:
+        return _cache
+    counters = dict(db.session.execute(select(SiteCounter.name, SiteCounter.value)).all())
+    if any(name not in counters for name in TRACKED):
+        counters = reconcile_counters()
+    _cache = counters
+    _cache_loaded_at = time.monotonic()
+    return counters
+
+def reconcile_counters():
+    """Recount every tracked table and overwrite the stored counters; returns the fresh values"""
+    counters = {}
+    for name, (model, criteria) in TRACKED.items():
+        counters[name] = db.session.execute(
+            select(func.count()).select_from(model).where(*criteria)
+        ).scalar()
+    stored = {counter.name: counter for counter in SiteCounter.query.all()}
+    for name, value in counters.items():
+        counter = stored.get(name)
+        if counter is None:
+            counter = SiteCounter()
+            counter.name = name
+            db.session.add(counter)
+        elif counter.value != value:
+            logger.info("Counter %s drifted: stored %s, actual %s", name, counter.value, value)
+        counter.value = value
+    db.session.commit()
+    invalidate_counters()
+    return counters
+
+_reconciler = None
+_reconciler_pid = None
+_reconciler_lock = threading.Lock()
+
+def _reconcile_loop(app, interval):
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                reconcile_counters()
+            except Exception:
+                logger.exception("Counter reconcile failed")
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+def start_reconcile_thread(app):
+    """Start the periodic reconcile job once per process (safe to call on every request)"""
+    global _reconciler, _reconciler_pid
+    interval = app.config.get('STATS_RECONCILE_INTERVAL', 3600)
+    if interval <= 0 or _reconciler_pid == os.getpid():
+        return
+    with _reconciler_lock:
+        if _reconciler_pid == os.getpid():
+            return
+        _reconciler = threading.Thread(target=_reconcile_loop, args=(app, interval),
+                                       name='stats-reconcile', daemon=True)
+        _reconciler.start()
+        _reconciler_pid = os.getpid()
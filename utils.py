@@ -1,7 +1,13 @@
+import hashlib
+import itertools
 import os
-import uuid
+import threading
+import time
+from flask import current_app
 from werkzeug.utils import secure_filename
-from PIL import Image
+from sqlalchemy import bindparam, select, update, func
+from images import schedule_processing
+from media import store_upload
 import re
 
 def allowed_file(filename, allowed_extensions):
@@ -9,35 +15,23 @@ def allowed_file(filename, allowed_extensions):
            filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
 def save_uploaded_file(file, upload_folder, max_size=None):
-    """Save uploaded file with unique filename"""
+    """Save uploaded file under the hash of its content (see media.py)"""
     if file and allowed_file(file.filename, {'png', 'jpg', 'jpeg', 'gif'}):
-        # Generate unique filename
         filename = secure_filename(file.filename)
         name, ext = os.path.splitext(filename)
-        unique_filename = f"{uuid.uuid4().hex}{ext}"
+        stored_filename, created = store_upload(file.stream, upload_folder, ext)
         
-        # Ensure upload directory exists
-        os.makedirs(upload_folder, exist_ok=True)
+        # Resize and build responsive variants off the request thread; a duplicate already has them
+        if created:
+            schedule_processing(
+                os.path.join(upload_folder, stored_filename), max_size,
+                max_workers=current_app.config.get('IMAGE_WORKERS', 2),
+                inline=current_app.config.get('IMAGE_PROCESSING') == 'inline',
+            )
         
-        file_path = os.path.join(upload_folder, unique_filename)
-        file.save(file_path)
-        
-        # Resize image if max_size is specified
-        if max_size:
-            resize_image(file_path, max_size)
-        
-        return unique_filename
+        return stored_filename
     return None
 
-def resize_image(file_path, max_size):
-    """Resize image to fit within max_size while maintaining aspect ratio"""
-    try:
-        with Image.open(file_path) as img:
-            img.thumbnail(max_size, Image.Resampling.LANCZOS)
-            img.save(file_path, optimize=True, quality=85)
-    except Exception as e:
-        print(f"Error resizing image: {e}")
-
 def create_slug(title):
     """Create URL-friendly slug from title"""
     # Convert to lowercase and replace spaces with hyphens
@@ -45,11 +39,67 @@ def create_slug(title):
     slug = re.sub(r'[-\s]+', '-', slug)
     return slug.strip('-')
 
+def unique_slug(slug, taken, max_length=150):
+    """Return slug, or slug-2, slug-3, ... if it is already in taken; records the result in taken"""
+    slug = slug[:max_length] or 'post'
+    candidate, n = slug, 2
+    while candidate in taken:
+        suffix = f'-{n}'
+        candidate = slug[:max_length - len(suffix)] + suffix
+        n += 1
+    taken.add(candidate)
+    return candidate
+
+# Per-worker cache of all SiteSettings rows, keyed by setting key.
+# Writes through set_setting/set_settings refresh it in place; the TTL bounds
+# how long other workers can serve a value changed elsewhere.
+SETTINGS_CACHE_TTL = int(os.environ.get('SETTINGS_CACHE_TTL', 60))
+_settings_cache = None  # (generation, loaded at, settings, version)
+_settings_generation = 0
+_settings_generations = itertools.count(1)
+_settings_lock = threading.Lock()
+
+def _fresh_settings():
+    cache = _settings_cache
+    if (cache is not None and cache[0] == _settings_generation
+            and time.monotonic() - cache[1] < SETTINGS_CACHE_TTL):
+        return cache
+    return None
+
+def _load_settings():
+    """Return (settings dict, version), loading all rows in one query if stale"""
+    global _settings_cache
+    cache = _fresh_settings()
+    if cache is None:
+        from app import db
+        from models import SiteSettings
+        with _settings_lock:
+            # Another thread may have reloaded while this one waited for the lock
+            cache = _fresh_settings()
+            if cache is None:
+                generation = _settings_generation
+                rows = db.session.query(SiteSettings.key, SiteSettings.value).all()
+                cache = (generation, time.monotonic(), {key: value for key, value in rows},
+                         hashlib.sha1(repr(sorted(rows)).encode()).hexdigest()[:12])
+                # Rows read before an invalidation must not be cached after it. The generation
+                # stored with them also makes readers reject a store that races the check.
+                if generation == _settings_generation:
+                    _settings_cache = cache
+    return cache[2], cache[3]
+
+def invalidate_settings_cache():
+    """Drop the cached settings so the next lookup reloads them"""
+    global _settings_generation
+    _settings_generation = next(_settings_generations)
+
+def settings_version():
+    """Short fingerprint of the current settings, for use in cache validators"""
+    return _load_settings()[1]
+
 def get_setting(key, default=None):
     """Get site setting value"""
-    from models import SiteSettings
-    setting = SiteSettings.query.filter_by(key=key).first()
-    return setting.value if setting else default
+    settings = _load_settings()[0]
+    return settings[key] if key in settings else default
 
 def set_setting(key, value, description=None):
     """Set site setting value"""
@@ -69,8 +119,31 @@ def set_setting(key, value, description=None):
         db.session.add(setting)
     
     db.session.commit()
+    invalidate_settings_cache()
     return setting
 
+def set_settings(values):
+    """Upsert several site settings in a single query and commit"""
+    from app import db
+    from models import SiteSettings
+    
+    existing = {
+        setting.key: setting
+        for setting in SiteSettings.query.filter(SiteSettings.key.in_(list(values))).all()
+    }
+    for key, value in values.items():
+        setting = existing.get(key)
+        if setting:
+            setting.value = value
+        else:
+            setting = SiteSettings()
+            setting.key = key
+            setting.value = value
+            db.session.add(setting)
+    
+    db.session.commit()
+    invalidate_settings_cache()
+
 def parse_tags(tags_string):
     """Parse comma-separated tags string into list"""
     if not tags_string:
@@ -82,3 +155,128 @@ def parse_tech_stack(tech_string):
     if not tech_string:
         return []
     return [tech.strip() for tech in tech_string.split(',') if tech.strip()]
+
+def _tags_by_name(names):
+    """Fetch Tag rows for the given names, creating any that are missing"""
+    from app import db
+    from models import Tag
+    
+    tags = {tag.name: tag for tag in Tag.query.filter(Tag.name.in_(names)).all()} if names else {}
+    for name in names:
+        if name not in tags:
+            tag = Tag()
+            tag.name = name
+            db.session.add(tag)
+            tags[name] = tag
+    db.session.flush()
+    return tags
+
+def _replace_tags(table, owner_column, owner_id, names):
+    """Rewrite one owner's association rows and return every tag id touched"""
+    from app import db
+    
+    owner = table.c[owner_column]
+    old_ids = set(db.session.execute(select(table.c.tag_id).where(owner == owner_id)).scalars())
+    db.session.execute(table.delete().where(owner == owner_id))
+    
+    names = list(dict.fromkeys(name[:50] for name in names))
+    tags = _tags_by_name(names)
+    if names:
+        db.session.execute(table.insert(), [
+            {owner_column: owner_id, 'tag_id': tags[name].id, 'position': position}
+            for position, name in enumerate(names)
+        ])
+    return old_ids | {tag.id for tag in tags.values()}
+
+def bulk_attach_tags(table, owner_column, names_by_owner):
+    """Insert association rows for freshly created owners ({owner id: [names]}); returns {owner id: [tag ids]}"""
+    from app import db
+    
+    names_by_owner = {
+        owner_id: list(dict.fromkeys(name[:50] for name in names))
+        for owner_id, names in names_by_owner.items()
+    }
+    all_names = list(dict.fromkeys(name for names in names_by_owner.values() for name in names))
+    if not all_names:
+        return {}
+    tags = _tags_by_name(all_names)
+    db.session.execute(table.insert(), [
+        {owner_column: owner_id, 'tag_id': tags[name].id, 'position': position}
+        for owner_id, names in names_by_owner.items()
+        for position, name in enumerate(names)
+    ])
+    return {owner_id: [tags[name].id for name in names] for owner_id, names in names_by_owner.items()}
+
+def adjust_tag_counts(deltas):
+    """Add {tag id: n} to the stored published-post counts without recounting"""
+    from app import db
+    from models import Tag
+    
+    if not deltas:
+        return
+    table = Tag.__table__
+    db.session.execute(
+        table.update()
+        .where(table.c.id == bindparam('tag_id'))
+        .values(post_count=table.c.post_count + bindparam('delta')),
+        [{'tag_id': tag_id, 'delta': delta} for tag_id, delta in deltas.items()],
+    )
+
+def refresh_tag_counts(tag_ids=None):
+    """Recompute published-post counts for the given tag ids, or for every tag"""
+    from app import db
+    from models import Tag, BlogPost, blog_post_tags
+    
+    post_count = (
+        select(func.count())
+        .select_from(blog_post_tags.join(BlogPost))
+        .where(blog_post_tags.c.tag_id == Tag.id, BlogPost.is_published.is_(True))
+        .scalar_subquery()
+    )
+    stmt = update(Tag).values(post_count=post_count)
+    if tag_ids is not None:
+        if not tag_ids:
+            return
+        stmt = stmt.where(Tag.id.in_(tag_ids))
+    db.session.execute(stmt, execution_options={'synchronize_session': False})
+
+def sync_post_tags(post):
+    """Mirror a blog post's comma-separated tags into the tag index"""
+    from app import db
+    from models import blog_post_tags
+    
+    db.session.flush()
+    affected = _replace_tags(blog_post_tags, 'blog_post_id', post.id, parse_tags(post.tags))
+    refresh_tag_counts(affected)
+
+def sync_project_tags(project):
+    """Mirror a project's tags and tech stack into the tag index"""
+    from app import db
+    from models import project_tags, project_technologies
+    
+    db.session.flush()
+    _replace_tags(project_tags, 'project_id', project.id, parse_tags(project.tags))
+    _replace_tags(project_technologies, 'project_id', project.id, parse_tech_stack(project.tech_stack))
+
+def clear_post_tags(post):
+    """Detach all tags from a blog post that is about to be deleted"""
+    from models import blog_post_tags
+    refresh_tag_counts(_replace_tags(blog_post_tags, 'blog_post_id', post.id, []))
+
+def clear_project_tags(project):
+    """Detach all tags and technologies from a project that is about to be deleted"""
+    from models import project_tags, project_technologies
+    _replace_tags(project_tags, 'project_id', project.id, [])
+    _replace_tags(project_technologies, 'project_id', project.id, [])
+
+def rebuild_tag_index():
+    """Rebuild every tag association from the text columns (backfill)"""
+    from app import db
+    from models import BlogPost, Project
+    
+    for post in BlogPost.query.all():
+        sync_post_tags(post)
+    for project in Project.query.all():
+        sync_project_tags(project)
+    refresh_tag_counts()
+    db.session.commit()
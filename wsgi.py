@@ -8,10 +8,7 @@ if project_home not in sys.path:
 # If using a virtualenv, adjust os.environ if needed (optional here)
 # os.environ['YOUR_ENV_VAR'] = 'value'
 
-# Import your Flask app (example)
-# If your app is in myproject/app.py and the Flask instance is named "app":
-from app import app as application
-
-# OR if using package myproject and create_app pattern:
-# from myproject import create_app
-# application = create_app()
+# Build the Flask app with the factory in myproject/app.py.
+# With gunicorn, `gunicorn --preload wsgi:application` builds it once before forking workers.
+from app import create_app
+application = create_app()